@@ -1,15 +1,54 @@
-import webview
 import os
 import sys
 import time
 import ctypes
-from ctypes import wintypes, POINTER, byref, create_unicode_buffer, Structure, sizeof
+from ctypes import wintypes, byref, create_unicode_buffer, sizeof
 import json
 import threading
 from datetime import datetime, timedelta
+from array import array
+from collections import Counter, OrderedDict, deque
+import concurrent.futures
+import queue
 import csv
+import io
+import gzip
+import zlib
 import string
 import struct
+import tempfile
+import codecs
+import mmap
+import shutil
+import ntpath
+import bisect
+import heapq
+import itertools
+import operator
+import re
+import urllib.parse
+import abc
+import ast
+import argparse
+import importlib
+import contextlib
+import multiprocessing
+import cProfile
+import pstats
+
+class LazyModule:
+    """Imports a module on first use, headless runs never load the GUI toolkit"""
+
+    def __init__(self, name):
+        self.name = name
+        self.module = None
+
+    def __getattr__(self, attribute):
+        if self.module is None:
+            self.module = importlib.import_module(self.name)
+        return getattr(self.module, attribute)
+
+webview = LazyModule('webview')
 
 # Check for admin privileges
 def is_admin():
@@ -36,6 +75,11 @@ INVALID_HANDLE_VALUE = ctypes.c_void_p(-1).value
 FSCTL_QUERY_USN_JOURNAL = 0x000900f4
 FSCTL_READ_USN_JOURNAL = 0x000900bb
 FSCTL_ENUM_USN_DATA = 0x000900b3
+FSCTL_GET_NTFS_VOLUME_DATA = 0x00090064
+
+PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+STILL_ACTIVE = 259  # GetExitCodeProcess of a running process
+ERROR_ACCESS_DENIED = 5
 
 # USN Reason flags
 USN_REASONS = {
@@ -80,387 +124,3217 @@ FILE_ATTRIBUTES = {
     0x00004000: "ENCRYPTED"
 }
 
-class JournalScanner:
-    def __init__(self):
-        self.results = []
-        self.is_scanning = False
-        self.drive_handles = {}
-        self.file_ref_to_path = {}  # Cache for path resolution
-        
-    def get_reason_string(self, reason_mask):
+# USN_RECORD_V2 fixed header: RecordLength, MajorVersion, (MinorVersion), FileReferenceNumber,
+# ParentFileReferenceNumber, Usn, TimeStamp, Reason, (SourceInfo, SecurityId), FileAttributes,
+# FileNameLength, FileNameOffset - fields in brackets are never used and skipped as padding.
+# TimeStamp is a signed LARGE_INTEGER: a corrupt one past 2^63 reads as negative and shows no time
+USN_RECORD_V2 = struct.Struct('<IH2xQQqqI8xIHH')
+USN_BUFFER_HEADER = struct.Struct('<q')  # Next USN / next file reference ahead of the records
+
+class UsnRecordDecoder:
+    """Zero-copy decoder for buffers of USN_RECORD_V2 records.
+
+    Records are decoded straight out of a memoryview of the IOCTL buffer with one
+    precompiled unpack_from per record and come back as plain tuples:
+    (file_ref, parent_ref, usn, timestamp, reason, attributes, filename)
+
+    Records outside file_refs (masked references) or rejected by
+    path_filter(parent_ref, name) are dropped before a tuple is built.
+    """
+
+    def __init__(self, file_refs=None, path_filter=None):
+        self.file_refs = file_refs
+        self.path_filter = path_filter
+
+    def decode(self, buffer, length, offset=8):
+        """Decode buffer[offset:length], returns (records, end_offset).
+
+        Decoding stops at the first zero or truncated record, end_offset tells
+        the caller where that happened.
+        """
+        unpack = USN_RECORD_V2.unpack_from
+        decode_name = codecs.utf_16_le_decode
+        file_refs = self.file_refs
+        path_filter = self.path_filter
+        records = []
+        append = records.append
+        limit = length - USN_RECORD_V2.size
+
+        with memoryview(buffer).cast('B') as view:
+            while offset <= limit:
+                (record_length, major_version, file_ref, parent_ref, usn, timestamp,
+                 reason, file_attributes, filename_length, filename_offset) = unpack(view, offset)
+                if record_length < USN_RECORD_V2.size or offset + record_length > length:
+                    break
+
+                if major_version == 2 and (file_refs is None or file_ref & 0xFFFFFFFFFFFF in file_refs):
+                    fn_start = offset + filename_offset
+                    fn_end = fn_start + filename_length
+                    if fn_end <= length:
+                        filename = decode_name(view[fn_start:fn_end], 'ignore')[0]
+                        if path_filter is None or path_filter(parent_ref, filename):
+                            append((file_ref, parent_ref, usn, timestamp, reason, file_attributes, filename))
+
+                offset += record_length
+
+        return records, offset
+
+    def decode_records(self, buffer, length):
+        """Just the records of an output buffer, for the decode pool"""
+        return self.decode(buffer, length)[0]
+
+    @staticmethod
+    def read_header(buffer):
+        """Return the leading next USN / next reference value of an output buffer"""
+        return USN_BUFFER_HEADER.unpack_from(buffer, 0)[0]
+
+FILETIME_UNIX_EPOCH = 116444736000000000  # FILETIME of 1970-01-01
+REASON_LABELS = {}  # reason mask -> label, a journal only shows a few hundred distinct masks
+ATTRIBUTE_LABELS = {}  # attribute mask -> label
+ISO_SECONDS = {}  # epoch second -> ISO string without the fraction
+ISO_SECONDS_LIMIT = 65536
+
+def format_reason(reason_mask):
+    label = REASON_LABELS.get(reason_mask)
+    if label is None:
         reasons = [name for flag, name in USN_REASONS.items() if reason_mask & flag]
-        return " | ".join(reasons) if reasons else "UNKNOWN"
-    
-    def get_file_attributes_string(self, attributes):
+        label = REASON_LABELS[reason_mask] = " | ".join(reasons) if reasons else "UNKNOWN"
+    return label
+
+def format_attributes(attributes):
+    label = ATTRIBUTE_LABELS.get(attributes)
+    if label is None:
         attrs = [name for flag, name in FILE_ATTRIBUTES.items() if attributes & flag]
-        return ", ".join(attrs) if attrs else "NORMAL"
-    
-    def filetime_to_datetime(self, filetime):
-        if filetime == 0:
-            return None
+        label = ATTRIBUTE_LABELS[attributes] = ", ".join(attrs) if attrs else "NORMAL"
+    return label
+
+def filetime_to_datetime(filetime):
+    if filetime <= 0:
+        return None
+    try:
+        return datetime(1601, 1, 1) + timedelta(microseconds=filetime // 10)
+    except:
+        return None
+
+def filetimes_to_epoch(timestamps):
+    """Microseconds since 1970 for a whole batch of FILETIMEs, as one integer array"""
+    return array('q', [(ts - FILETIME_UNIX_EPOCH) // 10 for ts in timestamps])
+
+def format_timestamps(timestamps):
+    """ISO strings for a batch of FILETIMEs, None for 0 or a corrupt negative one, the same text as filetime_to_datetime(ts).isoformat().
+
+    Journal records arrive many per second, so the date part is formatted once per
+    second and only the microseconds are appended per record.
+    """
+    seconds = ISO_SECONDS
+    if len(seconds) > ISO_SECONDS_LIMIT:
+        seconds.clear()
+    result = []
+    append = result.append
+    for ts, micros in zip(timestamps, filetimes_to_epoch(timestamps)):
+        if ts <= 0:
+            append(None)
+            continue
+        second, fraction = divmod(micros, 1000000)
+        text = seconds.get(second)
+        if text is None:
+            try:
+                text = (datetime(1970, 1, 1) + timedelta(seconds=second)).isoformat()
+            except:
+                text = ''
+            seconds[second] = text
+        if not text:
+            append(None)
+        elif fraction:
+            append(f"{text}.{fraction:06d}")
+        else:
+            append(text)
+    return result
+
+def datetime_to_filetime(value):
+    """FILETIME of a datetime or ISO string, the inverse of filetime_to_datetime"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    delta = value.replace(tzinfo=None) - datetime(1601, 1, 1)
+    return (delta.days * 86400 + delta.seconds) * 10000000 + delta.microseconds * 10
+
+ENTRY_COLUMNS = ('usns', 'file_refs', 'parent_refs', 'timestamps', 'reasons', 'attributes',
+                 'name_ids', 'drive_ids')
+ENTRY_ROW_BYTES = 48  # One row across the EntryStore columns
+SPILL_BATCH_ROWS = 1 << 18  # Rows a budgeted store takes in before checking its budget again
+SPILL_PREFIX = 'spill_'  # Spill directories are named spill_<pid>_<kind>_<random>, the pid is the owner
+
+def process_alive(pid):
+    """Whether the process with this id is still running"""
+    if sys.platform == 'win32':
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return kernel32.GetLastError() == ERROR_ACCESS_DENIED  # Running, as another user
         try:
-            return datetime(1601, 1, 1) + timedelta(microseconds=filetime // 10)
-        except:
-            return None
-    
-    def get_drive_handle(self, drive_letter):
-        if drive_letter in self.drive_handles:
-            return self.drive_handles[drive_letter]
-            
-        handle = ctypes.windll.kernel32.CreateFileW(
-            f"\\\\.\\{drive_letter}:",
-            GENERIC_READ,
-            FILE_SHARE_READ | FILE_SHARE_WRITE | FILE_SHARE_DELETE,
-            None,
-            OPEN_EXISTING,
-            0,
-            None
-        )
-        
-        if handle == INVALID_HANDLE_VALUE:
-            error = ctypes.windll.kernel32.GetLastError()
-            raise Exception(f"Could not open drive {drive_letter}: Error {error}")
-            
-        self.drive_handles[drive_letter] = handle
-        return handle
-    
-    def query_usn_journal(self, drive_letter):
-        handle = self.get_drive_handle(drive_letter)
-        output_buffer = ctypes.create_string_buffer(56)
-        bytes_returned = wintypes.DWORD()
-        
-        success = ctypes.windll.kernel32.DeviceIoControl(
-            handle, FSCTL_QUERY_USN_JOURNAL, None, 0,
-            output_buffer, 56, ctypes.byref(bytes_returned), None
-        )
-        
-        if not success:
-            error = ctypes.windll.kernel32.GetLastError()
-            if error == 5:
-                raise Exception("Access Denied - Run as Administrator!")
-            elif error == 1179:
-                raise Exception("USN Journal not active on this drive")
-            raise Exception(f"Failed to query USN Journal (Error {error})")
-        
-        data = output_buffer.raw
+            exit_code = wintypes.DWORD()
+            return not kernel32.GetExitCodeProcess(handle, byref(exit_code)) or exit_code.value == STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def make_spill_directory(kind='rows'):
+    """New directory in the spill folder, named for this process so prune_spill leaves it alone while it runs"""
+    directory = os.path.join(get_data_dir(), 'spill')
+    os.makedirs(directory, exist_ok=True)
+    return tempfile.mkdtemp(prefix=f'{SPILL_PREFIX}{os.getpid()}_{kind}_', dir=directory)
+
+class SpilledColumn:
+    """EntryStore column whose older rows were spilled to segment files and are read through their maps.
+
+    Stands in for the array it replaces - len, indexing, slicing, iteration, appends
+    and tofile behave the same and slices come back as arrays - so indexes, queries
+    and exports read spilled rows without knowing. Rows not spilled yet stay in an
+    in-memory tail array.
+    """
+
+    def __init__(self, values):
+        self.typecode = values.typecode
+        self.itemsize = values.itemsize
+        self.parts = []  # Typed views of the spilled segments
+        self.raw = []  # Byte views of the same segments, for slicing
+        self.starts = []  # Row index of the first row of every part
+        self.tail = (0, values)  # (row index of the first in-memory row, in-memory rows), swapped as one
+
+    def __len__(self):
+        start, values = self.tail
+        return start + len(values)
+
+    def __iter__(self):
+        start, values = self.tail
+        for first, part in zip(self.starts, self.parts):
+            if first >= start:
+                break
+            yield from part
+        yield from values
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return array(self.typecode, [self[i] for i in range(start, stop, step)])
+            return self.slice(start, stop)
+        start, values = self.tail
+        if index < 0:
+            index += start + len(values)
+        if index >= start:
+            return values[index - start]
+        if index < 0:
+            raise IndexError('column index out of range')
+        part = bisect.bisect_right(self.starts, index) - 1
+        return self.parts[part][index - self.starts[part]]
+
+    def slice(self, start, stop):
+        result = array(self.typecode)
+        tail_start, values = self.tail
+        part = max(0, bisect.bisect_right(self.starts, start) - 1)
+        while start < min(stop, tail_start) and part < len(self.starts):
+            first = self.starts[part]
+            end = min(stop, first + len(self.parts[part]))
+            if start < end:
+                result.frombytes(self.raw[part][(start - first) * self.itemsize:(end - first) * self.itemsize])
+                start = end
+            part += 1
+        if start < stop:
+            result.extend(values[start - tail_start:stop - tail_start])
+        return result
+
+    def append(self, value):
+        self.tail[1].append(value)
+
+    def extend(self, values):
+        self.tail[1].extend(values)
+
+    def tofile(self, f):
+        for raw in self.raw:
+            f.write(raw)
+        self.tail[1].tofile(f)
+
+    def copy(self):
+        """A column over the same segments with its own copy of the in-memory tail"""
+        start, values = self.tail
+        column = SpilledColumn(array(self.typecode, values))
+        column.parts = list(self.parts)
+        column.raw = list(self.raw)
+        column.starts = list(self.starts)
+        column.tail = (start, column.tail[1])
+        return column
+
+    def spill(self, view, raw):
+        """Attach a segment holding the next len(view) rows, they leave the in-memory tail"""
+        start, values = self.tail
+        self.parts.append(view)
+        self.raw.append(raw)
+        self.starts.append(start)
+        self.tail = (start + len(view), values[len(view):])
+
+class EntryStore:
+    """Columnar, array-backed store of journal entries.
+
+    Every record costs a handful of machine words: USN, references and raw FILETIME
+    as 64-bit arrays, reason and attribute masks as 32-bit arrays, and names and
+    drives as ids into one interned string table. Paths are not stored at all, they
+    come from the drive's PathResolver when a row is built. The dicts the UI and the
+    exporter expect are only built on demand by row().
+
+    With a memory_budget the store spills its rows to segment files once the rows
+    held in memory take more than that, its columns then become SpilledColumns.
+    The store owns its spill directory: clear() and close_spill() delete it, and a
+    store extended from a spilled one while empty takes its segments over.
+    """
+
+    def __init__(self, memory_budget=0):
+        self.usns = array('q')
+        self.file_refs = array('Q')
+        self.parent_refs = array('Q')
+        self.timestamps = array('q')
+        self.reasons = array('I')
+        self.attributes = array('I')
+        self.name_ids = array('I')
+        self.drive_ids = array('I')
+        self.strings = []
+        self.string_ids = {}
+        self.resolvers = {}  # drive letter -> PathResolver
+        self.memory_budget = memory_budget  # Bytes of in-memory rows before they spill to disk, 0 keeps them all
+        self.spill_case = None  # CaseStore holding the spilled segments
+
+    def __len__(self):
+        return len(self.usns)
+
+    def __iter__(self):
+        for i in range(len(self.usns)):
+            yield self.row(i)
+
+    def intern(self, value):
+        string_id = self.string_ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings.append(value)
+            self.string_ids[value] = string_id
+        return string_id
+
+    def append(self, usn, file_ref, parent_ref, timestamp, reason, attributes, name, drive_letter):
+        intern = self.intern
+        self.usns.append(usn)
+        self.file_refs.append(file_ref)
+        self.parent_refs.append(parent_ref)
+        self.timestamps.append(timestamp)
+        self.reasons.append(reason)
+        self.attributes.append(attributes)
+        self.name_ids.append(intern(name))
+        self.drive_ids.append(intern(drive_letter))
+
+    def extend(self, other):
+        """Append every entry of another store, remapping its string ids"""
+        if not len(self) and other.spill_case is not None:
+            self.adopt(other)
+            return
+        remap = [self.intern(value) for value in other.strings]
+        self.resolvers.update(other.resolvers)
+        # A budgeted or spilled store goes over in batches, so the budget holds in between
+        step = max(1, len(other))
+        if self.memory_budget or isinstance(other.usns, SpilledColumn):
+            step = max(1024, min(SPILL_BATCH_ROWS, self.memory_budget // ENTRY_ROW_BYTES or SPILL_BATCH_ROWS))
+        for start in range(0, len(other), step):
+            part = other if step >= len(other) else other.slice(start, start + step)
+            self.usns.extend(part.usns)
+            self.file_refs.extend(part.file_refs)
+            self.parent_refs.extend(part.parent_refs)
+            self.timestamps.extend(part.timestamps)
+            self.reasons.extend(part.reasons)
+            self.attributes.extend(part.attributes)
+            self.name_ids.extend(array('I', [remap[i] for i in part.name_ids]))
+            self.drive_ids.extend(array('I', [remap[i] for i in part.drive_ids]))
+            self.spill_over_budget()
+
+    def spill_over_budget(self):
+        """Move the in-memory rows to spill segments once they take more than memory_budget"""
+        if not self.memory_budget:
+            return
+        spilled = self.usns.tail[0] if isinstance(self.usns, SpilledColumn) else 0
+        if (len(self.usns) - spilled) * ENTRY_ROW_BYTES <= self.memory_budget:
+            return
+        if self.spill_case is None:
+            self.spill_case = CaseStore(make_spill_directory())
+        for column in ENTRY_COLUMNS:
+            if not isinstance(getattr(self, column), SpilledColumn):
+                setattr(self, column, SpilledColumn(getattr(self, column)))
+        segment_count = len(self.spill_case.segments)
+        self.spill_case.write_segments(self, spilled, len(self.usns))
+        for segment in self.spill_case.segments[segment_count:]:
+            for column in ENTRY_COLUMNS:
+                getattr(self, column).spill(segment.columns[column], segment.raw[column])
+
+    def adopt(self, other):
+        """Take over the rows and spill segments of a spilled store instead of writing them again"""
+        for column in ENTRY_COLUMNS:
+            setattr(self, column, getattr(other, column).copy())
+        self.strings = list(other.strings)
+        self.string_ids = dict(other.string_ids)
+        self.resolvers.update(other.resolvers)
+        # The other store still reads the segments, but no longer deletes them
+        self.spill_case, other.spill_case = other.spill_case, None
+        self.spill_over_budget()
+
+    def close_spill(self):
+        """Unmap and delete this store's spill segments, the rows in them are gone afterwards"""
+        spill_case, self.spill_case = self.spill_case, None
+        if spill_case is None:
+            return
+        try:
+            spill_case.close()
+        except BufferError:
+            pass  # Still mapped somewhere, prune_spill gets it once this process is gone
+        shutil.rmtree(spill_case.directory, ignore_errors=True)
+
+    @staticmethod
+    def prune_spill():
+        """Delete the spill directories of processes that are no longer running"""
+        directory = os.path.join(get_data_dir(), 'spill')
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return
+        for name in names:
+            owner = name[len(SPILL_PREFIX):].split('_', 1)[0]
+            if name.startswith(SPILL_PREFIX) and owner.isdigit() and process_alive(int(owner)):
+                continue
+            # Segments still mapped cannot go away on Windows, they are retried next time
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+    def clear(self):
+        self.close_spill()
+        self.__init__(self.memory_budget)
+
+    def name(self, index):
+        return self.strings[self.name_ids[index]]
+
+    def path(self, index):
+        return self.build_path(self.strings[self.drive_ids[index]], self.parent_refs[index],
+                               self.strings[self.name_ids[index]], self.usns[index])
+
+    def build_path(self, drive_letter, parent_ref, name, usn=None):
+        resolver = self.resolvers.get(drive_letter)
+        if resolver is None:
+            return f"{drive_letter}:\\" + name
+        return resolver.path_of(parent_ref & 0xFFFFFFFFFFFF, name, usn)
+
+    def row(self, index):
+        """Build the entry dict for one record"""
+        name = self.strings[self.name_ids[index]]
+        reason = self.reasons[index]
+        file_attributes = self.attributes[index]
         return {
-            'journal_id': struct.unpack('<Q', data[0:8])[0],
-            'first_usn': struct.unpack('<q', data[8:16])[0],
-            'next_usn': struct.unpack('<q', data[16:24])[0],
-            'lowest_valid_usn': struct.unpack('<q', data[24:32])[0],
-            'max_usn': struct.unpack('<q', data[32:40])[0],
-            'max_size': struct.unpack('<Q', data[40:48])[0],
-            'allocation_delta': struct.unpack('<Q', data[48:56])[0]
+            'usn': str(self.usns[index]),
+            'name': name,
+            'path': self.build_path(self.strings[self.drive_ids[index]], self.parent_refs[index], name, self.usns[index]),
+            'timestamp': format_timestamps((self.timestamps[index],))[0],
+            'reason': format_reason(reason),
+            'fileSize': 0,
+            'isDirectory': bool(file_attributes & 0x10),
+            'attributes': format_attributes(file_attributes),
+            # References go out as strings like the USN, they do not fit in a JS number
+            'fileReference': str(self.file_refs[index]),
+            'parentFileReference': str(self.parent_refs[index]),
+            'originalName': name,
+            'isRename': bool(reason & 0x3000),
+            'renameType': 'old' if (reason & 0x1000) else ('new' if (reason & 0x2000) else 'none'),
+            'details': ''
         }
-    
-    def build_mft_path_cache(self, drive_letter, window=None):
-        """Build a cache of file reference numbers to paths using MFT enumeration"""
-        handle = self.get_drive_handle(drive_letter)
-        journal_info = self.query_usn_journal(drive_letter)
-        
-        # MFT_ENUM_DATA_V0 structure
-        enum_data = struct.pack('<QqQ', 0, 0, journal_info['next_usn'])
-        
-        buffer_size = 4 * 1024 * 1024  # 4MB buffer for faster scanning
-        output_buffer = ctypes.create_string_buffer(buffer_size)
-        bytes_returned = wintypes.DWORD()
-        
-        # Pre-allocate dictionaries
-        parent_cache = {}
-        path_cache = {5: f"{drive_letter}:\\"}  # Root directory
-        
-        while self.is_scanning:
-            success = ctypes.windll.kernel32.DeviceIoControl(
-                handle, FSCTL_ENUM_USN_DATA, enum_data, len(enum_data),
-                output_buffer, buffer_size, ctypes.byref(bytes_returned), None
-            )
-            
-            if not success:
-                error = ctypes.windll.kernel32.GetLastError()
-                if error == 38:  # No more data
-                    break
-                break
-            
-            if bytes_returned.value <= 8:
-                break
-            
-            data = output_buffer.raw[:bytes_returned.value]
-            next_ref = struct.unpack('<Q', data[0:8])[0]
-            
-            offset = 8
-            while offset + 60 <= len(data):
-                record_length = struct.unpack('<I', data[offset:offset+4])[0]
-                if record_length == 0 or record_length > buffer_size or offset + record_length > len(data):
+
+    def rows(self, start=0, stop=None):
+        stop = len(self.usns) if stop is None else min(stop, len(self.usns))
+        return [self.row(i) for i in range(start, stop)]
+
+    def slice(self, start, stop=None):
+        """Return a new store with entries [start:stop], sharing the string table"""
+        part = EntryStore()
+        for column in ENTRY_COLUMNS:
+            setattr(part, column, getattr(self, column)[start:stop])
+        part.strings = self.strings
+        part.string_ids = self.string_ids
+        part.resolvers = self.resolvers
+        return part
+
+    def take(self, indices):
+        """Return a new store with the entries at indices in that order, sharing the string table"""
+        part = EntryStore()
+        for column in ENTRY_COLUMNS:
+            values = getattr(self, column)
+            setattr(part, column, array(values.typecode, [values[i] for i in indices]))
+        part.strings = self.strings
+        part.string_ids = self.string_ids
+        part.resolvers = self.resolvers
+        return part
+
+    def count_unique(self):
+        """Return (unique file names, unique directory names)"""
+        files = set()
+        dirs = set()
+        for name_id, file_attributes in zip(self.name_ids, self.attributes):
+            if file_attributes & 0x10:
+                dirs.add(name_id)
+            else:
+                files.add(name_id)
+        return len(files), len(dirs)
+
+    def oldest_timestamp(self):
+        timestamps = [ts for ts in self.timestamps if ts > 0]
+        if not timestamps:
+            return None
+        oldest = filetime_to_datetime(min(timestamps))
+        return oldest.isoformat() if oldest else None
+
+class PathResolver:
+    """Resolves file references of one volume to paths on demand.
+
+    Only the (parent_ref, name) node of every file is kept. Full path strings are
+    cached for directories alone, in a bounded LRU, and file paths are joined
+    when a row is displayed or exported.
+    """
+
+    def __init__(self, drive_letter, nodes, cache_size=65536):
+        self.root = f"{drive_letter}:\\"
+        self.nodes = nodes
+        self.cache_size = cache_size
+        self.directory_paths = OrderedDict()
+        self.lock = threading.Lock()
+        self.history = None  # DirectoryHistory for point-in-time lookups
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def directory_path(self, ref):
+        """Full path of a directory, walking up the tree iteratively"""
+        with self.lock:
+            cached = self.directory_paths.get(ref)
+            if cached is not None:
+                self.directory_paths.move_to_end(ref)
+                self.cache_hits += 1
+                return cached
+            self.cache_misses += 1
+
+            # Collect names up to the root or the first cached ancestor
+            chain = []
+            base = self.root
+            current = ref
+            seen = set()
+            while current != 5:
+                cached = self.directory_paths.get(current)
+                if cached is not None:
+                    base = cached
                     break
-                
-                file_ref = struct.unpack('<Q', data[offset+8:offset+16])[0] & 0xFFFFFFFFFFFF
-                parent_ref = struct.unpack('<Q', data[offset+16:offset+24])[0] & 0xFFFFFFFFFFFF
-                filename_length = struct.unpack('<H', data[offset+56:offset+58])[0]
-                filename_offset = struct.unpack('<H', data[offset+58:offset+60])[0]
-                
-                fn_start = offset + filename_offset
-                fn_end = fn_start + filename_length
-                
-                if fn_end <= len(data):
-                    try:
-                        filename = data[fn_start:fn_end].decode('utf-16-le', errors='ignore')
-                        parent_cache[file_ref] = (parent_ref, filename)
-                    except:
-                        pass
-                
-                offset += record_length
-            
-            enum_data = struct.pack('<QqQ', next_ref, 0, journal_info['next_usn'])
-            if next_ref == 0:
-                break
-        
-        # Build full paths - optimized recursive resolution
-        def resolve_path(ref, depth=0):
-            if depth > 100:  # Prevent infinite recursion
-                return f"{drive_letter}:\\"
-            if ref in path_cache:
-                return path_cache[ref]
-            if ref not in parent_cache:
-                return f"{drive_letter}:\\"
-            
-            parent_ref, filename = parent_cache[ref]
-            parent_path = resolve_path(parent_ref, depth + 1)
-            full_path = os.path.join(parent_path, filename)
-            path_cache[ref] = full_path
-            return full_path
-        
-        # Resolve all paths
-        for ref in list(parent_cache.keys()):
-            if ref not in path_cache:
-                try:
-                    resolve_path(ref)
-                except:
-                    pass
-        
-        return path_cache
-    
-    def read_usn_journal_fast(self, drive_letter, path_cache, window=None, fast_mode=True):
-        """Fast USN Journal reading with optimized processing"""
-        handle = self.get_drive_handle(drive_letter)
-        journal_info = self.query_usn_journal(drive_letter)
-        
-        start_usn = 0
-        journal_id = journal_info['journal_id']
-        
-        buffer_size = 8 * 1024 * 1024  # 8MB buffer for ultra-fast scanning
-        output_buffer = ctypes.create_string_buffer(buffer_size)
-        bytes_returned = wintypes.DWORD()
-        
-        entries = []
-        unique_files = set()
-        unique_dirs = set()
-        
-        while self.is_scanning:
-            input_buffer = struct.pack('<qIIQQQ', start_usn, 0xFFFFFFFF, 0, 0, 0, journal_id)
-            
-            success = ctypes.windll.kernel32.DeviceIoControl(
-                handle, FSCTL_READ_USN_JOURNAL, input_buffer, len(input_buffer),
-                output_buffer, buffer_size, ctypes.byref(bytes_returned), None
-            )
-            
-            if not success:
-                error = ctypes.windll.kernel32.GetLastError()
-                if error == 38:  # No more data
+                node = self.nodes.get(current)
+                if node is None or current in seen:
+                    # Unknown (deleted) ancestor or a loop - hang what we have off the root
                     break
+                seen.add(current)
+                chain.append((current, node[1]))
+                current = node[0]
+
+            path = base
+            for directory_ref, name in reversed(chain):
+                path = ntpath.join(path, name)
+                self.remember(directory_ref, path)
+            return path
+
+    def remember(self, ref, path):
+        self.directory_paths[ref] = path
+        if len(self.directory_paths) > self.cache_size:
+            self.directory_paths.popitem(last=False)
+
+    def path_of(self, parent_ref, name, usn=None):
+        if usn is None or self.history is None:
+            return ntpath.join(self.directory_path(parent_ref), name)
+        return ntpath.join(self.directory_path_at(parent_ref, usn), name)
+
+    def directory_path_at(self, ref, usn):
+        """Path a directory had when the record with this USN was written"""
+        history = self.history
+        names = []
+        current = ref
+        seen = set()
+        historical = False
+        while current != 5 and current not in seen:
+            seen.add(current)
+            node = history.state_at(current, usn)
+            if node is None:
+                node = self.nodes.get(current)
+            if node is None:
+                # Gone from the MFT, fall back to the last name the journal saw
+                node = history.last_state(current)
+            if node is None:
                 break
+            if node is not self.nodes.get(current):
+                historical = True
+            names.append(node[1])
+            current = node[0]
+
+        if not historical:
+            # Nothing above this directory changed later on, the cached current path is right
+            return self.directory_path(ref)
+        return ntpath.join(self.root, *reversed(names)) if names else self.root
+
+    def apply_records(self, records):
+        """Keep the nodes current with live journal records, for monitor mode"""
+        with self.lock:
+            if self.history is None:
+                self.history = DirectoryHistory()
+            for file_ref, parent_ref, usn, _, reason, file_attributes, filename in records:
+                ref = file_ref & 0xFFFFFFFFFFFF
+                is_directory = file_attributes & 0x10
+                if is_directory and reason & (0x00001000 | 0x00000200):  # RENAME_OLD_NAME | FILE_DELETE
+                    self.history.add(ref, usn, parent_ref & 0xFFFFFFFFFFFF, filename)
+                    # Cached paths below the directory are stale now, renames are rare enough to start over
+                    self.directory_paths.clear()
+                if reason & 0x00000200:  # FILE_DELETE
+                    self.nodes.pop(ref, None)
+                elif reason & 0x00002100:  # FILE_CREATE / RENAME_NEW_NAME
+                    self.nodes[ref] = (parent_ref & 0xFFFFFFFFFFFF, filename)
+
+    def __getitem__(self, ref):
+        """Full path of any file reference"""
+        node = self.nodes.get(ref)
+        if node is None:
+            return self.root
+        return self.path_of(node[0], node[1])
+
+class DirectoryHistory:
+    """Time-indexed (parent_ref, name) history of the directories of one volume.
+
+    RENAME_OLD_NAME and FILE_DELETE records carry the name a directory had right
+    before that USN. They are collected per directory in one pass as sorted USN
+    arrays, so the state at any USN is a single bisect away. Between two consecutive
+    changes of any directory (an epoch) every directory path stays the same.
+    """
+
+    def __init__(self):
+        self.changes = {}  # dir ref -> (array of change USNs, [(parent_ref, name) before each change])
+        self.change_usns = array('q')  # USNs of every directory's changes, sorted
+
+    @classmethod
+    def from_store(cls, store, drive_letter=None):
+        """History of the rows of store, only those of drive_letter when the store spans drives"""
+        history = cls()
+        changes = {}
+        strings = store.strings
+        drive_id = store.string_ids.get(drive_letter) if drive_letter else None
+        mask = 0x00001000 | 0x00000200  # RENAME_OLD_NAME | FILE_DELETE
+        for i, (reason, file_attributes) in enumerate(zip(store.reasons, store.attributes)):
+            if not (reason & mask and file_attributes & 0x10):
+                continue
+            if drive_id is not None and store.drive_ids[i] != drive_id:
+                continue
+            ref = store.file_refs[i] & 0xFFFFFFFFFFFF
+            usns, states = changes.setdefault(ref, ([], []))
+            usns.append(store.usns[i])
+            states.append((store.parent_refs[i] & 0xFFFFFFFFFFFF, strings[store.name_ids[i]]))
+
+        for ref, (usns, states) in changes.items():
+            if any(usns[j] > usns[j + 1] for j in range(len(usns) - 1)):
+                order = sorted(range(len(usns)), key=usns.__getitem__)
+                usns = [usns[j] for j in order]
+                states = [states[j] for j in order]
+            history.changes[ref] = (array('q', usns), states)
+        history.change_usns = array('q', sorted(itertools.chain.from_iterable(usns for usns, _ in history.changes.values())))
+        return history
+
+    def epoch(self, usn):
+        """Number of directory changes at or before usn, rows of one epoch see the same directory paths"""
+        return bisect.bisect_right(self.change_usns, usn)
+
+    def state_at(self, ref, usn):
+        """(parent_ref, name) of a directory at usn, or None when its current node applies"""
+        entry = self.changes.get(ref)
+        if entry is None:
+            return None
+        usns, states = entry
+        i = bisect.bisect_right(usns, usn)
+        if i < len(usns):
+            return states[i]
+        return None
+
+    def last_state(self, ref):
+        entry = self.changes.get(ref)
+        return entry[1][-1] if entry else None
+
+    def add(self, ref, usn, parent_ref, name):
+        """Append a change newer than every one seen so far"""
+        usns, states = self.changes.setdefault(ref, (array('q'), []))
+        usns.append(usn)
+        states.append((parent_ref, name))
+        self.change_usns.append(usn)
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+TIMELINE_BUCKETS = {'minute': 60 * 10000000, 'hour': 3600 * 10000000, 'day': 86400 * 10000000}  # FILETIME ticks
+TIMELINE_MAX_BUCKETS = 240  # The finest bucket 'auto' picks still fits the range into this many
+TIME_RUN_MIN_ROWS = 64  # Rows per sorted run below which time filters scan instead of bisecting every run
+REASON_BITS = {}  # raw reason mask -> names of its bits, for the timeline
+USN_DIGITS = 19  # Digits of the largest USN, a signed 64-bit offset
+
+class RowRanges:
+    """Sorted row indices kept as (start, stop) ranges.
+
+    A time filter over sorted runs matches whole stretches of rows, paging through
+    them this way never lists the rows of a large range.
+    """
+
+    def __init__(self, ranges):
+        self.ranges = ranges
+        self.offsets = array('q')  # Matches before each range
+        total = 0
+        for start, stop in ranges:
+            self.offsets.append(total)
+            total += stop - start
+        self.total = total
+
+    def __len__(self):
+        return self.total
+
+    def __iter__(self):
+        for start, stop in self.ranges:
+            yield from range(start, stop)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            if index < 0:
+                index += self.total
+            if not 0 <= index < self.total:
+                raise IndexError('row index out of range')
+            k = bisect.bisect_right(self.offsets, index) - 1
+            return self.ranges[k][0] + index - self.offsets[k]
+        start, stop, step = index.indices(self.total)
+        if step != 1:
+            return [self[i] for i in range(start, stop, step)]
+        rows = []
+        k = max(0, bisect.bisect_right(self.offsets, start) - 1)
+        while start < stop and k < len(self.ranges):
+            first, last = self.ranges[k]
+            begin = first + start - self.offsets[k]
+            end = min(last, first + stop - self.offsets[k])
+            rows.extend(range(begin, end))
+            start += end - begin
+            k += 1
+        return rows
+
+def reason_bits(reason_mask):
+    names = REASON_BITS.get(reason_mask)
+    if names is None:
+        names = REASON_BITS[reason_mask] = [name for flag, name in USN_REASONS.items() if reason_mask & flag]
+    return names
+
+class QueryEngine:
+    """Indexed filtering over an EntryStore.
+
+    Names and directory paths are distinct values, far fewer than rows, so the
+    substring search runs against a trigram index of those values and only
+    then expands to rows through per-value posting arrays. Reason filters test
+    the raw masks, one posting array per distinct reason value. The scanner
+    refreshes the index as each drive merges (JournalScanner.index_query), a
+    query only indexes the rows appended since.
+
+    Time filters bisect instead of scanning: a journal is written in time order, so
+    the rows split into a few runs of non-decreasing timestamps (one per drive and
+    monitor batch) and a range is a binary search in each. Counts per minute, hour
+    and day and raw reason mask are rolled up as rows come in, for timeline().
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.string_table = self.store.strings  # Replaced by EntryStore.clear(), tells a cleared store apart
+        self.indexed_rows = 0
+        self.indexed_strings = 0
+        self.lower_strings = []
+        self.string_grams = {}  # trigram -> array of string ids
+        self.name_rows = []  # string id -> array of row indices
+        self.directory_ids = {}  # drive id -> {parent ref: row array of the directory}
+        self.directory_paths = []  # lower-cased path per directory id
+        self.directory_grams = {}  # trigram -> array of directory ids
+        self.directory_rows = []
+        self.reason_rows = {}  # raw reason mask -> array of row indices
+        self.time_runs = array('Q')  # First row of every run of non-decreasing timestamps
+        self.usn_runs = array('Q')  # First row of every run of increasing USNs, one per drive and monitor batch
+        self.first_time = None  # Oldest and newest non-zero timestamp
+        self.last_time = None
+        self.rollups = {bucket: {} for bucket in TIMELINE_BUCKETS}  # bucket -> {bucket index << 32 | reason: rows}
+        self.last_key = None
+        self.last_matches = None
+
+    def refresh(self):
+        """Index whatever rows and strings were appended since the last query"""
+        store = self.store
+        if store.strings is not self.string_table or len(store.drive_ids) < self.indexed_rows:
+            self.reset()
+        # drive_ids is the last column EntryStore extends, so rows below its length are complete
+        row_count = len(store.drive_ids)
+        string_count = len(store.strings)
+
+        for string_id in range(self.indexed_strings, string_count):
+            value = store.strings[string_id].lower()
+            self.lower_strings.append(value)
+            self.name_rows.append(array('I'))
+            for gram in trigrams(value):
+                postings = self.string_grams.get(gram)
+                if postings is None:
+                    postings = self.string_grams[gram] = array('I')
+                postings.append(string_id)
+        self.indexed_strings = string_count
+
+        name_rows, directory_ids, directory_rows, reason_rows = \
+            self.name_rows, self.directory_ids, self.directory_rows, self.reason_rows
+        start = self.indexed_rows
+        # Rows come in runs of one drive, its directories are looked up by parent reference alone
+        drive_id = None
+        for i, (name_id, row_drive_id, parent_ref, reason) in enumerate(zip(
+                store.name_ids[start:row_count], store.drive_ids[start:row_count],
+                store.parent_refs[start:row_count], store.reasons[start:row_count]), start):
+            name_rows[name_id].append(i)
+
+            if row_drive_id != drive_id:
+                drive_id = row_drive_id
+                drive_directories = directory_ids.setdefault(drive_id, {})
+            directory_rows_of = drive_directories.get(parent_ref)
+            if directory_rows_of is None:
+                directory_rows_of = drive_directories[parent_ref] = array('I')
+                self.add_directory(len(directory_rows), store.build_path(store.strings[drive_id], parent_ref, ''))
+                directory_rows.append(directory_rows_of)
+            directory_rows_of.append(i)
+
+            postings = reason_rows.get(reason)
+            if postings is None:
+                postings = reason_rows[reason] = array('I')
+            postings.append(i)
+        self.index_times(start, row_count)
+        self.index_usns(start, row_count)
+        self.indexed_rows = row_count
+
+    def index_usns(self, start, stop):
+        """Extend the sorted USN runs with the rows [start, stop)"""
+        if start >= stop:
+            return
+        first = max(0, start - 1)
+        usns = self.store.usns[first:stop]
+        if start == 0:
+            self.usn_runs.append(0)
+        self.usn_runs.extend(itertools.compress(itertools.count(first + 1), map(operator.ge, usns, usns[1:])))
+
+    def index_times(self, start, stop):
+        """Extend the sorted runs and the timeline rollups with the rows [start, stop)"""
+        if start >= stop:
+            return
+        store = self.store
+        first = max(0, start - 1)
+        timestamps = store.timestamps[first:stop]
+        # A run ends where the next row is older, compared pairwise without a Python loop
+        if start == 0:
+            self.time_runs.append(0)
+        self.time_runs.extend(itertools.compress(itertools.count(first + 1),
+                                                 map(operator.gt, timestamps, timestamps[1:])))
+        if start:
+            timestamps = timestamps[1:]
+        oldest = min(filter(None, timestamps), default=None)
+        if oldest is not None and oldest < 0:
+            oldest = min(filter((0).__lt__, timestamps), default=None)  # Corrupt, negative timestamps show no time
+        if oldest is not None:
+            newest = max(timestamps)
+            self.first_time = oldest if self.first_time is None else min(self.first_time, oldest)
+            self.last_time = newest if self.last_time is None else max(self.last_time, newest)
+
+        # Rows per (minute, raw reason) counted in C, the hours and days are summed from those
+        minute = TIMELINE_BUCKETS['minute']
+        minute_keys = map(operator.lshift, map(minute.__rfloordiv__, timestamps), itertools.repeat(32))
+        minutes = Counter(map(operator.or_, minute_keys, store.reasons[start:stop]))
+        for bucket, ticks in TIMELINE_BUCKETS.items():
+            rollup = self.rollups[bucket]
+            scale = ticks // minute
+            for key, rows in minutes.items():
+                key = (key >> 32) // scale << 32 | key & 0xFFFFFFFF
+                rollup[key] = rollup.get(key, 0) + rows
+
+    def time_ranges(self, low, high):
+        """(start, stop) row ranges with low <= timestamp <= high, None when the runs are too short to bisect"""
+        runs = self.time_runs
+        row_count = self.indexed_rows
+        if len(runs) > max(1, row_count // TIME_RUN_MIN_ROWS):
+            return None
+        timestamps = self.store.timestamps
+        ranges = []
+        for k, run_start in enumerate(runs):
+            run_end = runs[k + 1] if k + 1 < len(runs) else row_count
+            first = bisect.bisect_left(timestamps, low, run_start, run_end)
+            last = bisect.bisect_right(timestamps, high, first, run_end)
+            if first < last:
+                ranges.append((first, last))
+        return ranges
+
+    def timeline(self, bucket='auto', start_time=None, end_time=None, reason_mask=0):
+        """Rows per bucket and reason from the rollups - buckets with rows only, in time order"""
+        with self.lock:
+            self.refresh()
+            if self.first_time is None:
+                return {'bucket': bucket if bucket in TIMELINE_BUCKETS else 'hour', 'seconds': 0, 'buckets': []}
+            low = max(start_time or 0, self.first_time)
+            high = min(end_time if end_time is not None else self.last_time, self.last_time)
+            if bucket not in TIMELINE_BUCKETS:
+                # The finest bucket that shows the whole range in a chart's worth of bars
+                bucket = next((name for name, ticks in TIMELINE_BUCKETS.items()
+                               if high // ticks - low // ticks < TIMELINE_MAX_BUCKETS), 'day')
+            ticks = TIMELINE_BUCKETS[bucket]
+            first_index, last_index = max(1, low // ticks), high // ticks  # Index 0 holds the zero timestamps
+            buckets = {}
+            for key, rows in self.rollups[bucket].items():
+                index, reason = key >> 32, key & 0xFFFFFFFF
+                if first_index <= index <= last_index and (not reason_mask or reason & reason_mask):
+                    counts = buckets.get(index)
+                    if counts is None:
+                        counts = buckets[index] = {}
+                    counts[reason] = counts.get(reason, 0) + rows
+        indices = sorted(buckets)
+        starts = format_timestamps([index * ticks for index in indices])
+        ends = format_timestamps([(index + 1) * ticks - 10 for index in indices])  # Last microsecond of the bucket
+        result = []
+        for index, start, end in zip(indices, starts, ends):
+            reasons = {}
+            for reason, rows in buckets[index].items():
+                for name in reason_bits(reason):
+                    reasons[name] = reasons.get(name, 0) + rows
+            result.append({'start': start, 'end': end, 'total': sum(buckets[index].values()), 'reasons': reasons})
+        return {'bucket': bucket, 'seconds': ticks // 10000000, 'buckets': result}
+
+    def add_directory(self, directory_id, path):
+        value = path.lower()
+        self.directory_paths.append(value)
+        for gram in trigrams(value):
+            postings = self.directory_grams.get(gram)
+            if postings is None:
+                postings = self.directory_grams[gram] = array('I')
+            postings.append(directory_id)
+
+    @staticmethod
+    def lookup(text, values, grams):
+        """Ids of the values containing text, narrowed down through the trigram postings first"""
+        if len(text) < 3:
+            return [i for i, value in enumerate(values) if text in value]
+        postings = []
+        for gram in trigrams(text):
+            found = grams.get(gram)
+            if found is None:
+                return []
+            postings.append(found)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for found in postings[1:]:
+            candidates.intersection_update(found)
+            if not candidates:
+                return []
+        return [i for i in candidates if text in values[i]]
+
+    def text_matches(self, text):
+        """Sorted row indices whose name or directory path contains text, or whose USN starts with it"""
+        groups = [self.name_rows[i] for i in self.lookup(text, self.lower_strings, self.string_grams)]
+        groups += [self.directory_rows[i] for i in self.lookup(text, self.directory_paths, self.directory_grams)]
+        if text.isdigit():
+            groups.append(self.usn_matches(text))
+        if len(groups) == 1:
+            return groups[0]
+        rows = set()
+        for group in groups:
+            rows.update(group)
+        return array('I', sorted(rows))
+
+    def usn_matches(self, digits):
+        """Sorted row indices whose USN starts with digits - a range of USNs per digit count, bisected in every run"""
+        usns = self.store.usns
+        runs = self.usn_runs
+        row_count = self.indexed_rows
+        if len(runs) > max(1, row_count // TIME_RUN_MIN_ROWS):
+            return [i for i in range(row_count) if str(usns[i]).startswith(digits)]
+        prefix = int(digits)
+        ranges = []
+        for width in range(len(digits), USN_DIGITS + 1):
+            scale = 10 ** (width - len(digits))
+            low = max(prefix * scale, 10 ** (width - 1) if width > 1 else 0)
+            high = min((prefix + 1) * scale, 10 ** width)
+            if low >= high:
+                continue
+            for k, run_start in enumerate(runs):
+                run_end = runs[k + 1] if k + 1 < len(runs) else row_count
+                first = bisect.bisect_left(usns, low, run_start, run_end)
+                last = bisect.bisect_left(usns, high, first, run_end)
+                if first < last:
+                    ranges.append((first, last))
+        ranges.sort()
+        return RowRanges(ranges)
+
+    def reason_matches(self, reason_mask):
+        """Sorted row indices with any of the reason_mask bits, None when that is every row"""
+        groups = [rows for reason, rows in self.reason_rows.items() if reason & reason_mask]
+        if len(groups) == len(self.reason_rows):
+            return None
+        if len(groups) == 1:
+            return groups[0]
+        # Each group is sorted already, timsort only has to merge the runs
+        return array('I', sorted([i for group in groups for i in group]))
+
+    def matches(self, text='', reason_mask=0, start_time=None, end_time=None):
+        """Row indices matching every given criterion - an array, RowRanges for a time range alone, None meaning all rows"""
+        rows = None
+        if text:
+            rows = self.text_matches(text)
+            if reason_mask:
+                reasons = self.store.reasons
+                rows = [i for i in rows if reasons[i] & reason_mask]
+        elif reason_mask:
+            rows = self.reason_matches(reason_mask)
+
+        if start_time is not None or end_time is not None:
+            timestamps = self.store.timestamps
+            low = start_time if start_time is not None else -2 ** 63
+            high = end_time if end_time is not None else 2 ** 63 - 1
+            ranges = self.time_ranges(low, high)
+            if ranges is None:
+                if rows is None:
+                    rows = [i for i, ts in enumerate(timestamps[:self.indexed_rows]) if low <= ts <= high]
+                else:
+                    rows = [i for i in rows if low <= timestamps[i] <= high]
+            elif rows is None:
+                return RowRanges(ranges)
+            else:
+                # The other criteria matched sorted rows, keep the stretches inside the ranges
+                kept = array('I')
+                for first, last in ranges:
+                    kept.extend(rows[bisect.bisect_left(rows, first):bisect.bisect_left(rows, last)])
+                rows = kept
+
+        if rows is not None and not isinstance(rows, (array, RowRanges)):
+            rows = array('I', rows)
+        return rows
+
+    def match_rows(self, text='', reason_mask=0, start_time=None, end_time=None):
+        """Return (matching row indices or None for all of them, rows indexed)"""
+        text = (text or '').strip().lower()
+        if not text and not reason_mask and start_time is None and end_time is None:
+            # Every row matches, the first page never waits for the index
+            return None, len(self.store.drive_ids)
+        with self.lock:
+            self.refresh()
+            key = (text, reason_mask, start_time, end_time, self.indexed_rows)
+            if key != self.last_key:
+                # Paging through the same query reuses the match array
+                self.last_matches = self.matches(text, reason_mask, start_time, end_time)
+                self.last_key = key
+            return self.last_matches, self.indexed_rows
+
+    def query(self, text='', reason_mask=0, start_time=None, end_time=None, offset=0, limit=200):
+        """Return (total matches, row dicts of one page)"""
+        matches, indexed_rows = self.match_rows(text, reason_mask, start_time, end_time)
+        store = self.store
+        if matches is None:
+            total = indexed_rows
+            page = range(offset, min(offset + limit, total))
+        else:
+            total = len(matches)
+            page = matches[offset:offset + limit]
+        return total, [store.row(i) for i in page]
+
+LIFECYCLE_GAP = 60 * 10000000  # FILETIME ticks - a file's records further apart than a minute start a new lifecycle
+
+class LifecycleIndex:
+    """Per-file lifecycle summaries of an EntryStore, from one hash aggregation pass.
+
+    Rows are grouped on (drive, file reference). A lifecycle stays open while the
+    file's records keep coming within LIFECYCLE_GAP of each other and ends with its
+    FILE_DELETE, so one write storm of DATA_EXTEND / CLOSE / BASIC_INFO_CHANGE records
+    becomes one summary. First and last row and time, the OR of the reason masks and
+    the record count are kept per lifecycle in arrays, and the rows of a lifecycle are
+    chained through next_rows - drilling down walks only that lifecycle's records.
+    Rows appended to the store are aggregated on the next refresh.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.string_table = self.store.strings  # Replaced by EntryStore.clear(), tells a cleared store apart
+        self.indexed_rows = 0
+        self.open = {}  # (drive id, file ref) -> lifecycle still taking records
+        self.first_rows = array('I')
+        self.last_rows = array('I')
+        self.first_times = array('q')
+        self.last_times = array('q')
+        self.reasons = array('I')
+        self.counts = array('I')
+        self.row_lifecycles = array('I')  # row -> its lifecycle
+        self.next_rows = array('i')  # row -> next row of the same lifecycle, -1 for the last one
+        self.last_key = None
+        self.last_selection = None
+
+    def __len__(self):
+        return len(self.first_rows)
+
+    def refresh(self):
+        store = self.store
+        if store.strings is not self.string_table or len(store.drive_ids) < self.indexed_rows:
+            self.reset()
+        row_count = len(store.drive_ids)
+        start = self.indexed_rows
+        open_lifecycles = self.open
+        first_rows, last_rows, first_times, last_times, reasons, counts, row_lifecycles, next_rows = (
+            self.first_rows, self.last_rows, self.first_times, self.last_times, self.reasons, self.counts,
+            self.row_lifecycles, self.next_rows)
+
+        for i, (drive_id, file_ref, timestamp, reason) in enumerate(zip(
+                store.drive_ids[start:row_count], store.file_refs[start:row_count],
+                store.timestamps[start:row_count], store.reasons[start:row_count]), start):
+            key = (drive_id, file_ref)
+            lifecycle = open_lifecycles.get(key)
+            if lifecycle is None or timestamp - last_times[lifecycle] > LIFECYCLE_GAP:
+                lifecycle = open_lifecycles[key] = len(first_rows)
+                first_rows.append(i)
+                last_rows.append(i)
+                first_times.append(timestamp)
+                last_times.append(timestamp)
+                reasons.append(reason)
+                counts.append(1)
+            else:
+                next_rows[last_rows[lifecycle]] = i
+                last_rows[lifecycle] = i
+                last_times[lifecycle] = timestamp
+                reasons[lifecycle] |= reason
+                counts[lifecycle] += 1
+            row_lifecycles.append(lifecycle)
+            next_rows.append(-1)
+            if reason & 0x00000200:  # FILE_DELETE ends the file
+                del open_lifecycles[key]
+        self.indexed_rows = row_count
+
+    def select(self, matches, key):
+        """Sorted ids of the lifecycles with a row in matches, every lifecycle for None"""
+        with self.lock:
+            self.refresh()
+            if matches is None:
+                return range(len(self.first_rows))
+            if key != self.last_key:
+                row_lifecycles = self.row_lifecycles
+                self.last_selection = array('I', sorted({row_lifecycles[i] for i in matches}))
+                self.last_key = key
+            return self.last_selection
+
+    def rows(self, lifecycle):
+        """Row indices of one lifecycle in journal order"""
+        rows = []
+        row = self.first_rows[lifecycle]
+        while row >= 0:
+            rows.append(row)
+            row = self.next_rows[row]
+        return rows
+
+    def summary(self, lifecycle):
+        """The row dict of the lifecycle's last record, widened to the whole lifecycle"""
+        store = self.store
+        first = self.first_rows[lifecycle]
+        last = self.last_rows[lifecycle]
+        reason = self.reasons[lifecycle]
+        last_reason = store.reasons[last]
+        entry = store.row(last)
+
+        rename_chain = [store.name(first)]
+        if reason & 0x00002000:  # RENAME_NEW_NAME
+            for row in self.rows(lifecycle):
+                if store.reasons[row] & 0x00002000 and store.name(row) != rename_chain[-1]:
+                    rename_chain.append(store.name(row))
+
+        if last_reason & 0x00000200:
+            final_state = 'deleted'
+        elif reason & 0x00000100:
+            final_state = 'created'
+        elif len(rename_chain) > 1:
+            final_state = 'renamed'
+        else:
+            final_state = 'modified'
+
+        first_seen, last_seen = format_timestamps((self.first_times[lifecycle], self.last_times[lifecycle]))
+        entry.update({
+            'reason': format_reason(reason),
+            'originalName': rename_chain[0],
+            'isRename': len(rename_chain) > 1,
+            'lifecycle': lifecycle,
+            'recordCount': self.counts[lifecycle],
+            'firstSeen': first_seen,
+            'lastSeen': last_seen,
+            'renameChain': rename_chain,
+            'finalState': final_state,
+            'details': f"{self.counts[lifecycle]} records, {final_state}"
+        })
+        return entry
+
+TEMP_EXTENSIONS = ('.crdownload', '.tmp', '.part', '.dmg', '.iso', '.bak', '.old', '.temp')
+TEMP_SUFFIX = re.compile(r'\.(crdownload|tmp|part|dmg|iso|bak|old|temp)$', re.IGNORECASE)
+DOWNLOAD_WORDS = re.compile(r'[\s\-_.]*(downloading|downloaded|temp|temporary)[\s\-_.]*', re.IGNORECASE)
+UNCONFIRMED_NAME = re.compile(r'unconfirmed[\s\-]*\d+', re.IGNORECASE)
+DOWNLOAD_PAIR_WINDOW = 10 * 10000000  # FILETIME ticks - a completed name this soon after an unnamed download is deleted is paired with it
+
+def is_temp_name(name):
+    lower_name = name.lower()
+    return any(extension in lower_name for extension in TEMP_EXTENSIONS)
+
+def download_base_name(name):
+    """Name of a download with the temporary extension and markers removed, lower-cased, '' if nothing is left"""
+    base_name = TEMP_SUFFIX.sub('', name, count=1)
+    return UNCONFIRMED_NAME.sub('', DOWNLOAD_WORDS.sub('', base_name)).strip().lower()
+
+class LineageIndex:
+    """File reference and parent directory indexes of an EntryStore, for file histories.
+
+    The rows of every (drive, file reference) are chained through a next-row array
+    with the first and last row of each chain in a dict, so a file's history is read
+    by walking its own rows only. The rows of every (drive, parent directory) are
+    chained backwards the same way, newest first. Temporary download names
+    (.crdownload, .part ...) register their directory and base name, and a file
+    later showing up there under the completed name is paired with them. Names with
+    no base name left ("Unconfirmed 123.crdownload") are paired through the directory
+    chain instead: a file taking a completed name is paired with the most recently
+    deleted unnamed download among its folder's rows of the last DOWNLOAD_PAIR_WINDOW.
+    Rows are indexed when a drive's rows merge into the results, not per decoded
+    buffer, since only then do they have their result row numbers.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.string_table = self.store.strings  # Replaced by EntryStore.clear(), tells a cleared store apart
+        self.indexed_rows = 0
+        self.file_rows = {}  # (drive id, file ref) -> [first row, last row]
+        self.file_next = array('i')
+        self.directory_last = {}  # (drive id, parent ref) -> last row in the directory
+        self.directory_previous = array('i')  # row -> previous row in its directory, -1 for the first
+        self.downloads = {}  # (drive id, parent ref, base name) -> file keys of the temporary and completed files
+        self.unnamed_directories = set()  # (drive id, parent ref) of every deleted unnamed download
+        self.name_kinds = []  # string id -> download base name ('' when unnamed), None when it is not a temporary name
+        self.drive_ids = set()
+
+    def refresh(self):
+        store = self.store
+        if store.strings is not self.string_table or len(store.drive_ids) < self.indexed_rows:
+            self.reset()
+        row_count = len(store.drive_ids)
+        start = self.indexed_rows
+
+        self.drive_ids.update(set(store.drive_ids[start:row_count]))
+        name_kinds = self.name_kinds
+        for value in store.strings[len(name_kinds):]:
+            name_kinds.append(download_base_name(value) if is_temp_name(value) else None)
+
+        file_rows, file_next, directory_last, directory_previous, downloads = (
+            self.file_rows, self.file_next, self.directory_last, self.directory_previous, self.downloads)
+        for i, (drive_id, file_ref, parent_ref, name_id, timestamp, reason) in enumerate(zip(
+                store.drive_ids[start:row_count], store.file_refs[start:row_count],
+                store.parent_refs[start:row_count], store.name_ids[start:row_count],
+                store.timestamps[start:row_count], store.reasons[start:row_count]), start):
+            file_next.append(-1)
+            file_key = (drive_id, file_ref)
+            chain = file_rows.get(file_key)
+            if chain is None:
+                file_rows[file_key] = [i, i]
+            else:
+                file_next[chain[1]] = i
+                chain[1] = i
+            directory_key = (drive_id, parent_ref)
+            previous = directory_last.get(directory_key, -1)
+            directory_previous.append(previous)
+            directory_last[directory_key] = i
+
+            base_name = name_kinds[name_id]
+            if base_name is not None:
+                pair = downloads.setdefault((drive_id, parent_ref, base_name or store.strings[name_id].lower()), [])
+                if file_key not in pair:
+                    pair.append(file_key)
+                if not base_name and reason & 0x00000200:  # FILE_DELETE before taking a completed name
+                    self.unnamed_directories.add(directory_key)
+            elif downloads:
+                # A completed name next to a registered temporary one
+                name_key = (drive_id, parent_ref, store.strings[name_id].lower())
+                pair = downloads.get(name_key)
+                if pair is not None and file_key not in pair:
+                    pair.append(file_key)
+                if reason & 0x00002100:  # FILE_CREATE | RENAME_NEW_NAME
+                    unnamed_pair = self.deleted_unnamed_download(drive_id, parent_ref, previous, timestamp)
+                    if unnamed_pair is not None and file_key not in unnamed_pair:
+                        unnamed_pair.append(file_key)
+                        pair = downloads.setdefault(name_key, [file_key])
+                        pair.extend(key for key in unnamed_pair if key not in pair)
+        self.indexed_rows = row_count
+
+    def deleted_unnamed_download(self, drive_id, parent_ref, row, timestamp):
+        """File keys of the unnamed download deleted last in a directory before row, within the window and not paired yet"""
+        if (drive_id, parent_ref) not in self.unnamed_directories:
+            return None
+        store = self.store
+        strings, name_ids, reasons, timestamps = store.strings, store.name_ids, store.reasons, store.timestamps
+        name_kinds = self.name_kinds
+        directory_previous = self.directory_previous
+        while row >= 0 and timestamp - timestamps[row] <= DOWNLOAD_PAIR_WINDOW:
+            if reasons[row] & 0x00000200 and name_kinds[name_ids[row]] == '':  # FILE_DELETE of an unnamed download
+                pair = self.downloads[(drive_id, parent_ref, strings[name_ids[row]].lower())]
+                if len(pair) == 1:
+                    return pair
+            row = directory_previous[row]
+        return None
+
+    def chain(self, head, next_rows):
+        rows = []
+        row = head
+        while row >= 0:
+            rows.append(row)
+            row = next_rows[row]
+        return rows
+
+    def file_history(self, drive_id, file_ref):
+        """Rows of a file and of the downloads paired with it, in journal order"""
+        with self.lock:
+            self.refresh()
+            chain = self.file_rows.get((drive_id, file_ref))
+            if chain is None:
+                return []
+            rows = self.chain(chain[0], self.file_next)
+
+            store = self.store
+            paired = []
+            seen = {(drive_id, file_ref)}
+            for i in rows:
+                name = store.strings[store.name_ids[i]]
+                base_name = self.name_kinds[store.name_ids[i]] or name.lower()
+                for file_key in self.downloads.get((drive_id, store.parent_refs[i], base_name), ()):
+                    if file_key not in seen:
+                        seen.add(file_key)
+                        paired.append(self.chain(self.file_rows[file_key][0], self.file_next))
+        if not paired:
+            return rows
+        usns = store.usns
+        return list(heapq.merge(rows, *paired, key=usns.__getitem__))
+
+PATH_CHANGE_REASONS = 0x00000100 | 0x00000200 | 0x00002000  # FILE_CREATE | FILE_DELETE | RENAME_NEW_NAME
+MFT_SNAPSHOT_MAGIC = b'JTM1'
+MFT_SNAPSHOT_HEADER = struct.Struct('<4sQqQQ')
+
+class MftSnapshot:
+    """Compact on-disk copy of a volume's {file_ref: (parent_ref, name)} map.
+
+    Stored as two reference arrays and one NUL separated name blob, tagged with the
+    journal id and the USN the map is current at.
+    """
+
+    def __init__(self, journal_id, usn, parent_cache):
+        self.journal_id = journal_id
+        self.usn = usn
+        self.parent_cache = parent_cache
+
+    @staticmethod
+    def filename_for(serial):
+        return os.path.join(get_data_dir(), f"mft_{serial:08X}.jtm")
+
+    def is_valid_for(self, journal_info):
+        return (self.journal_id == journal_info['journal_id'] and
+                journal_info['lowest_valid_usn'] <= self.usn <= journal_info['next_usn'])
+
+    def save(self, filename):
+        refs = array('Q', self.parent_cache.keys())
+        parents = array('Q', [parent for parent, _ in self.parent_cache.values()])
+        names = '\0'.join([name for _, name in self.parent_cache.values()]).encode('utf-8', 'surrogatepass')
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(filename + '.tmp', 'wb') as f:
+            f.write(MFT_SNAPSHOT_HEADER.pack(MFT_SNAPSHOT_MAGIC, self.journal_id, self.usn, len(refs), len(names)))
+            refs.tofile(f)
+            parents.tofile(f)
+            f.write(names)
+        os.replace(filename + '.tmp', filename)
+
+    @classmethod
+    def load(cls, filename):
+        """Return the snapshot in filename, or None if it is missing or damaged"""
+        try:
+            with open(filename, 'rb') as f:
+                magic, journal_id, usn, count, names_size = MFT_SNAPSHOT_HEADER.unpack(f.read(MFT_SNAPSHOT_HEADER.size))
+                if magic != MFT_SNAPSHOT_MAGIC:
+                    return None
+                refs = array('Q')
+                refs.fromfile(f, count)
+                parents = array('Q')
+                parents.fromfile(f, count)
+                names = f.read(names_size).decode('utf-8', 'surrogatepass').split('\0') if count else []
+        except Exception:
+            return None
+        if len(names) != count:
+            return None
+        return cls(journal_id, usn, dict(zip(refs, zip(parents, names))))
+
+MFT_RECORD_HEADER = struct.Struct('<4sHHQHHHHIIQ')  # FILE record header up to the base record reference
+MFT_ATTRIBUTE_HEADER = struct.Struct('<IIB')  # type, length, non-resident flag
+MFT_SECTOR_SIZE = 512  # Stride of the update sequence fixups, whatever the disk's sector size
+MFT_CHUNK_RECORDS = 131072  # Records one worker parses per task, 128MB of 1KB records
+MFT_NAMES = ('$MFT', 'MFT', '$MFT.bin', 'MFT.bin')  # What collectors call the file
+FILE_NAME_ATTRIBUTE = 0x30
+END_OF_ATTRIBUTES = 0xFFFFFFFF
+DOS_NAMESPACE = 2  # 8.3 short names, only used when a file has no long name
+
+def read_file_names(record, start, attribute_offset, used, patched):
+    """(parent ref, name, namespace) of every resident $FILE_NAME of the FILE record at start.
+
+    An unpatched record is read in place as long as no field touches the last two bytes
+    of a sector - those hold the update sequence number - otherwise None says the
+    record needs its fixups applied first.
+    """
+    names = []
+    position = start + attribute_offset
+    end = start + used
+    while position + 16 <= end:
+        if not patched and (position - start + 24) // MFT_SECTOR_SIZE != (position - start) // MFT_SECTOR_SIZE:
+            return None
+        attribute_type, length, non_resident = MFT_ATTRIBUTE_HEADER.unpack_from(record, position)
+        if attribute_type == END_OF_ATTRIBUTES or length < 16 or attribute_type > FILE_NAME_ATTRIBUTE:
+            break  # Attributes are sorted by type, nothing after $FILE_NAME is needed
+        if attribute_type == FILE_NAME_ATTRIBUTE and not non_resident:
+            value = position + record[position + 20] + (record[position + 21] << 8)
+            name_end = value + 66 + 2 * record[value + 64] if value + 66 <= end else end + 1
+            if name_end > end:
+                break
+            if not patched and (name_end - start + 1) // MFT_SECTOR_SIZE != (value - start) // MFT_SECTOR_SIZE:
+                return None
+            parent_ref, = struct.unpack_from('<Q', record, value)
+            # Same decoding as the USN records, so both sides agree on odd names
+            names.append((parent_ref & 0xFFFFFFFFFFFF, codecs.utf_16_le_decode(record[value + 66:name_end], 'ignore')[0],
+                          record[value + 65]))
+        position += length
+    return names
+
+def read_mft_chunk(filename, record_size, first, last):
+    """Parse the FILE records [first, last) of a collected $MFT.
+
+    Returns (refs, parent refs, names joined by NUL, extensions) - arrays and one
+    string keep the result cheap to send back from a pool worker. Names found in
+    extension records go in extensions as (base ref, parent ref, name, is DOS name),
+    their base record can be in another chunk.
+    """
+    refs = array('Q')
+    parents = array('Q')
+    names = []
+    extensions = []
+    unpack_header = MFT_RECORD_HEADER.unpack_from
+    sectors = record_size // MFT_SECTOR_SIZE
+    # The last two bytes of every sector in one unpack, for the torn write check
+    sector_ends = struct.Struct('<' + f'{MFT_SECTOR_SIZE - 2}x2s' * sectors).unpack_from
+    with open(filename, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for index in range(first, min(last, len(mm) // record_size)):
+            offset = index * record_size
+            if mm[offset:offset + 4] != b'FILE':
+                continue  # Never used, or BAAD (failed a multi-sector transfer)
+            _, fixup_offset, fixup_count, _, _, _, attribute_offset, flags, used, _, base = unpack_header(mm, offset)
+            if not flags & 0x01 or used > record_size or fixup_count != sectors + 1:
+                continue  # Not in use - FSCTL_ENUM_USN_DATA leaves these out too
+            fixups = mm[offset + fixup_offset:offset + fixup_offset + 2 * fixup_count]
+            if sector_ends(mm, offset).count(fixups[:2]) != sectors:
+                continue  # Torn - a sector of the record was not written
+
+            file_names = read_file_names(mm, offset, attribute_offset, used, False)
+            if file_names is None:
+                # Every sector ends in the update sequence number, the real bytes are in the fixup array
+                record = bytearray(mm[offset:offset + record_size])
+                for n in range(1, sectors + 1):
+                    record[n * MFT_SECTOR_SIZE - 2:n * MFT_SECTOR_SIZE] = fixups[2 * n:2 * n + 2]
+                file_names = read_file_names(record, 0, attribute_offset, used, True)
+            if not file_names:
+                continue
+
+            if base:
+                extensions += [(base & 0xFFFFFFFFFFFF, parent_ref, name, namespace == DOS_NAMESPACE)
+                               for parent_ref, name, namespace in file_names]
+                continue
+            # Hard links keep the first long name, a DOS name only stands in for files without one
+            parent_ref, name, namespace = file_names[0]
+            if namespace == DOS_NAMESPACE:
+                for parent_ref, name, namespace in file_names:
+                    if namespace != DOS_NAMESPACE:
+                        break
+                else:
+                    parent_ref, name, namespace = file_names[0]
+            refs.append(index)
+            parents.append(parent_ref)
+            names.append(name)
+    return refs, parents, '\0'.join(names), extensions
+
+def read_mft_file(filename, workers=None):
+    """Parse a collected $MFT into {file_ref: (parent_ref, name)}, the map FSCTL_ENUM_USN_DATA gives live.
+
+    The file is memory-mapped and its records are parsed in chunks across a process
+    pool, every worker mapping the file itself. workers=1 parses in this process.
+    Update sequence fixups are only applied to records whose $FILE_NAME sits on a
+    sector end, the rest are read in place.
+    """
+    with open(filename, 'rb') as f:
+        header = f.read(MFT_RECORD_HEADER.size)
+        size = os.fstat(f.fileno()).st_size
+    if len(header) < MFT_RECORD_HEADER.size or header[:4] != b'FILE':
+        raise Exception(f"{filename} is not an $MFT")
+    record_size = MFT_RECORD_HEADER.unpack(header)[9]
+    if record_size < MFT_SECTOR_SIZE or record_size & (record_size - 1):
+        raise Exception(f"{filename} has an invalid record size ({record_size})")
+
+    count = size // record_size
+    chunks = [(filename, record_size, first, first + MFT_CHUNK_RECORDS) for first in range(0, count, MFT_CHUNK_RECORDS)]
+    workers = min(len(chunks), workers or CORPUS_WORKERS)
+    if workers > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(read_mft_chunk, *zip(*chunks)))
+    else:
+        parts = [read_mft_chunk(*chunk) for chunk in chunks]
+
+    parent_cache = {}
+    for refs, parents, names, _ in parts:
+        if refs:
+            parent_cache.update(zip(refs, zip(parents, names.split('\0'))))
+    # Names from extension records fill in files whose base record had none, or only a DOS name
+    short_names = set()
+    for _, _, _, extensions in parts:
+        for ref, parent_ref, name, is_dos in extensions:
+            if ref not in parent_cache or (ref in short_names and not is_dos):
+                parent_cache[ref] = (parent_ref, name)
+                if is_dos:
+                    short_names.add(ref)
+                else:
+                    short_names.discard(ref)
+    return parent_cache
+
+def find_mft_file(journal_path):
+    """The $MFT collected next to a $J - in its folder or a parent, as triage collectors lay them out"""
+    folder = os.path.dirname(os.path.abspath(journal_path))
+    for _ in range(3):
+        for name in MFT_NAMES:
+            candidate = os.path.join(folder, name)
+            if os.path.isfile(candidate) and candidate != os.path.abspath(journal_path):
+                return candidate
+        folder = os.path.dirname(folder)
+    return None
+
+COLLECTED_VOLUME = re.compile(r'(?:\\\\[.?]\\)?([a-z])[:$]?', re.IGNORECASE)  # C, C:, C$ or \\.\C: as a folder name
+
+def collected_drive_letter(journal_path, default='C'):
+    """Drive letter of the volume a $J was collected from - the folder holding its $Extend, or the $J itself"""
+    # Only the folders below the drive the collection sits on can name the volume
+    folders = re.split(r'[\\/]', ntpath.splitdrive(os.path.abspath(journal_path))[1])[:-1]
+    if len(folders) >= 2 and folders[-1].lower() == '$extend':
+        folder = folders[-2]
+    else:
+        folder = folders[-1] if folders else ''
+    match = COLLECTED_VOLUME.fullmatch(urllib.parse.unquote(folder))  # Velociraptor writes \\.\C: as %5C%5C.%5CC%3A
+    return match.group(1).upper() if match else default
+
+class ScanCheckpoints:
+    """Per-volume scan positions persisted between runs.
+
+    Only where to continue is kept - volume serial, journal id, next USN, the USN the
+    MFT snapshot is current at and the case the rows were written to. The rows read
+    so far are rebuilt from that case's segments, nothing is rewritten per scan.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or get_data_dir()
+        self.filename = os.path.join(self.directory, 'checkpoints.json')
+        self.lock = threading.Lock()
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                self.volumes = json.load(f)
+        except:
+            self.volumes = {}
+
+    def resume(self, serial, journal_info):
+        """Return (start_usn, saved EntryStore) for a volume, or (0, None) when a full read is needed"""
+        checkpoint = self.volumes.get(f"{serial:08X}")
+        if not checkpoint or 'case' not in checkpoint:
+            return 0, None
+        # A recreated journal or a checkpoint that the journal has wrapped past invalidates everything
+        if checkpoint['journal_id'] != journal_info['journal_id']:
+            return 0, None
+        if not journal_info['lowest_valid_usn'] <= checkpoint['next_usn'] <= journal_info['next_usn']:
+            return 0, None
+        try:
+            case = CaseStore.open(checkpoint['case'])
+        except:
+            # The case was pruned or deleted since
+            return 0, None
+        try:
+            saved = case.drive_rows(checkpoint['drive'], checkpoint['next_usn'])
+        finally:
+            case.close()
+        if len(saved) < checkpoint.get('rows', 0):
+            # The scan stopped before all of the volume's rows made it into the case
+            return 0, None
+        return checkpoint['next_usn'], saved
+
+    def update(self, serial, drive_letter, journal_id, next_usn, mft_usn, case_directory, rows):
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            self.volumes[f"{serial:08X}"] = {
+                'drive': drive_letter,
+                'journal_id': journal_id,
+                'next_usn': next_usn,
+                'mft_usn': mft_usn,
+                'case': case_directory,
+                'rows': rows,
+                'updated': datetime.now().isoformat()
+            }
+            with open(self.filename + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(self.volumes, f, indent=2)
+            os.replace(self.filename + '.tmp', self.filename)
+
+    def reset(self):
+        with self.lock:
+            self.volumes = {}
+            try:
+                os.remove(self.filename)
+            except OSError:
+                pass
+
+CASE_SEGMENT_MAGIC = b'JTG1'
+CASE_SEGMENT_HEADER = struct.Struct('<4sIqqqqII16x')  # magic, rows, min/max timestamp, min/max USN, OR of the reasons, strings used
+CASE_SEGMENT_ROWS = 1 << 20
+CASE_KEEP = 5  # Cases kept under the data folder, older ones are deleted when a new scan starts
+ENTRY_COLUMN_TYPES = {'usns': 'q', 'file_refs': 'Q', 'parent_refs': 'Q', 'timestamps': 'q',
+                      'reasons': 'I', 'attributes': 'I', 'name_ids': 'I', 'drive_ids': 'I'}
+
+class CaseSegment:
+    """One memory-mapped segment file of a CaseStore, its columns are views into the map"""
+
+    def __init__(self, filename, start):
+        self.filename = filename
+        self.start = start  # Case row index of the first row
+        with open(filename, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.rows, self.min_timestamp, self.max_timestamp, self.min_usn, self.max_usn,
+         self.reasons, self.string_count) = CASE_SEGMENT_HEADER.unpack_from(self.map, 0)
+        if magic != CASE_SEGMENT_MAGIC:
+            self.map.close()
+            raise Exception(f"{filename} is not a Journal Trace case segment")
+        self.view = memoryview(self.map)
+        self.raw = {}
+        self.columns = {}
+        offset = CASE_SEGMENT_HEADER.size
+        for column in ENTRY_COLUMNS:
+            size = array(ENTRY_COLUMN_TYPES[column]).itemsize * self.rows
+            self.raw[column] = self.view[offset:offset + size]
+            self.columns[column] = self.raw[column].cast(ENTRY_COLUMN_TYPES[column])
+            offset += size
+
+    def close(self):
+        for view in list(self.columns.values()) + list(self.raw.values()):
+            view.release()
+        self.view.release()
+        self.map.close()
+
+class CaseStore:
+    """Append-only, segmented on-disk copy of the entries of one case.
+
+    Entries are written in segments of up to CASE_SEGMENT_ROWS rows, one file each:
+    the EntryStore columns raw, behind a header summarising the segment - timestamp
+    and USN range and the OR of every reason mask. Names and drive letters are ids
+    into one case-wide string table that only grows, appended to strings.jts ahead
+    of the segments using them. Reopening maps the segment files instead of decoding
+    anything, and the summaries let a filter pass over whole segments that cannot
+    match without touching their rows.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.segments = []
+        self.rows = 0
+        self.strings = []
+        self.string_ids = {}
+        self.lower_strings = []
+        self.info = {}
+        self.lock = threading.Lock()
+        self.last_key = None
+        self.last_matches = None
+
+    @staticmethod
+    def cases_dir():
+        return os.path.join(get_data_dir(), 'cases')
+
+    @classmethod
+    def create(cls, directory=None):
+        """Start an empty case, by default a new folder under cases_dir()"""
+        if directory is None:
+            cls.prune(CASE_KEEP - 1)
+            directory = os.path.join(cls.cases_dir(), f"case_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}")
+        os.makedirs(directory, exist_ok=True)
+        return cls(directory)
+
+    @classmethod
+    def prune(cls, keep):
+        """Delete all but the newest keep cases"""
+        try:
+            cases = sorted(name for name in os.listdir(cls.cases_dir()) if name.startswith('case_'))
+        except OSError:
+            return
+        for name in cases[:max(0, len(cases) - keep)]:
+            # A case mapped by this process cannot go away on Windows, it is retried next time
+            shutil.rmtree(os.path.join(cls.cases_dir(), name), ignore_errors=True)
+
+    @classmethod
+    def open(cls, directory):
+        """Map the segments of an existing case"""
+        case = cls(directory)
+        try:
+            with open(os.path.join(directory, 'strings.jts'), 'rb') as f:
+                strings = f.read().decode('utf-8', 'surrogatepass').split('\0')[:-1]
+        except OSError:
+            raise Exception(f"{directory} is not a Journal Trace case")
+        case.strings = strings
+        case.string_ids = {value: i for i, value in enumerate(strings)}
+        try:
+            with open(os.path.join(directory, 'case.json'), 'r', encoding='utf-8') as f:
+                case.info = json.load(f)
+        except:
+            case.info = {}
+
+        for name in sorted(os.listdir(directory)):
+            if not (name.startswith('segment_') and name.endswith('.jtg')):
+                continue
+            segment = CaseSegment(os.path.join(directory, name), case.rows)
+            if segment.string_count > len(strings):
+                # Written after the last complete string append - an interrupted scan ends here
+                segment.close()
+                break
+            case.segments.append(segment)
+            case.rows += segment.rows
+        return case
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+        self.segments = []
+
+    def intern(self, value, new_strings):
+        string_id = self.string_ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings.append(value)
+            self.string_ids[value] = string_id
+            new_strings.append(value)
+        return string_id
+
+    def append(self, store, start=0, stop=None):
+        """Write the rows [start, stop) of a store as new segments"""
+        stop = len(store) if stop is None else min(stop, len(store))
+        if stop <= start:
+            return
+        with self.lock:
+            new_strings = []
+            remap = [self.intern(value, new_strings) for value in store.strings]
+            if new_strings:
+                with open(os.path.join(self.directory, 'strings.jts'), 'ab') as f:
+                    f.write(''.join(value + '\0' for value in new_strings).encode('utf-8', 'surrogatepass'))
+
+            self.write_segments(store, start, stop, remap)
+
+    def write_segments(self, store, start, stop, remap=None):
+        """Write the rows [start, stop) of a store as segment files, remap turns its string ids into case ids"""
+        for segment_start in range(start, stop, CASE_SEGMENT_ROWS):
+            segment_stop = min(stop, segment_start + CASE_SEGMENT_ROWS)
+            columns = {column: getattr(store, column)[segment_start:segment_stop] for column in ENTRY_COLUMNS}
+            if remap is not None:
+                columns['name_ids'] = array('I', [remap[i] for i in columns['name_ids']])
+                columns['drive_ids'] = array('I', [remap[i] for i in columns['drive_ids']])
+            reasons = 0
+            for reason in set(columns['reasons']):
+                reasons |= reason
+
+            filename = os.path.join(self.directory, f"segment_{len(self.segments):06d}.jtg")
+            with open(filename + '.tmp', 'wb') as f:
+                f.write(CASE_SEGMENT_HEADER.pack(CASE_SEGMENT_MAGIC, segment_stop - segment_start,
+                                                 min(columns['timestamps']), max(columns['timestamps']),
+                                                 min(columns['usns']), max(columns['usns']),
+                                                 reasons, len(self.strings)))
+                for column in ENTRY_COLUMNS:
+                    columns[column].tofile(f)
+            os.replace(filename + '.tmp', filename)
+            self.segments.append(CaseSegment(filename, self.rows))
+            self.rows += segment_stop - segment_start
+
+    def save_resolver(self, drive_letter, path_resolver, journal_id=0, usn=0):
+        """Keep a drive's MFT nodes with the case, so reopened rows get their paths back"""
+        MftSnapshot(journal_id, usn, path_resolver.nodes).save(os.path.join(self.directory, f"mft_{drive_letter}.jtm"))
+
+    def save_info(self, **info):
+        with self.lock:
+            self.info.update(info)
+            with open(os.path.join(self.directory, 'case.json.tmp'), 'w', encoding='utf-8') as f:
+                json.dump(self.info, f, indent=2)
+            os.replace(os.path.join(self.directory, 'case.json.tmp'), os.path.join(self.directory, 'case.json'))
+
+    def drive_rows(self, drive_letter, stop_usn):
+        """Copy one drive's rows below stop_usn into an EntryStore, the rows a checkpoint continues from"""
+        store = EntryStore()
+        store.strings = list(self.strings)
+        store.string_ids = dict(self.string_ids)
+        drive_id = self.string_ids.get(drive_letter)
+        if drive_id is None:
+            return store
+        for segment in self.segments:
+            if segment.min_usn >= stop_usn:
+                continue
+            columns = segment.columns
+            selectors = [row_drive == drive_id and usn < stop_usn
+                         for row_drive, usn in zip(columns['drive_ids'], columns['usns'])]
+            if all(selectors):
+                for column in ENTRY_COLUMNS:
+                    getattr(store, column).frombytes(segment.raw[column])
+                continue
+            for column in ENTRY_COLUMNS:
+                getattr(store, column).extend(itertools.compress(columns[column], selectors))
+        return store
+
+    def load(self, memory_budget=0):
+        """Copy the mapped columns into an EntryStore with the saved path resolvers attached.
+
+        A case bigger than memory_budget is not copied, the store reads it through the segment maps.
+        """
+        store = EntryStore(memory_budget)
+        spill = memory_budget and self.rows * ENTRY_ROW_BYTES > memory_budget
+        for column in ENTRY_COLUMNS:
+            values = getattr(store, column)
+            if spill:
+                values = SpilledColumn(values)
+                setattr(store, column, values)
+            for segment in self.segments:
+                if spill:
+                    values.spill(segment.columns[column], segment.raw[column])
+                else:
+                    values.frombytes(segment.raw[column])
+        store.strings = list(self.strings)
+        store.string_ids = dict(self.string_ids)
+        for name in os.listdir(self.directory):
+            if name.startswith('mft_') and name.endswith('.jtm'):
+                snapshot = MftSnapshot.load(os.path.join(self.directory, name))
+                if snapshot is not None:
+                    drive_letter = name[4:-4]
+                    store.resolvers[drive_letter] = PathResolver(drive_letter, snapshot.parent_cache)
+        return store
+
+    def oldest_timestamp(self):
+        timestamps = [segment.min_timestamp for segment in self.segments if segment.min_timestamp > 0]
+        if not timestamps:
+            return None
+        oldest = filetime_to_datetime(min(timestamps))
+        return oldest.isoformat() if oldest else None
+
+    def matches(self, text='', reason_mask=0, start_time=None, end_time=None):
+        """Case row indices matching every criterion, scanning only the segments whose summary allows a match.
+
+        Text is matched against names and USN prefixes, directory paths need the QueryEngine index.
+        """
+        text = (text or '').strip().lower()
+        key = (text, reason_mask, start_time, end_time, self.rows)
+        if key == self.last_key:
+            # Paging through the same query reuses the match array
+            return self.last_matches
+        low = start_time if start_time is not None else -2 ** 63
+        high = end_time if end_time is not None else 2 ** 63 - 1
+        name_ids = None
+        if text:
+            for value in self.strings[len(self.lower_strings):]:
+                self.lower_strings.append(value.lower())
+            name_ids = {i for i, value in enumerate(self.lower_strings) if text in value}
+            usn_text = text if text.isdigit() else None
+
+        rows = array('I')
+        for segment in self.segments:
+            if reason_mask and not segment.reasons & reason_mask:
+                continue
+            if segment.max_timestamp < low or segment.min_timestamp > high:
+                continue
+            start = segment.start
+            columns = segment.columns
+            if not text and not reason_mask and low <= segment.min_timestamp and segment.max_timestamp <= high:
+                rows.extend(range(start, start + segment.rows))
+                continue
+            candidates = range(segment.rows)
+            if text:
+                segment_names = columns['name_ids']
+                usns = columns['usns']
+                candidates = [i for i in candidates if segment_names[i] in name_ids or
+                              (usn_text is not None and str(usns[i]).startswith(usn_text))]
+            if reason_mask:
+                reasons = columns['reasons']
+                candidates = [i for i in candidates if reasons[i] & reason_mask]
+            if start_time is not None or end_time is not None:
+                timestamps = columns['timestamps']
+                candidates = [i for i in candidates if low <= timestamps[i] <= high]
+            rows.extend([start + i for i in candidates])
+        self.last_key = key
+        self.last_matches = rows
+        return rows
+
+class VolumeIoError(Exception):
+    """A failed volume call, error carries the Win32 error code"""
+
+    def __init__(self, error, message=None):
+        super().__init__(message or f"Volume I/O failed (Error {error})")
+        self.error = error
+
+class VolumeBackend(abc.ABC):
+    """Everything the scanner needs from the volumes, so the scan logic can run off Windows.
+
+    A handle is whatever open_volume returns. device_io_control fills output_buffer
+    (a ctypes buffer) and returns the byte count, failures raise VolumeIoError.
+    A backend missing one of the abstract methods cannot be created.
+    """
+
+    @abc.abstractmethod
+    def list_volumes(self):
+        """Drive dicts of the NTFS volumes, as shown in the UI"""
+
+    @abc.abstractmethod
+    def open_volume(self, drive_letter):
+        """A handle for device_io_control"""
+
+    def close_volume(self, handle):
+        pass
+
+    @abc.abstractmethod
+    def device_io_control(self, handle, control_code, input_buffer, output_buffer, output_size):
+        """Run one FSCTL, returns the bytes written to output_buffer"""
+
+class WindowsVolumeBackend(VolumeBackend):
+    """The live volumes through kernel32 and DeviceIoControl"""
+
+    def list_volumes(self):
+        drives = []
+        drive_bits = ctypes.windll.kernel32.GetLogicalDrives()
+        
+        for letter in string.ascii_uppercase:
+            if drive_bits & 1:
+                drive_path = f"{letter}:\\"
+                try:
+                    if os.path.exists(drive_path):
+                        fs_buffer = create_unicode_buffer(32)
+                        vol_buffer = create_unicode_buffer(256)
+                        serial = wintypes.DWORD()
+                        max_len = wintypes.DWORD()
+                        flags = wintypes.DWORD()
+                        
+                        if ctypes.windll.kernel32.GetVolumeInformationW(
+                            drive_path, vol_buffer, sizeof(vol_buffer),
+                            byref(serial), byref(max_len), byref(flags),
+                            fs_buffer, sizeof(fs_buffer)
+                        ):
+                            if fs_buffer.value.upper() == "NTFS":
+                                total = ctypes.c_ulonglong()
+                                free = ctypes.c_ulonglong()
+                                ctypes.windll.kernel32.GetDiskFreeSpaceExW(
+                                    drive_path, None, byref(total), byref(free)
+                                )
+                                
+                                drives.append({
+                                    'letter': letter,
+                                    'serial': serial.value,
+                                    'name': drive_path,
+                                    'label': vol_buffer.value or 'Local Disk',
+                                    'format': 'NTFS',
+                                    'root': drive_path,
+                                    'totalFree': f"{free.value / (1024**3):.1f}GB",
+                                    'totalSize': f"{total.value / (1024**3):.1f}GB",
+                                    'type': 'Fixed',
+                                    'isReady': True
+                                })
+                except:
+                    pass
+            drive_bits >>= 1
+        
+        return drives
+
+    def open_volume(self, drive_letter):
+        handle = ctypes.windll.kernel32.CreateFileW(
+            f"\\\\.\\{drive_letter}:",
+            GENERIC_READ,
+            FILE_SHARE_READ | FILE_SHARE_WRITE | FILE_SHARE_DELETE,
+            None,
+            OPEN_EXISTING,
+            0,
+            None
+        )
+        
+        if handle == INVALID_HANDLE_VALUE:
+            error = ctypes.windll.kernel32.GetLastError()
+            raise VolumeIoError(error, f"Could not open drive {drive_letter}: Error {error}")
+        return handle
+
+    def close_volume(self, handle):
+        ctypes.windll.kernel32.CloseHandle(handle)
+
+    def device_io_control(self, handle, control_code, input_buffer, output_buffer, output_size):
+        bytes_returned = wintypes.DWORD()
+        success = ctypes.windll.kernel32.DeviceIoControl(
+            handle, control_code, input_buffer, len(input_buffer) if input_buffer else 0,
+            output_buffer, output_size, ctypes.byref(bytes_returned), None
+        )
+        if not success:
+            raise VolumeIoError(ctypes.windll.kernel32.GetLastError())
+        return bytes_returned.value
+
+REPLAY_MAGIC = b'JTR1'
+REPLAY_ENTRY = struct.Struct('<1sIiII')  # drive letter, control code, error, input length, output length
+
+class RecordingVolumeBackend(VolumeBackend):
+    """Wraps another backend and keeps every IOCTL exchange for ReplayVolumeBackend"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.volumes = []
+        self.exchanges = []  # (drive letter, control code, error, input bytes, output bytes)
+        self.handles = {}
+        self.lock = threading.Lock()
+
+    def list_volumes(self):
+        self.volumes = self.backend.list_volumes()
+        return self.volumes
+
+    def open_volume(self, drive_letter):
+        handle = self.backend.open_volume(drive_letter)
+        self.handles[handle] = drive_letter
+        return handle
+
+    def close_volume(self, handle):
+        self.handles.pop(handle, None)
+        self.backend.close_volume(handle)
+
+    def device_io_control(self, handle, control_code, input_buffer, output_buffer, output_size):
+        drive_letter = self.handles[handle]
+        try:
+            length = self.backend.device_io_control(handle, control_code, input_buffer, output_buffer, output_size)
+        except VolumeIoError as e:
+            with self.lock:
+                self.exchanges.append((drive_letter, control_code, e.error, bytes(input_buffer or b''), b''))
+            raise
+        with self.lock:
+            self.exchanges.append((drive_letter, control_code, 0, bytes(input_buffer or b''),
+                                   ctypes.string_at(output_buffer, length)))
+        return length
+
+    def save(self, filename):
+        with self.lock:
+            header = json.dumps(self.volumes).encode('utf-8')
+            with open(filename, 'wb') as f:
+                f.write(REPLAY_MAGIC + struct.pack('<I', len(header)) + header)
+                for drive_letter, control_code, error, input_bytes, output_bytes in self.exchanges:
+                    f.write(REPLAY_ENTRY.pack(drive_letter.encode('ascii'), control_code, error,
+                                              len(input_bytes), len(output_bytes)))
+                    f.write(input_bytes)
+                    f.write(output_bytes)
+
+class ReplayVolumeBackend(VolumeBackend):
+    """Answers IOCTLs with buffers recorded by RecordingVolumeBackend.
+
+    Responses are looked up by (drive, control code, input bytes). Identical
+    requests get the recorded answers in order, the last one repeats once they
+    run out (a drained journal keeps returning just its header).
+    """
+
+    def __init__(self, volumes, exchanges):
+        self.volumes = volumes
+        self.responses = {}
+        for drive_letter, control_code, error, input_bytes, output_bytes in exchanges:
+            self.responses.setdefault((drive_letter, control_code, input_bytes), deque()).append((error, output_bytes))
+        self.handles = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename, 'rb') as f:
+            data = f.read()
+        if data[:4] != REPLAY_MAGIC:
+            raise Exception(f"{filename} is not a JournalTrace IOCTL recording")
+        header_length = struct.unpack_from('<I', data, 4)[0]
+        offset = 8 + header_length
+        volumes = json.loads(data[8:offset].decode('utf-8'))
+        exchanges = []
+        while offset < len(data):
+            drive_letter, control_code, error, input_length, output_length = REPLAY_ENTRY.unpack_from(data, offset)
+            offset += REPLAY_ENTRY.size
+            input_bytes = data[offset:offset + input_length]
+            offset += input_length
+            exchanges.append((drive_letter.decode('ascii'), control_code, error, input_bytes,
+                              data[offset:offset + output_length]))
+            offset += output_length
+        return cls(volumes, exchanges)
+
+    def list_volumes(self):
+        return list(self.volumes)
+
+    def open_volume(self, drive_letter):
+        if not any(drive_info['letter'] == drive_letter for drive_info in self.volumes):
+            raise VolumeIoError(2, f"Could not open drive {drive_letter}: Error 2")
+        with self.lock:
+            handle = len(self.handles) + 1
+            self.handles[handle] = drive_letter
+        return handle
+
+    def device_io_control(self, handle, control_code, input_buffer, output_buffer, output_size):
+        key = (self.handles[handle], control_code, bytes(input_buffer or b''))
+        with self.lock:
+            answers = self.responses.get(key)
+            if not answers:
+                raise VolumeIoError(38)  # ERROR_HANDLE_EOF - nothing was recorded past this point
+            error, output_bytes = answers.popleft() if len(answers) > 1 else answers[0]
+        if error:
+            raise VolumeIoError(error)
+        length = min(len(output_bytes), output_size)
+        ctypes.memmove(output_buffer, output_bytes, length)
+        return length
+
+class MemoryVolumeBackend(VolumeBackend):
+    """Serves volume images held in memory, as built by synthetic_journal.generate_volume.
+
+    An image provides letter, serial, label, journal_id, lowest_valid_usn,
+    next_usn, max_size, allocation_delta, mft_refs/mft_records (sorted file
+    references and their encoded records), journal/journal_usns/journal_start
+    (the concatenated USN_RECORD_V2 records, their USNs and the USN of the first
+    byte) and a changed condition. Requests are answered the way NTFS would,
+    for any buffer size.
+    """
+
+    def __init__(self, images):
+        self.images = {image.letter: image for image in images}
+        self.handles = {}
+        self.lock = threading.Lock()
+
+    def list_volumes(self):
+        return [{'letter': image.letter, 'serial': image.serial, 'name': f"{image.letter}:\\",
+                 'label': image.label, 'format': 'NTFS', 'root': f"{image.letter}:\\",
+                 'totalFree': '0.0GB', 'totalSize': '0.0GB', 'type': 'Fixed', 'isReady': True}
+                for image in self.images.values()]
+
+    def open_volume(self, drive_letter):
+        if drive_letter not in self.images:
+            raise VolumeIoError(2, f"Could not open drive {drive_letter}: Error 2")
+        with self.lock:
+            handle = len(self.handles) + 1
+            self.handles[handle] = self.images[drive_letter]
+        return handle
+
+    def device_io_control(self, handle, control_code, input_buffer, output_buffer, output_size):
+        image = self.handles[handle]
+        if control_code == FSCTL_QUERY_USN_JOURNAL:
+            data = struct.pack('<QqqqqQQ', image.journal_id, image.lowest_valid_usn, image.next_usn,
+                               image.lowest_valid_usn, 0x7FFFFFFFFFFF0000, image.max_size, image.allocation_delta)
+        elif control_code == FSCTL_ENUM_USN_DATA:
+            data = self.enumerate(image, input_buffer, output_size)
+        elif control_code == FSCTL_READ_USN_JOURNAL:
+            data = self.read_journal(image, input_buffer, output_size)
+        elif control_code == FSCTL_GET_NTFS_VOLUME_DATA:
+            mft_records = (image.mft_refs[-1] + 1) if len(image.mft_refs) else 0
+            data = NTFS_VOLUME_DATA.pack(image.serial, 0, 0, 0, 0, 512, 4096, 1024, 0, mft_records * 1024, 0, 0, 0, 0)
+        else:
+            raise VolumeIoError(1)  # ERROR_INVALID_FUNCTION
+        ctypes.memmove(output_buffer, data, len(data))
+        return len(data)
+
+    def enumerate(self, image, input_buffer, output_size):
+        start_ref = struct.unpack_from('<Q', input_buffer, 0)[0]
+        i = bisect.bisect_left(image.mft_refs, start_ref)
+        if i >= len(image.mft_refs):
+            raise VolumeIoError(38)  # ERROR_HANDLE_EOF
+        parts = []
+        used = 8
+        while i < len(image.mft_refs) and used + len(image.mft_records[i]) <= output_size:
+            parts.append(image.mft_records[i])
+            used += len(image.mft_records[i])
+            i += 1
+        next_ref = image.mft_refs[i] if i < len(image.mft_refs) else image.mft_refs[-1] + 1
+        return struct.pack('<Q', next_ref) + b''.join(parts)
+
+    def read_journal(self, image, input_buffer, output_size):
+        start_usn, reason_mask, return_only_on_close, timeout, bytes_to_wait_for, journal_id = \
+            struct.unpack_from('<qIIQQQ', input_buffer, 0)
+        if journal_id != image.journal_id:
+            raise VolumeIoError(1181)  # ERROR_JOURNAL_ENTRY_DELETED
+        if start_usn < image.lowest_valid_usn:
+            start_usn = image.lowest_valid_usn
+        if bytes_to_wait_for and start_usn >= image.next_usn:
+            # Block like NTFS does until new records arrive or the timeout passes
+            with image.changed:
+                image.changed.wait_for(lambda: image.next_usn > start_usn, timeout=timeout or None)
+
+        # Records are contiguous, the largest run that fits the buffer is one bisect away
+        usns = image.journal_usns
+        i = bisect.bisect_left(usns, start_usn)
+        base = usns[i] if i < len(usns) else image.next_usn
+        limit = base + output_size - 8
+        if image.next_usn <= limit:
+            stop = image.next_usn
+        else:
+            stop = usns[bisect.bisect_right(usns, limit) - 1]
+        chunk = image.journal[base - image.journal_start:stop - image.journal_start]
+
+        if reason_mask != 0xFFFFFFFF or return_only_on_close:
+            chunk = b''.join(filter_journal_records(chunk, reason_mask, return_only_on_close))
+        return struct.pack('<q', stop) + chunk
+
+def filter_journal_records(chunk, reason_mask, return_only_on_close):
+    """Yield the encoded records of chunk the kernel would return for this reason filter"""
+    offset = 0
+    while offset + USN_RECORD_V2.size <= len(chunk):
+        record_length = struct.unpack_from('<I', chunk, offset)[0]
+        if record_length == 0:
+            break
+        reason = struct.unpack_from('<I', chunk, offset + 40)[0]
+        if reason & reason_mask and (not return_only_on_close or reason & 0x80000000):
+            yield chunk[offset:offset + record_length]
+        offset += record_length
+
+SCAN_PROFILES = {
+    'all': {},
+    'deletes': {'reason_mask': 0x00000200},  # FILE_DELETE
+    'renames': {'reason_mask': 0x00001000 | 0x00002000},  # RENAME_OLD_NAME | RENAME_NEW_NAME
+    'creates': {'reason_mask': 0x00000100},  # FILE_CREATE
+    'closes': {'only_on_close': True},  # One summary record per closed file
+}
+
+class ScanProfile:
+    """What a journal read asks for.
+
+    reason_mask and only_on_close go into READ_USN_JOURNAL_DATA, so the kernel never
+    copies out the records a hunt does not need. path_prefix (a full path like
+    C:\\Users) and file_refs are applied by the decoder before records become rows,
+    drives limits the scan to those drive letters.
+    Anything but the complete profile skips the checkpoints, a filtered read is not a
+    base to resume from.
+    """
+
+    def __init__(self, reason_mask=0xFFFFFFFF, only_on_close=False, path_prefix=None, file_refs=None, drives=None):
+        self.reason_mask = reason_mask or 0xFFFFFFFF
+        self.only_on_close = bool(only_on_close)
+        self.path_prefix = path_prefix.replace('/', '\\').lower() if path_prefix else None
+        self.file_refs = {int(ref) & 0xFFFFFFFFFFFF for ref in file_refs} if file_refs else None
+        self.drives = {drive.strip(':\\').upper() for drive in drives} if drives else None
+
+    @classmethod
+    def from_options(cls, options):
+        """Profile from a SCAN_PROFILES name or a dict with reasonMask, onlyOnClose, pathPrefix, fileReferences and drives"""
+        if not options:
+            return cls()
+        if isinstance(options, str):
+            if options not in SCAN_PROFILES:
+                raise Exception(f"Unknown scan profile: {options}")
+            return cls(**SCAN_PROFILES[options])
+        return cls(int(options.get('reasonMask') or 0), options.get('onlyOnClose', False),
+                   options.get('pathPrefix'), options.get('fileReferences'), options.get('drives'))
+
+    @property
+    def is_complete(self):
+        return (self.reason_mask == 0xFFFFFFFF and not self.only_on_close and
+                self.path_prefix is None and self.file_refs is None)
+
+    def covers_drive(self, drive_letter):
+        if self.drives is not None and drive_letter.upper() not in self.drives:
+            return False
+        prefix = self.path_prefix
+        return not prefix or len(prefix) < 2 or prefix[1] != ':' or prefix[0] == drive_letter.lower()
+
+    def read_data(self, usn, journal_id, timeout=0, bytes_to_wait=0):
+        """READ_USN_JOURNAL_DATA_V0 for a read starting at usn"""
+        return struct.pack('<qIIQQQ', usn, self.reason_mask, 1 if self.only_on_close else 0,
+                           timeout, bytes_to_wait, journal_id)
+
+    def decoder(self, path_resolver=None):
+        """UsnRecordDecoder applying the reference and path filters, the path one needs the drive's resolver"""
+        path_filter = None
+        if self.path_prefix and path_resolver is not None:
+            path_filter = self.path_filter(path_resolver)
+        return UsnRecordDecoder(file_refs=self.file_refs, path_filter=path_filter)
+
+    def path_filter(self, path_resolver):
+        """Prefix test against the current directory tree, settled once per parent directory where possible"""
+        prefix = self.path_prefix
+        parents = {}  # parent ref -> True / False, or the directory path when the name decides
+
+        def keep(parent_ref, name):
+            state = parents.get(parent_ref)
+            if state is None:
+                base = ntpath.join(path_resolver.directory_path(parent_ref & 0xFFFFFFFFFFFF), '').lower()
+                if len(base) >= len(prefix):
+                    state = base.startswith(prefix)
+                else:
+                    state = base if prefix.startswith(base) else False
+                parents[parent_ref] = state
+            if state is True or state is False:
+                return state
+            return (state + name.lower()).startswith(prefix)
+        return keep
+
+EXPORT_FORMATS = {'csv': '.csv', 'jsonl': '.jsonl.gz', 'columns': '.jtc'}  # format -> default extension
+EXPORT_CSV_FIELDS = ('USN', 'Name', 'Path', 'Timestamp', 'Reason', 'IsDirectory', 'Attributes',
+                     'OriginalName', 'IsRename', 'RenameType', 'FileReference', 'ParentFileReference', 'Details')
+TIMELINE_CSV_FIELDS = ('Host', 'Drive') + EXPORT_CSV_FIELDS
+EXPORT_BATCH_ROWS = 65536
+EXPORT_QUEUE_BATCHES = 8  # Encoded batches waiting for the writer thread before formatting is held back
+EXPORT_COLUMNS_MAGIC = b'JTC1'
+EXPORT_COLUMNS = (('usn', 'q'), ('file_reference', 'Q'), ('parent_file_reference', 'Q'), ('timestamp', 'q'),
+                  ('reason', 'I'), ('attributes', 'I'), ('drive', 's'), ('name', 's'), ('path', 's'))
+EXPORT_COLUMN_ENTRY = struct.Struct('<32sc')  # column name, array typecode ('s' = UTF-8 strings)
+EXPORT_BLOCK_HEADER = struct.Struct('<I')  # rows in the block
+EXPORT_PATH_CACHE = 1 << 18  # Directory paths an export keeps before starting over, epochs only move forward in a journal
+
+class StreamingExporter:
+    """Writes entry stores to CSV, JSON Lines or a typed columnar file, one batch at a time.
+
+    Rows are filtered and formatted straight from the store's columns, the row dicts
+    of the UI are never built and nothing beyond a few batches is held in memory. The
+    encoded batches go through a bounded queue to a writer thread that does the gzip
+    compression and the file writes, so formatting one batch overlaps compressing the
+    previous one. A filename ending in .gz is compressed whatever the format.
+
+    The columnar format (.jtc) is the magic, a column count and (name, typecode) for
+    every column of EXPORT_COLUMNS, followed by blocks of a row count and each column
+    in order: numbers as raw little-endian arrays, strings as rows + 1 'I' offsets into
+    a UTF-8 blob.
+
+    filename can also be an open binary file such as sys.stdout.buffer, it is
+    written uncompressed and left open. A timeline exporter takes merged corpus
+    records through write_timeline() instead of stores, with a host column in front.
+    """
+
+    def __init__(self, filename, fmt='csv', reason_mask=0, start_time=None, end_time=None, path_prefix=None,
+                 timeline=False, batch_rows=EXPORT_BATCH_ROWS):
+        if fmt not in EXPORT_FORMATS:
+            raise Exception(f"Unknown export format: {fmt}")
+        if timeline and fmt == 'columns':
+            raise Exception("Timelines export to csv or jsonl")
+        self.filename = filename
+        self.fmt = fmt
+        self.owns_file = not hasattr(filename, 'write')
+        self.compress = self.owns_file and filename.lower().endswith('.gz')
+        self.reason_mask = reason_mask
+        self.start_time = start_time
+        self.end_time = end_time
+        self.path_prefix = path_prefix.replace('/', '\\').lower() if path_prefix else None
+        self.batch_rows = batch_rows
+        self.directories = {}  # (drive id, parent ref, history epoch) -> directory path ending in a separator
+        self.count = 0
+        self.error = None
+        self.pending = queue.Queue(maxsize=EXPORT_QUEUE_BATCHES)
+        self.file = open(filename, 'wb') if self.owns_file else filename
+        self.writer = threading.Thread(target=self.write_loop, daemon=True)
+        self.writer.start()
+
+        if fmt == 'csv':
+            self.put(self.encode_csv([TIMELINE_CSV_FIELDS if timeline else EXPORT_CSV_FIELDS]))
+        elif fmt == 'columns':
+            header = [EXPORT_COLUMNS_MAGIC, EXPORT_BLOCK_HEADER.pack(len(EXPORT_COLUMNS))]
+            header += [EXPORT_COLUMN_ENTRY.pack(name.encode('ascii'), typecode.encode('ascii'))
+                       for name, typecode in EXPORT_COLUMNS]
+            self.put(b''.join(header))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def put(self, data):
+        if self.error is not None:
+            raise self.error
+        self.pending.put(data)  # Blocks while the writer thread is behind
+
+    def write_loop(self):
+        """Writer thread - compresses and writes the encoded batches until close()"""
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if self.compress else None  # wbits 31 = gzip container
+        try:
+            while True:
+                data = self.pending.get()
+                if data is None:
+                    break
+                self.file.write(compressor.compress(data) if compressor else data)
+            if compressor:
+                self.file.write(compressor.flush())
+        except Exception as e:
+            self.error = e
+            # Keep draining so the formatting side never blocks on a dead writer
+            while self.pending.get() is not None:
+                pass
+        finally:
+            if self.owns_file:
+                self.file.close()
+            else:
+                self.file.flush()
+
+    def close(self):
+        """Flush the queue, wait for the writer thread and return the number of rows written"""
+        if self.writer.is_alive():
+            self.pending.put(None)
+            self.writer.join()
+        if self.error is not None:
+            raise self.error
+        return self.count
+
+    def select(self, store, start, stop):
+        """Indices in [start, stop) passing the reason and time filters"""
+        indices = range(start, stop)
+        if self.reason_mask:
+            reasons = store.reasons
+            mask = self.reason_mask
+            indices = [i for i in indices if reasons[i] & mask]
+        if self.start_time is not None or self.end_time is not None:
+            timestamps = store.timestamps
+            low = self.start_time if self.start_time is not None else -(1 << 63)
+            high = self.end_time if self.end_time is not None else (1 << 63) - 1
+            indices = [i for i in indices if low <= timestamps[i] <= high]
+        return indices
+
+    def write(self, store, start=0, stop=None):
+        """Export the rows [start, stop) of a store - the scan results or one decoded chunk"""
+        stop = len(store) if stop is None else min(stop, len(store))
+        encode = {'csv': self.encode_csv_rows, 'jsonl': self.encode_jsonl_rows, 'columns': self.encode_column_block}[self.fmt]
+        for batch_start in range(start, stop, self.batch_rows):
+            indices = self.select(store, batch_start, min(stop, batch_start + self.batch_rows))
+            paths = self.paths(store, indices)
+            if self.path_prefix:
+                prefix = self.path_prefix
+                kept = [(i, path) for i, path in zip(indices, paths) if path.lower().startswith(prefix)]
+                indices = [i for i, _ in kept]
+                paths = [path for _, path in kept]
+            if indices:
+                self.put(encode(store, indices, paths))
+                self.count += len(indices)
+        return self.count
+
+    def write_timeline(self, records, hosts):
+        """Export merged corpus records - (timestamp, part, sequence, block, row) tuples - tagged with hosts[part]"""
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) == self.batch_rows:
+                self.put_timeline(batch, hosts)
+                batch = []
+        if batch:
+            self.put_timeline(batch, hosts)
+        return self.count
+
+    def put_timeline(self, batch, hosts):
+        low = self.start_time if self.start_time is not None else -(1 << 63)
+        high = self.end_time if self.end_time is not None else (1 << 63) - 1
+        mask = self.reason_mask
+        prefix = self.path_prefix
+        rows = [(hosts[part], block, i) for timestamp, part, _, block, i in batch
+                if low <= timestamp <= high and (not mask or block['reason'][i] & mask)
+                and (not prefix or block['path'][i].lower().startswith(prefix))]
+        if not rows:
+            return
+        timestamps = format_timestamps([block['timestamp'][i] for _, block, i in rows])
+        if self.fmt == 'csv':
+            lines = []
+            for (host, block, i), ts in zip(rows, timestamps):
+                name = block['name'][i]
+                reason = block['reason'][i]
+                file_attributes = block['attributes'][i]
+                lines.append((host, block['drive'][i], block['usn'][i], name, block['path'][i], ts or '', format_reason(reason),
+                              bool(file_attributes & 0x10), format_attributes(file_attributes), name, bool(reason & 0x3000),
+                              'old' if (reason & 0x1000) else ('new' if (reason & 0x2000) else 'none'),
+                              block['file_reference'][i], block['parent_file_reference'][i], ''))
+            data = self.encode_csv(lines)
+        else:
+            quote = json.encoder.encode_basestring
+            lines = []
+            for (host, block, i), ts in zip(rows, timestamps):
+                reason = block['reason'][i]
+                file_attributes = block['attributes'][i]
+                lines.append(f'{{"host":{quote(host)},"usn":{block["usn"][i]},"drive":{quote(block["drive"][i])},'
+                             f'"name":{quote(block["name"][i])},"path":{quote(block["path"][i])},'
+                             f'"timestamp":{quote(ts) if ts else "null"},"reason":{quote(format_reason(reason))},'
+                             f'"reasonMask":{reason},"isDirectory":{"true" if file_attributes & 0x10 else "false"},'
+                             f'"attributes":{quote(format_attributes(file_attributes))},'
+                             f'"fileReference":{block["file_reference"][i]},'
+                             f'"parentFileReference":{block["parent_file_reference"][i]}}}\n')
+            data = ''.join(lines).encode('utf-8', 'surrogatepass')
+        self.put(data)
+        self.count += len(rows)
+
+    def paths(self, store, indices):
+        """Paths of the rows as build_path gives them, each directory resolved once per history epoch"""
+        strings = store.strings
+        drive_ids, parent_refs, name_ids, usns = store.drive_ids, store.parent_refs, store.name_ids, store.usns
+        directories = self.directories
+        if len(directories) > EXPORT_PATH_CACHE:
+            directories.clear()
+        volumes = {}  # drive id -> (root, resolver, history)
+        paths = []
+        append = paths.append
+        for i in indices:
+            drive_id = drive_ids[i]
+            volume = volumes.get(drive_id)
+            if volume is None:
+                drive_letter = strings[drive_id]
+                resolver = store.resolvers.get(drive_letter)
+                volume = volumes[drive_id] = (f"{drive_letter}:\\", resolver, resolver and resolver.history)
+            root, resolver, history = volume
+            if resolver is None:
+                append(root + strings[name_ids[i]])
+                continue
+            parent_ref = parent_refs[i] & 0xFFFFFFFFFFFF
+            usn = usns[i]
+            key = (drive_id, parent_ref, history.epoch(usn) if history is not None else -1)
+            directory = directories.get(key)
+            if directory is None:
+                directory = resolver.directory_path_at(parent_ref, usn) if history is not None else resolver.directory_path(parent_ref)
+                if not directory.endswith('\\'):
+                    directory += '\\'
+                directories[key] = directory
+            append(directory + strings[name_ids[i]])
+        return paths
+
+    @staticmethod
+    def encode_csv(rows):
+        text = io.StringIO()
+        csv.writer(text).writerows(rows)
+        return text.getvalue().encode('utf-8')
+
+    def encode_csv_rows(self, store, indices, paths):
+        strings = store.strings
+        timestamps = format_timestamps([store.timestamps[i] for i in indices])
+        rows = []
+        append = rows.append
+        for i, path, ts in zip(indices, paths, timestamps):
+            name = strings[store.name_ids[i]]
+            reason = store.reasons[i]
+            file_attributes = store.attributes[i]
+            append((store.usns[i], name, path, ts or '', format_reason(reason),
+                    bool(file_attributes & 0x10), format_attributes(file_attributes), name, bool(reason & 0x3000),
+                    'old' if (reason & 0x1000) else ('new' if (reason & 0x2000) else 'none'),
+                    store.file_refs[i], store.parent_refs[i], ''))
+        return self.encode_csv(rows)
+
+    def encode_jsonl_rows(self, store, indices, paths):
+        strings = store.strings
+        quote = json.encoder.encode_basestring
+        timestamps = format_timestamps([store.timestamps[i] for i in indices])
+        lines = []
+        append = lines.append
+        for i, path, ts in zip(indices, paths, timestamps):
+            reason = store.reasons[i]
+            file_attributes = store.attributes[i]
+            append(f'{{"usn":{store.usns[i]},"drive":{quote(strings[store.drive_ids[i]])},'
+                   f'"name":{quote(strings[store.name_ids[i]])},"path":{quote(path)},'
+                   f'"timestamp":{quote(ts) if ts else "null"},"reason":{quote(format_reason(reason))},'
+                   f'"reasonMask":{reason},"isDirectory":{"true" if file_attributes & 0x10 else "false"},'
+                   f'"attributes":{quote(format_attributes(file_attributes))},'
+                   f'"fileReference":{store.file_refs[i]},"parentFileReference":{store.parent_refs[i]}}}\n')
+        return ''.join(lines).encode('utf-8', 'surrogatepass')
+
+    def encode_column_block(self, store, indices, paths):
+        strings = store.strings
+        parts = [EXPORT_BLOCK_HEADER.pack(len(indices))]
+        for column in ('usns', 'file_refs', 'parent_refs', 'timestamps', 'reasons', 'attributes'):
+            values = getattr(store, column)
+            data = array(values.typecode, [values[i] for i in indices])
+            if sys.byteorder == 'big':
+                data.byteswap()
+            parts.append(data.tobytes())
+        for column in ([strings[store.drive_ids[i]] for i in indices],
+                       [strings[store.name_ids[i]] for i in indices], paths):
+            encoded = [value.encode('utf-8', 'surrogatepass') for value in column]
+            offsets = array('I', [0])
+            total = 0
+            for value in encoded:
+                total += len(value)
+                offsets.append(total)
+            if sys.byteorder == 'big':
+                offsets.byteswap()
+            parts.append(offsets.tobytes())
+            parts.append(b''.join(encoded))
+        return b''.join(parts)
+
+    @staticmethod
+    def read_columns(filename):
+        """Yield the blocks of a columnar export as {column name: array or list of strings}"""
+        opener = gzip.open if filename.lower().endswith('.gz') else open
+        with opener(filename, 'rb') as f:
+            if f.read(len(EXPORT_COLUMNS_MAGIC)) != EXPORT_COLUMNS_MAGIC:
+                raise Exception(f"{filename} is not a Journal Trace columnar export")
+            count, = EXPORT_BLOCK_HEADER.unpack(f.read(EXPORT_BLOCK_HEADER.size))
+            columns = []
+            for _ in range(count):
+                name, typecode = EXPORT_COLUMN_ENTRY.unpack(f.read(EXPORT_COLUMN_ENTRY.size))
+                columns.append((name.rstrip(b'\0').decode('ascii'), typecode.decode('ascii')))
+            while True:
+                header = f.read(EXPORT_BLOCK_HEADER.size)
+                if len(header) < EXPORT_BLOCK_HEADER.size:
+                    return
+                rows, = EXPORT_BLOCK_HEADER.unpack(header)
+                block = {}
+                for name, typecode in columns:
+                    if typecode == 's':
+                        offsets = array('I')
+                        offsets.frombytes(f.read(4 * (rows + 1)))
+                        if sys.byteorder == 'big':
+                            offsets.byteswap()
+                        blob = f.read(offsets[-1])
+                        block[name] = [blob[offsets[i]:offsets[i + 1]].decode('utf-8', 'surrogatepass') for i in range(rows)]
+                    else:
+                        values = array(typecode)
+                        values.frombytes(f.read(values.itemsize * rows))
+                        if sys.byteorder == 'big':
+                            values.byteswap()
+                        block[name] = values
+                yield block
+
+DEFAULT_DECODE_WORKERS = 4  # Decode threads - they overlap the IOCTL waits, not each other
+DEFAULT_PIPELINE_DEPTH = 3  # IOCTL buffers per volume that can be in flight or decoding at once
+
+MONITOR_WAIT_BYTES = 4096  # BytesToWaitFor - the read blocks in the kernel until this much journal data exists
+MONITOR_TIMEOUT = 2  # Seconds a blocking read waits before returning what is there, bounds how long stopping takes
+MONITOR_FLUSH_INTERVAL = 0.5  # Deltas arriving within this window reach the UI as one update
+MONITOR_QUEUE_BATCHES = 64  # Decoded buffers waiting for the flush thread before the readers are held back
+PROGRESS_INTERVAL = 0.5  # Seconds between progress updates to the UI
+SCAN_METRICS_LOG = 'scan_metrics.jsonl'  # One JSON line per finished scan, in the data folder
+NTFS_VOLUME_DATA = struct.Struct('<QqqqqIIIIqqqqq')  # NTFS_VOLUME_DATA_BUFFER
+
+class ScanMetrics:
+    """Timers, throughput counters and progress of one scan, shared by its worker threads.
+
+    Phase timers sum the seconds spent in each phase on every thread - volume IOCTLs,
+    decoding, MFT indexing, directory histories, case writes, row pages, exports and
+    the evaluate_js transfer - so together they can exceed the wall-clock time.
+    Progress of a drive is the share of its journal's USN range read and of its MFT
+    reference range enumerated. With profiling on, every thread doing scan work
+    runs under its own cProfile.Profile and dump_profile merges them.
+    """
+
+    def __init__(self, profiling=False):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.finished = None
+        self.seconds = {}  # phase -> seconds, summed over threads
+        self.calls = {}  # phase -> times it ran
+        self.counters = {}  # name -> running total (bytes, records, cache hits ...)
+        self.progress = {}  # (drive letter, stage) -> fraction done
+        self.profiling = profiling
+        self.profiles = []
+        self.local = threading.local()
+
+    @contextlib.contextmanager
+    def timer(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(phase, time.perf_counter() - start)
+
+    def add_time(self, phase, seconds):
+        with self.lock:
+            self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds
+            self.calls[phase] = self.calls.get(phase, 0) + 1
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_progress(self, drive_letter, stage, position, low, high):
+        """Record how far a stage is through its [low, high) range"""
+        fraction = 1.0 if high <= low else min(1.0, max(0.0, (position - low) / (high - low)))
+        with self.lock:
+            self.progress[(drive_letter, stage)] = fraction
+
+    def percent(self, start=10, stop=90):
+        """Progress over every stage of every drive, scaled into [start, stop]"""
+        with self.lock:
+            fractions = list(self.progress.values())
+        done = sum(fractions) / len(fractions) if fractions else 0.0
+        return int(start + (stop - start) * done)
+
+    def profiled(self, function):
+        """Wrap function so it runs under its thread's profile, when profiling is on"""
+        if not self.profiling:
+            return function
+
+        def run(*args, **kwargs):
+            if getattr(self.local, 'active', False):
+                return function(*args, **kwargs)
+            profile = getattr(self.local, 'profile', None)
+            if profile is None:
+                profile = self.local.profile = cProfile.Profile()
+                with self.lock:
+                    self.profiles.append(profile)
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler owns the interpreter (Python 3.12+ allows only one)
+                return function(*args, **kwargs)
+            self.local.active = True
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profile.disable()
+                self.local.active = False
+        return run
+
+    def dump_profile(self, filename):
+        """Write the merged profiles of all threads as a pstats file"""
+        with self.lock:
+            profiles = list(self.profiles)
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(filename)
+        return filename
+
+    def snapshot(self, resolvers=()):
+        """The metrics as a dict for the UI and the log"""
+        with self.lock:
+            seconds = dict(self.seconds)
+            calls = dict(self.calls)
+            counters = dict(self.counters)
+            progress = dict(self.progress)
+        elapsed = (self.finished or time.time()) - self.started
+        for resolver in resolvers:
+            counters['path_cache_hits'] = counters.get('path_cache_hits', 0) + resolver.cache_hits
+            counters['path_cache_misses'] = counters.get('path_cache_misses', 0) + resolver.cache_misses
+
+        def rate(count, phase):
+            busy = seconds.get(phase) or elapsed
+            return round(counters.get(count, 0) / busy, 1) if busy else 0.0
+
+        def hit_rate(hits, misses):
+            total = counters.get(hits, 0) + counters.get(misses, 0)
+            return round(counters.get(hits, 0) / total, 4) if total else None
+
+        drives = {}
+        for (drive_letter, stage), fraction in progress.items():
+            drives.setdefault(drive_letter, {})[stage] = round(fraction, 4)
+        return {
+            'running': self.finished is None,
+            'elapsed': round(elapsed, 3),
+            'percent': self.percent(0, 100),
+            'phases': {phase: {'seconds': round(value, 4), 'calls': calls.get(phase, 0)}
+                       for phase, value in sorted(seconds.items())},
+            'counters': counters,
+            'rates': {
+                'journalRecordsPerSec': rate('journal_records', 'decode'),
+                'journalBytesPerSec': rate('journal_bytes', 'journal_ioctl'),
+                'mftRecordsPerSec': rate('mft_records', 'mft_index'),
+                'mftBytesPerSec': rate('mft_bytes', 'mft_ioctl'),
+                'exportRowsPerSec': rate('export_rows', 'export'),
+            },
+            'cacheHitRates': {
+                'pathCache': hit_rate('path_cache_hits', 'path_cache_misses'),
+                'mftSnapshot': hit_rate('mft_snapshot_hits', 'mft_snapshot_misses'),
+                'checkpoint': hit_rate('checkpoint_hits', 'checkpoint_misses'),
+            },
+            'drives': drives,
+        }
+
+def show_error(window, message):
+    """Report an error - to the window's show_error callback if it has one, else the UI's showError()"""
+    if hasattr(window, 'show_error'):
+        window.show_error(message)
+    else:
+        window.evaluate_js(f"showError({json.dumps(message)});")
+
+class MeteredWindow:
+    """A pywebview window whose evaluate_js calls are timed into ScanMetrics"""
+
+    def __init__(self, window, metrics):
+        self.window = window
+        self.metrics = metrics
+
+    def evaluate_js(self, script):
+        start = time.perf_counter()
+        try:
+            return self.window.evaluate_js(script)
+        finally:
+            self.metrics.add_time('ui', time.perf_counter() - start)
+            self.metrics.count('ui_bytes', len(script))
+
+    def __getattr__(self, name):
+        return getattr(self.window, name)
+
+
+DEFAULT_MEMORY_BUDGET = 2 << 30  # Bytes of journal rows kept in memory, the rest spills to disk - 0 keeps everything
+
+class JournalScanner:
+    def __init__(self, scan_workers=None, decode_workers=DEFAULT_DECODE_WORKERS, pipeline_depth=DEFAULT_PIPELINE_DEPTH,
+                 backend=None, memory_budget=DEFAULT_MEMORY_BUDGET, profile_output=None):
+        if backend is None:
+            backend = WindowsVolumeBackend()
+        elif not isinstance(backend, VolumeBackend):
+            raise TypeError(f"backend must be a VolumeBackend, not {type(backend).__name__}")
+        self.backend = backend
+        # Half of the budget is the result set's, the other half is shared by the drives being read
+        self.memory_budget = memory_budget
+        self.drive_budget = memory_budget // 2
+        self.results = EntryStore(memory_budget // 2)
+        self.results_lock = threading.Lock()
+        self.query_engine = QueryEngine(self.results)
+        self.lifecycles = LifecycleIndex(self.results)
+        self.lineage = LineageIndex(self.results)
+        self.is_scanning = False
+        self.scan_workers = scan_workers  # Volumes scanned at once, None means all of them
+        self.decode_workers = decode_workers
+        self.pipeline_depth = max(1, pipeline_depth)
+        self.decode_pool = None
+        self.drive_handles = {}  # (drive letter, thread id) -> volume handle
+        self.file_ref_to_path = {}  # Cache for path resolution
+        self.checkpoints = ScanCheckpoints()
+        self.next_usns = {}  # Where the last journal read stopped, per drive
+        self.mft_usns = {}  # USN the drive's MFT snapshot is current at
+        self.is_monitoring = False
+        self.monitor_deltas = None
+        self.case = None  # CaseStore the results are written to, or were reopened from
+        self.save_cases = True  # Scans write a case, headless runs can do without
+        self.index_results = True  # Merged rows are indexed for queries and file histories, headless runs can do without
+        self.case_indexing = False  # A reopened case is answered from its segments until the index is built
+        self.profile = ScanProfile()  # Filters of the last scan, monitoring keeps them
+        self.profile_output = profile_output  # pstats file every scan is profiled into, None to not profile
+        self.metrics = ScanMetrics()
+        
+    def get_reason_string(self, reason_mask):
+        return format_reason(reason_mask)
+    
+    def get_file_attributes_string(self, attributes):
+        return format_attributes(attributes)
+    
+    def filetime_to_datetime(self, filetime):
+        return filetime_to_datetime(filetime)
+    
+    def get_drive_handle(self, drive_letter):
+        # Synchronous I/O on one handle is serialized, so every worker thread opens its own
+        key = (drive_letter, threading.get_ident())
+        if key in self.drive_handles:
+            return self.drive_handles[key]
+        
+        handle = self.backend.open_volume(drive_letter)
+        self.drive_handles[key] = handle
+        return handle
+    
+    def close_drive_handles(self):
+        for key in list(self.drive_handles):
+            self.backend.close_volume(self.drive_handles.pop(key))
+    
+    def query_usn_journal(self, drive_letter):
+        handle = self.get_drive_handle(drive_letter)
+        output_buffer = ctypes.create_string_buffer(56)
+        
+        try:
+            self.backend.device_io_control(handle, FSCTL_QUERY_USN_JOURNAL, None, output_buffer, 56)
+        except VolumeIoError as e:
+            if e.error == 5:
+                raise Exception("Access Denied - Run as Administrator!")
+            elif e.error == 1179:
+                raise Exception("USN Journal not active on this drive")
+            raise Exception(f"Failed to query USN Journal (Error {e.error})")
+        
+        data = output_buffer.raw
+        return {
+            'journal_id': struct.unpack('<Q', data[0:8])[0],
+            'first_usn': struct.unpack('<q', data[8:16])[0],
+            'next_usn': struct.unpack('<q', data[16:24])[0],
+            'lowest_valid_usn': struct.unpack('<q', data[24:32])[0],
+            'max_usn': struct.unpack('<q', data[32:40])[0],
+            'max_size': struct.unpack('<Q', data[40:48])[0],
+            'allocation_delta': struct.unpack('<Q', data[48:56])[0]
+        }
+    
+    def query_mft_records(self, drive_letter):
+        """Number of file records the MFT holds, from FSCTL_GET_NTFS_VOLUME_DATA - None when unavailable"""
+        handle = self.get_drive_handle(drive_letter)
+        output_buffer = ctypes.create_string_buffer(NTFS_VOLUME_DATA.size)
+        try:
+            self.backend.device_io_control(handle, FSCTL_GET_NTFS_VOLUME_DATA, None, output_buffer, NTFS_VOLUME_DATA.size)
+        except Exception:
+            return None
+        fields = NTFS_VOLUME_DATA.unpack(output_buffer.raw)
+        bytes_per_record = fields[7]
+        return fields[9] // bytes_per_record if bytes_per_record else None
+
+    def build_mft_path_cache(self, drive_letter, window=None, serial=None):
+        """Build a PathResolver for the volume from the MFT's (parent_ref, name) map.
+
+        With a volume serial the (parent_ref, name) map is loaded from the saved
+        snapshot and rolled forward from the journal, the MFT is only walked when
+        there is no usable snapshot.
+        """
+        journal_info = self.query_usn_journal(drive_letter)
+        parent_cache = None
+        metrics = self.metrics
+        start = time.perf_counter()
+        
+        if serial is not None:
+            snapshot_file = MftSnapshot.filename_for(serial)
+            snapshot = MftSnapshot.load(snapshot_file)
+            if snapshot and snapshot.is_valid_for(journal_info):
+                parent_cache = snapshot.parent_cache
+                snapshot_usn = self.apply_journal_to_parent_cache(drive_letter, parent_cache, snapshot.usn, journal_info['journal_id'])
+        
+        if parent_cache is None:
+            metrics.count('mft_snapshot_misses')
+            parent_cache = self.enumerate_mft(drive_letter, journal_info)
+            snapshot_usn = journal_info['next_usn']
+        else:
+            metrics.count('mft_snapshot_hits')
+        metrics.add_time('mft_index', time.perf_counter() - start)
+        metrics.count('mft_records', len(parent_cache))
+        metrics.set_progress(drive_letter, 'mft', 1, 0, 1)
+        
+        self.mft_usns[drive_letter] = snapshot_usn
+        if serial is not None and self.is_scanning:
+            try:
+                MftSnapshot(journal_info['journal_id'], snapshot_usn, parent_cache).save(snapshot_file)
+            except Exception as e:
+                print(f"Could not save MFT snapshot for {drive_letter}: {e}", file=sys.stderr)
+        
+        return PathResolver(drive_letter, parent_cache)
+    
+    def read_mft_path_cache(self, mft_path, drive_letter='C', workers=None):
+        """PathResolver from a collected $MFT, for journals read offline"""
+        with self.metrics.timer('mft_index'):
+            parent_cache = read_mft_file(mft_path, workers)
+        self.metrics.count('mft_records', len(parent_cache))
+        return PathResolver(drive_letter, parent_cache)
+
+    def enumerate_mft(self, drive_letter, journal_info):
+        """Walk the whole MFT with FSCTL_ENUM_USN_DATA, returns {file_ref: (parent_ref, name)}"""
+        handle = self.get_drive_handle(drive_letter)
+        decoder = UsnRecordDecoder()
+        
+        # MFT_ENUM_DATA_V0 structure
+        def enum_data(next_ref):
+            return struct.pack('<QqQ', next_ref, 0, journal_info['next_usn'])
+        
+        parent_cache = {}
+        # Enumeration goes up the file reference numbers, their range is the progress
+        mft_records = self.query_mft_records(drive_letter)
+        
+        # 4MB buffers for faster scanning
+        for records, next_ref in self.read_pipelined(handle, FSCTL_ENUM_USN_DATA, enum_data, 0,
+                                                     4 * 1024 * 1024, decoder.decode_records):
+            for file_ref, parent_ref, _, _, _, _, filename in records:
+                parent_cache[file_ref & 0xFFFFFFFFFFFF] = (parent_ref & 0xFFFFFFFFFFFF, filename)
+            if mft_records:
+                self.metrics.set_progress(drive_letter, 'mft', next_ref & 0xFFFFFFFFFFFF, 0, mft_records)
+        
+        return parent_cache
+    
+    def apply_journal_to_parent_cache(self, drive_letter, parent_cache, start_usn, journal_id):
+        """Roll a (parent_ref, name) map forward with the creates, deletes and renames since start_usn.
+
+        Returns the USN the map is now current to.
+        """
+        handle = self.get_drive_handle(drive_letter)
+        decoder = UsnRecordDecoder()
+        
+        # Let the file system filter down to the three reasons that change names
+        def read_data(usn):
+            return struct.pack('<qIIQQQ', usn, PATH_CHANGE_REASONS, 0, 0, 0, journal_id)
+        
+        low = start_usn
+        high = self.query_usn_journal(drive_letter)['next_usn']
+        for records, next_usn in self.read_pipelined(handle, FSCTL_READ_USN_JOURNAL, read_data, start_usn,
+                                                     4 * 1024 * 1024, decoder.decode_records):
+            if next_usn:
+                self.metrics.set_progress(drive_letter, 'mft', next_usn, low, high)
+            for file_ref, parent_ref, _, _, reason, _, filename in records:
+                file_ref &= 0xFFFFFFFFFFFF
+                if reason & 0x00000200:  # FILE_DELETE
+                    parent_cache.pop(file_ref, None)
+                elif reason & 0x00002100:  # FILE_CREATE / RENAME_NEW_NAME
+                    parent_cache[file_ref] = (parent_ref & 0xFFFFFFFFFFFF, filename)
+            if next_usn:
+                start_usn = next_usn
+        
+        return start_usn
+    
+    def read_pipelined(self, handle, control_code, make_input, position, buffer_size, decode):
+        """Yield (decoded batch, next position) for consecutive FSCTL output buffers, in order.
+
+        Each output buffer is handed to the decode pool while the next DeviceIoControl
+        is already in flight. The pool is threads, so what overlaps is the IOCTL wait
+        (which releases the GIL) with decoding - decoding itself still runs one buffer
+        at a time across all volumes. The pipeline_depth buffers rotate and a buffer is
+        only reused after its batch was consumed. The 8 byte header of every output
+        holds the position the next request continues from.
+        """
+        depth = self.pipeline_depth
+        buffers = [ctypes.create_string_buffer(buffer_size) for _ in range(depth)]
+        pool = self.decode_pool
+        pending = deque()  # (next position, output buffer, length, decode future or None)
+        metrics = self.metrics
+        stage = 'mft' if control_code == FSCTL_ENUM_USN_DATA else 'journal'
+        
+        def timed_decode(output_buffer, length):
+            start = time.perf_counter()
+            try:
+                return decode(output_buffer, length)
+            finally:
+                metrics.add_time('decode', time.perf_counter() - start)
+        
+        if pool is not None:
+            timed_decode = metrics.profiled(timed_decode)
+        
+        def finish(item):
+            next_position, output_buffer, length, future = item
+            if length <= 8:
+                return [], next_position
+            if future is not None:
+                return future.result(), next_position
+            return timed_decode(output_buffer, length), next_position
+        
+        count = 0
+        while self.is_scanning:
+            if len(pending) == depth:
+                yield finish(pending.popleft())
             
-            if bytes_returned.value <= 8:
-                break
-            
-            data = output_buffer.raw[:bytes_returned.value]
-            new_start_usn = struct.unpack('<q', data[0:8])[0]
-            
-            offset = 8
-            while offset + 60 <= len(data):
-                record_length = struct.unpack('<I', data[offset:offset+4])[0]
-                if record_length == 0 or record_length > buffer_size or offset + record_length > len(data):
-                    break
-                
-                major_version = struct.unpack('<H', data[offset+4:offset+6])[0]
-                if major_version != 2:
-                    offset += record_length
-                    continue
-                
-                try:
-                    file_ref = struct.unpack('<Q', data[offset+8:offset+16])[0]
-                    parent_ref = struct.unpack('<Q', data[offset+16:offset+24])[0]
-                    usn = struct.unpack('<q', data[offset+24:offset+32])[0]
-                    timestamp = struct.unpack('<Q', data[offset+32:offset+40])[0]
-                    reason = struct.unpack('<I', data[offset+40:offset+44])[0]
-                    file_attributes = struct.unpack('<I', data[offset+52:offset+56])[0]
-                    filename_length = struct.unpack('<H', data[offset+56:offset+58])[0]
-                    filename_offset = struct.unpack('<H', data[offset+58:offset+60])[0]
-                    
-                    fn_start = offset + filename_offset
-                    fn_end = fn_start + filename_length
-                    
-                    if fn_end <= len(data):
-                        filename = data[fn_start:fn_end].decode('utf-16-le', errors='ignore')
-                        
-                        # Fast mode: Skip path resolution for speed
-                        if fast_mode:
-                            # Use minimal path information for speed
-                            parent_ref_index = parent_ref & 0xFFFFFFFFFFFF
-                            parent_path = f"{drive_letter}:\\"  # Simplified path
-                            full_path = parent_path + filename  # Faster than os.path.join
-                        else:
-                            # Full path resolution
-                            parent_ref_index = parent_ref & 0xFFFFFFFFFFFF
-                            parent_path = path_cache.get(parent_ref_index, f"{drive_letter}:\\")
-                            full_path = os.path.join(parent_path, filename)
-                        
-                        is_dir = bool(file_attributes & 0x10)
-                        
-                        # Track unique files/directories (simplified for speed)
-                        if is_dir:
-                            unique_dirs.add(filename)
-                        else:
-                            unique_files.add(filename)
-                        
-                        ts = self.filetime_to_datetime(timestamp)
-                        
-                        # Optimized entry creation
-                        entry = {
-                            'usn': str(usn),
-                            'name': filename,
-                            'path': full_path,
-                            'timestamp': ts.isoformat() if ts else None,
-                            'reason': self.get_reason_string(reason),
-                            'fileSize': 0,
-                            'isDirectory': is_dir,
-                            'attributes': self.get_file_attributes_string(file_attributes) if not fast_mode else '',
-                            'fileReference': file_ref,
-                            'parentFileReference': parent_ref,
-                            'originalName': filename,
-                            'isRename': bool(reason & 0x30000),
-                            'renameType': 'old' if (reason & 0x10000) else ('new' if (reason & 0x20000) else 'none')
-                        }
-                            
-                        entries.append(entry)
-                        
-                except Exception:
-                    # Skip invalid entries quickly
-                    pass
-                
-                offset += record_length
-            
-            if new_start_usn == 0 or new_start_usn == start_usn:
+            output_buffer = buffers[count % depth]
+            count += 1
+            input_buffer = make_input(position)
+            start = time.perf_counter()
+            try:
+                length = self.backend.device_io_control(handle, control_code, input_buffer, output_buffer, buffer_size)
+            except VolumeIoError:
+                # ERROR_HANDLE_EOF (38) and every other failure end the read
+                break
+            finally:
+                metrics.add_time(f'{stage}_ioctl', time.perf_counter() - start)
+            metrics.count(f'{stage}_bytes', length)
+            if length < 8:
                 break
             
-            start_usn = new_start_usn
+            next_position = UsnRecordDecoder.read_header(output_buffer)
+            future = pool.submit(timed_decode, output_buffer, length) if pool is not None and length > 8 else None
+            pending.append((next_position, output_buffer, length, future))
+            
+            if length == 8 or next_position == 0 or next_position == position:
+                break
+            position = next_position
         
-        return entries, len(unique_files), len(unique_dirs)
+        while pending:
+            yield finish(pending.popleft())
     
-    def get_available_drives(self):
-        drives = []
-        drive_bits = ctypes.windll.kernel32.GetLogicalDrives()
+    def decode_journal_buffer(self, buffer, length, drive_letter, decoder=None):
+        """Decode one journal buffer into its own EntryStore, runs on a decode pool thread under the GIL"""
+        records, _ = (decoder or UsnRecordDecoder()).decode(buffer, length)
+        chunk = EntryStore()
+        unique_files = set()
+        unique_dirs = set()
+        self.process_records(records, drive_letter, None, chunk, unique_files, unique_dirs)
+        return chunk, unique_files, unique_dirs
+    
+    def read_usn_journal_fast(self, drive_letter, path_resolver, window=None, fast_mode=True, start_usn=0, profile=None):
+        """Fast USN Journal reading with optimized processing"""
+        handle = self.get_drive_handle(drive_letter)
+        journal_info = self.query_usn_journal(drive_letter)
         
-        for letter in string.ascii_uppercase:
-            if drive_bits & 1:
-                drive_path = f"{letter}:\\"
+        journal_id = journal_info['journal_id']
+        profile = profile or ScanProfile()
+        decoder = profile.decoder(path_resolver)
+        
+        def read_data(usn):
+            return profile.read_data(usn, journal_id)
+        
+        def decode(buffer, length):
+            return self.decode_journal_buffer(buffer, length, drive_letter, decoder)
+        
+        entries = EntryStore(self.drive_budget)
+        if path_resolver is not None and not fast_mode:
+            entries.resolvers[drive_letter] = path_resolver
+        unique_files = set()
+        unique_dirs = set()
+        self.next_usns[drive_letter] = start_usn
+        last_notify = time.time()
+        # Reading goes up the USNs, the range to the journal's next USN is the progress
+        low = max(start_usn, journal_info['first_usn'])
+        high = journal_info['next_usn']
+        metrics = self.metrics
+        
+        # 8MB buffers for ultra-fast scanning
+        for batch, next_usn in self.read_pipelined(handle, FSCTL_READ_USN_JOURNAL, read_data, start_usn,
+                                                   8 * 1024 * 1024, decode):
+            if batch:
+                chunk, chunk_files, chunk_dirs = batch
+                entries.extend(chunk)
+                unique_files.update(chunk_files)
+                unique_dirs.update(chunk_dirs)
+                metrics.count('journal_records', len(chunk))
+            if next_usn:
+                self.next_usns[drive_letter] = next_usn
+                metrics.set_progress(drive_letter, 'journal', next_usn, low, high)
+            
+            if window is not None and time.time() - last_notify > PROGRESS_INTERVAL:
+                last_notify = time.time()
+                window.evaluate_js(f"scanProgress('{drive_letter}', {len(entries)}, 'reading');")
+        
+        metrics.set_progress(drive_letter, 'journal', high, low, high)
+        return entries, len(unique_files), len(unique_dirs)
+    
+    def read_usn_journal_file(self, journal_path, drive_letter='C', path_resolver=None, window=None):
+        """Read an exported $UsnJrnl:$J stream through a memory map instead of DeviceIoControl"""
+        decoder = UsnRecordDecoder()
+        chunk_size = 16 * 1024 * 1024  # Records are decoded in 16MB windows of the map
+
+        entries = EntryStore(self.memory_budget // 2)
+        unique_files = set()
+        unique_dirs = set()
+        metrics = self.metrics
+        last_notify = time.time()
+
+        with open(journal_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return entries, 0, 0
+
+            # Let the OS skip the sparse prefix when it knows about the holes
+            offset = 0
+            if hasattr(os, 'SEEK_DATA'):
                 try:
-                    if os.path.exists(drive_path):
-                        fs_buffer = create_unicode_buffer(32)
-                        vol_buffer = create_unicode_buffer(256)
-                        serial = wintypes.DWORD()
-                        max_len = wintypes.DWORD()
-                        flags = wintypes.DWORD()
-                        
-                        if ctypes.windll.kernel32.GetVolumeInformationW(
-                            drive_path, vol_buffer, sizeof(vol_buffer),
-                            byref(serial), byref(max_len), byref(flags),
-                            fs_buffer, sizeof(fs_buffer)
-                        ):
-                            if fs_buffer.value.upper() == "NTFS":
-                                total = ctypes.c_ulonglong()
-                                free = ctypes.c_ulonglong()
-                                ctypes.windll.kernel32.GetDiskFreeSpaceExW(
-                                    drive_path, None, byref(total), byref(free)
-                                )
-                                
-                                drives.append({
-                                    'letter': letter,
-                                    'name': drive_path,
-                                    'label': vol_buffer.value or 'Local Disk',
-                                    'format': 'NTFS',
-                                    'root': drive_path,
-                                    'totalFree': f"{free.value / (1024**3):.1f}GB",
-                                    'totalSize': f"{total.value / (1024**3):.1f}GB",
-                                    'type': 'Fixed',
-                                    'isReady': True
-                                })
-                except:
-                    pass
-            drive_bits >>= 1
+                    offset = os.lseek(f.fileno(), 0, os.SEEK_DATA) & ~7
+                except OSError:
+                    offset = 0
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                while offset < size and self.is_scanning:
+                    offset = self.skip_zero_fill(mm, offset, size)
+                    if offset >= size:
+                        break
+
+                    chunk_end = min(size, offset + chunk_size)
+                    with metrics.timer('decode'):
+                        records, end_offset = decoder.decode(mm, chunk_end, offset)
+                        self.process_records(records, drive_letter, path_resolver, entries, unique_files, unique_dirs, fast_mode=False)
+                    metrics.count('journal_bytes', end_offset - offset)
+                    metrics.count('journal_records', len(records))
+                    entries.spill_over_budget()
+                    metrics.set_progress(drive_letter, 'journal', end_offset, 0, size)
+                    if window is not None and time.time() - last_notify > PROGRESS_INTERVAL:
+                        last_notify = time.time()
+                        window.evaluate_js(f"scanPercent({metrics.percent()});")
+
+                    if end_offset == offset:
+                        # Not a record and not zero fill - resync on the next 8 byte boundary
+                        end_offset += 8
+                    offset = end_offset
+
+        return entries, len(unique_files), len(unique_dirs)
+
+    def skip_zero_fill(self, mm, offset, size):
+        """Return the 8 byte aligned offset of the first non-zero byte at or after offset"""
+        block = 4096
+        while offset < size:
+            chunk = mm[offset:offset + block]
+            stripped = chunk.lstrip(b'\x00')
+            if stripped:
+                return (offset + len(chunk) - len(stripped)) & ~7
+            offset += len(chunk)
+            # Grow the probe while we are inside a long zero run (the sparse prefix)
+            block = min(block * 2, 16 * 1024 * 1024)
+        return size
+
+    def process_records(self, records, drive_letter, path_resolver, entries, unique_files, unique_dirs, fast_mode=True):
+        """Append a batch of decoded USN records to an EntryStore"""
+        # Paths are resolved lazily from the parent reference, fast mode just skips the resolver
+        if path_resolver is not None and not fast_mode:
+            entries.resolvers[drive_letter] = path_resolver
+        append = entries.append
         
-        return drives
+        for file_ref, parent_ref, usn, timestamp, reason, file_attributes, filename in records:
+            # Track unique files/directories (simplified for speed)
+            if file_attributes & 0x10:
+                unique_dirs.add(filename)
+            else:
+                unique_files.add(filename)
+            
+            append(usn, file_ref, parent_ref, timestamp, reason, file_attributes, filename, drive_letter)
+    
+    def get_available_drives(self):
+        return self.backend.list_volumes()
     
-    def scan_all_drives(self, window):
+    def scan_all_drives(self, window, incremental=True, profile=None):
         self.is_scanning = True
-        self.results = []
+        self.reset_results()
+        self.profile = profile or ScanProfile()
+        window = self.start_metrics(window)
+        self.start_case()
         
         try:
             window.evaluate_js("clearAllResults();")
             
-            drives = self.get_available_drives()
+            drives = [drive_info for drive_info in self.get_available_drives() if self.profile.covers_drive(drive_info['letter'])]
             if not drives:
-                window.evaluate_js("showError('No NTFS drives found!');")
+                show_error(window, "No NTFS drives found!")
                 return
             
             total_files = 0
             total_dirs = 0
-            all_entries = []
             
-            # Scan drives in parallel for faster performance
-            import concurrent.futures
+            # Scan drives in parallel - one worker and volume handle per drive, so the
+            # wall-clock time follows the slowest volume instead of the sum of all of them
+            workers = min(len(drives), self.scan_workers or len(drives))
+            self.drive_budget = self.memory_budget // 2 // workers
             drive_results = []
+            window.evaluate_js(f"updateStatus('Scanning {len(drives)} drives...', 10, 0, 'Scanning...', '0/0');")
             
-            for i, drive_info in enumerate(drives):
-                if not self.is_scanning:
-                    break
-                    
-                drive_letter = drive_info['letter']
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.decode_workers, thread_name_prefix='decode') as decode_pool, \
+                    concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='volume') as volume_pool:
+                self.decode_pool = decode_pool
+                scan_drive = self.metrics.profiled(self.scan_drive)
+                futures = {volume_pool.submit(scan_drive, drive_info, window, incremental): drive_info['letter']
+                           for drive_info in drives}
                 
-                try:
-                    # Update progress for current drive
-                    progress = int((i / len(drives)) * 40) + 10  # 10-50% for indexing
-                    window.evaluate_js(f"updateStatus('Indexing {drive_letter}:...', {progress}, 0, 'Indexing...', '0/0');")
-                    
-                    # Phase 1: Build path cache (silent)
-                    path_cache = self.build_mft_path_cache(drive_letter, window)
-                    
-                    # Update progress for reading phase
-                    progress = int(((i + 0.5) / len(drives)) * 40) + 50  # 50-90% for reading
-                    window.evaluate_js(f"updateStatus('Reading {drive_letter}:...', {progress}, 0, 'Reading...', '0/0');")
-                    
-                    # Phase 2: Read USN Journal (full mode for better paths)
-                    entries, unique_files, unique_dirs = self.read_usn_journal_fast(drive_letter, path_cache, window, fast_mode=False)
-                    
-                    drive_results.append({
-                        'drive': drive_letter,
-                        'entries': entries,
-                        'unique_files': unique_files,
-                        'unique_dirs': unique_dirs,
-                        'journal_info': self.query_usn_journal(drive_letter)
-                    })
-                    
-                except Exception as e:
-                    error_msg = str(e).replace("'", "\\'")
-                    window.evaluate_js(f"showError('Drive {drive_letter}: {error_msg}');")
-                    continue
+                # Progress is how far the drives are through their USN and MFT reference ranges, 10-90%
+                pending = set(futures)
+                done = 0
+                while pending:
+                    finished, pending = concurrent.futures.wait(pending, timeout=PROGRESS_INTERVAL,
+                                                                return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in finished:
+                        done += 1
+                        drive_letter = futures[future]
+                        try:
+                            drive_results.append(future.result())
+                        except Exception as e:
+                            self.metrics.set_progress(drive_letter, 'journal', 1, 0, 1)
+                            self.metrics.set_progress(drive_letter, 'mft', 1, 0, 1)
+                            window.evaluate_js(f"scanProgress('{drive_letter}', 0, 'failed');")
+                            show_error(window, f"Drive {drive_letter}: {e}")
+                        window.evaluate_js(f"updateStatus('Scanned {done}/{len(drives)} drives', {self.metrics.percent()}, {len(self.results)}, 'Scanning...', '0/0');")
+                    if pending:
+                        window.evaluate_js(f"scanPercent({self.metrics.percent()});")
+            
+            drive_results.sort(key=lambda result: result['drive'])
             
             # Combine results from all drives
             journal_info_summary = []
             for result in drive_results:
                 total_files += result['unique_files']
                 total_dirs += result['unique_dirs']
-                all_entries.extend(result['entries'])
-                self.results.extend(result['entries'])
                 
                 # Track journal state for each drive
                 info = result['journal_info']
@@ -470,110 +3344,667 @@ class JournalScanner:
                     'next_usn': info['next_usn'],
                     'max_usn': info['max_usn'],
                     'journal_size': f"{info['max_size'] / (1024**3):.1f}GB",
-                    'entries_found': len(result['entries'])
+                    'entries_found': result['entry_count'],
+                    'incremental': result['incremental']
                 })  
             
+            if self.case is not None:
+                self.case.save_info(source=f"{len(drives)} drives", unique_files=total_files, unique_dirs=total_dirs,
+                                    created=datetime.now().isoformat())
+            
             # Phase 3: Send optimized data to UI at once
-            if all_entries:
-                # Show journal state information to explain varying results
-                journal_summary = f"Journal States: " + ", ".join([f"{j['drive']}:{j['entries_found']} entries" for j in journal_info_summary])
-                
-                window.evaluate_js(f"updateStatus('Loading {len(all_entries)} entries...', 90, {len(all_entries)}, 'Processing...', '{total_files}/{total_dirs}');")
-                
-                # Optimize data before sending - keep rename tracking fields for file info feature
-                optimized_entries = []
-                for entry in all_entries:
-                    # Keep essential fields AND rename tracking fields for file info functionality
-                    optimized_entry = {
-                        'usn': entry['usn'],
-                        'name': entry['name'],
-                        'path': entry['path'],
-                        'timestamp': entry['timestamp'],
-                        'reason': entry['reason'],
-                        'isDirectory': entry['isDirectory'],
-                        'attributes': entry['attributes'],
-                        # Keep rename tracking fields for file info feature
-                        'originalName': entry.get('originalName', entry['name']),
-                        'isRename': entry.get('isRename', False),
-                        'renameType': entry.get('renameType', 'none'),
-                        'fileReference': entry.get('fileReference', 0),
-                        'parentFileReference': entry.get('parentFileReference', 0),
-                        'details': entry.get('details', '')
-                    }
-                    optimized_entries.append(optimized_entry)
-                
-                # Send all optimized data at once as JSON
-                all_json = json.dumps(optimized_entries)
-                window.evaluate_js(f"loadAllEntries({all_json});")
-                
-                timestamps = [e['timestamp'] for e in all_entries if e['timestamp']]
-                oldest = min(timestamps)[:10] if timestamps else 'N/A'
-                
-                # Enhanced status with journal information and optimization notice
-                status_msg = f"⚡ Complete - {len(all_entries)} entries from {len(drives)} drives (Optimized Scan)"
-                window.evaluate_js(f"updateStatus('{status_msg}', 100, {len(all_entries)}, '{oldest}', '{total_files}/{total_dirs}');")
+            if len(self.results):
+                self.send_results_to_ui(window, self.results, total_files, total_dirs, f"{len(drives)} drives")
                 
                 # Log journal state for user reference
-                print(f"=== Journal State Summary ===")
+                print(f"=== Journal State Summary ===", file=sys.stderr)
                 for info in journal_info_summary:
-                    print(f"Drive {info['drive']}: {info['entries_found']} entries, Journal size: {info['journal_size']}")
-                print(f"Total: {len(all_entries)} entries across {len(drives)} drives")
-                print("Note: USN journal is a circular buffer - results vary as old entries are overwritten")
+                    mode = 'incremental' if info['incremental'] else 'full read'
+                    print(f"Drive {info['drive']}: {info['entries_found']} entries ({mode}), Journal size: {info['journal_size']}", file=sys.stderr)
+                print(f"Total: {len(self.results)} entries across {len(drives)} drives", file=sys.stderr)
+                print("Note: USN journal is a circular buffer - results vary as old entries are overwritten", file=sys.stderr)
                 
             else:
                 window.evaluate_js("updateStatus('No entries found', 100, 0, 'N/A', '0/0');")
                     
         except Exception as e:
-            window.evaluate_js(f"showError('Scan failed: {str(e)}');")
+            show_error(window, f"Scan failed: {e}")
+        finally:
+            self.is_scanning = False
+            self.decode_pool = None
+            self.close_drive_handles()
+            self.finish_metrics('drives')
+            window.evaluate_js("scanComplete();")
+    
+    def scan_drive(self, drive_info, window, incremental=True):
+        """Index and read one volume, runs on its own worker thread"""
+        drive_letter = drive_info['letter']
+        metrics = self.metrics
+        metrics.set_progress(drive_letter, 'mft', 0, 0, 1)
+        metrics.set_progress(drive_letter, 'journal', 0, 0, 1)
+        window.evaluate_js(f"scanProgress('{drive_letter}', 0, 'indexing');")
+        
+        # Rows only resolve their paths when displayed, so the MFT is indexed on a second
+        # handle while the journal is read instead of ahead of it
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'mft-{drive_letter}') as indexer:
+            index_future = indexer.submit(metrics.profiled(self.build_mft_path_cache), drive_letter, window, drive_info['serial'])
+            
+            # Read USN Journal (full mode for better paths), only past the checkpoint if it is still valid
+            journal_info = self.query_usn_journal(drive_letter)
+            profile = self.profile
+            incremental = incremental and profile.is_complete
+            start_usn, saved = self.checkpoints.resume(drive_info['serial'], journal_info) if incremental else (0, None)
+            if incremental:
+                metrics.count('checkpoint_hits' if saved is not None else 'checkpoint_misses')
+            
+            # A path prefix is tested against the directory tree, which then has to be indexed first
+            path_resolver = index_future.result() if profile.path_prefix else None
+            entries, unique_files, unique_dirs = self.read_usn_journal_fast(drive_letter, path_resolver, window, fast_mode=False,
+                                                                            start_usn=start_usn, profile=profile)
+            
+            path_resolver = index_future.result()
+        
+        if saved is not None:
+            # Drop saved entries the journal has since discarded, a full read would not return them either
+            keep_from = bisect.bisect_left(saved.usns, journal_info['first_usn'])
+            saved = saved.slice(keep_from)
+            saved.memory_budget = self.drive_budget
+            saved.extend(entries)
+            entries.close_spill()
+            entries = saved
+            unique_files, unique_dirs = entries.count_unique()
+        
+        # Index directory renames/deletes so every row shows the path that was valid at its USN
+        with metrics.timer('history'):
+            path_resolver.history = DirectoryHistory.from_store(entries)
+        entries.resolvers[drive_letter] = path_resolver
+        
+        # Make the drive's rows pageable right away while the other drives are still scanning
+        with self.results_lock:
+            with metrics.timer('merge'):
+                self.results.extend(entries)
+            self.append_to_case(entries)
+            case = self.case
+            window.evaluate_js(f"resultsAvailable({len(self.results)});")
+        
+        # The next scan rebuilds these rows from the case, without one the last checkpoint stays
+        if self.is_scanning and profile.is_complete and case is not None:
+            self.checkpoints.update(drive_info['serial'], drive_letter, journal_info['journal_id'],
+                                    self.next_usns[drive_letter], self.mft_usns.get(drive_letter, 0),
+                                    case.directory, len(entries))
+        # The rows live on in the results, a spill of the drive's own is deleted
+        entry_count = len(entries)
+        entries.close_spill()
+        if self.index_results:
+            with metrics.timer('lineage'):
+                self.index_lineage()
+            with metrics.timer('query_index'):
+                self.index_query()
+        if self.case is not None:
+            try:
+                self.case.save_resolver(drive_letter, path_resolver, journal_info['journal_id'], self.next_usns.get(drive_letter, 0))
+            except Exception as e:
+                print(f"Saving the {drive_letter}: paths with the case failed: {e}", file=sys.stderr)
+        window.evaluate_js(f"scanProgress('{drive_letter}', {entry_count}, 'done');")
+        
+        return {
+            'drive': drive_letter,
+            'entry_count': entry_count,
+            'unique_files': unique_files,
+            'unique_dirs': unique_dirs,
+            'incremental': saved is not None,
+            'journal_info': self.query_usn_journal(drive_letter)
+        }
+    
+    def monitor_drives(self, window):
+        """Tail every drive's journal until stop_monitor, continuing where the last scan stopped.
+
+        Each drive gets a reader thread that blocks inside FSCTL_READ_USN_JOURNAL
+        (BytesToWaitFor/Timeout) and only decodes what is new. Decoded buffers go
+        through a bounded queue to a single flush thread, which coalesces them into
+        one store append and one UI update per MONITOR_FLUSH_INTERVAL. A full queue
+        holds the readers back, the journal itself buffers the backlog meanwhile.
+        """
+        self.is_monitoring = True
+        try:
+            drives = self.get_available_drives()
+            def scanned(drive_info):
+                return drive_info['letter'] in self.next_usns and drive_info['letter'] in self.results.resolvers
+            
+            if not all(scanned(drive_info) for drive_info in drives):
+                # Nothing to continue from yet - read the journals up to now first
+                self.scan_all_drives(window, profile=self.profile)
+            
+            drives = [drive_info for drive_info in drives if scanned(drive_info)]
+            if not self.is_monitoring or not drives:
+                return
+            
+            self.monitor_deltas = queue.Queue(maxsize=MONITOR_QUEUE_BATCHES)
+            readers = [threading.Thread(target=self.monitor_drive, args=(drive_info['letter'], window), daemon=True)
+                       for drive_info in drives]
+            for reader in readers:
+                reader.start()
+            window.evaluate_js(f"monitorStarted({len(readers)});")
+            
+            self.flush_monitor_deltas(window, len(readers))
+            for reader in readers:
+                reader.join()
+        except Exception as e:
+            show_error(window, f"Monitor failed: {e}")
+        finally:
+            self.is_monitoring = False
+            self.monitor_deltas = None
+            self.close_drive_handles()
+            window.evaluate_js("monitorStopped();")
+    
+    def monitor_drive(self, drive_letter, window):
+        """Blocking journal reads for one drive, hands every non-empty buffer to the flush thread"""
+        deltas = self.monitor_deltas
+        try:
+            handle = self.get_drive_handle(drive_letter)
+            journal_id = self.query_usn_journal(drive_letter)['journal_id']
+            output_buffer = ctypes.create_string_buffer(1024 * 1024)
+            profile = self.profile
+            decoder = profile.decoder(self.results.resolvers.get(drive_letter))
+            start_usn = self.next_usns[drive_letter]
+            
+            while self.is_monitoring:
+                input_buffer = profile.read_data(start_usn, journal_id, MONITOR_TIMEOUT, MONITOR_WAIT_BYTES)
+                try:
+                    length = self.backend.device_io_control(handle, FSCTL_READ_USN_JOURNAL, input_buffer,
+                                                            output_buffer, 1024 * 1024)
+                except VolumeIoError as e:
+                    raise Exception(f"Journal read failed (Error {e.error})")
+                if length < 8:
+                    continue
+                
+                next_usn = decoder.read_header(output_buffer)
+                if length > 8:
+                    # Blocks while the flush thread is behind
+                    deltas.put((drive_letter, decoder.decode_records(output_buffer, length), next_usn))
+                if next_usn:
+                    start_usn = next_usn
+        except Exception as e:
+            show_error(window, f"Monitor {drive_letter}: {e}")
+        finally:
+            deltas.put(None)
+    
+    def flush_monitor_deltas(self, window, reader_count):
+        """Coalesce the readers' batches into the result store until every reader has finished"""
+        deltas = self.monitor_deltas
+        running = reader_count
+        while running:
+            # Idle volumes cost nothing here, the thread sleeps on the queue
+            batches = [deltas.get()]
+            
+            # Whatever else arrives within the flush interval goes out with it
+            deadline = time.time() + MONITOR_FLUSH_INTERVAL
+            while True:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batches.append(deltas.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            chunk = EntryStore()
+            for batch in batches:
+                if batch is None:  # A reader has finished
+                    running -= 1
+                    continue
+                drive_letter, records, next_usn = batch
+                path_resolver = self.results.resolvers.get(drive_letter)
+                if path_resolver is not None:
+                    path_resolver.apply_records(records)
+                self.process_records(records, drive_letter, path_resolver, chunk, set(), set(), fast_mode=False)
+                self.next_usns[drive_letter] = next_usn
+            
+            if len(chunk):
+                with self.results_lock:
+                    self.results.extend(chunk)
+                    self.append_to_case(chunk)
+                    window.evaluate_js(f"monitorUpdate({len(chunk)}, {len(self.results)});")
+                self.index_lineage()
+                self.index_query()
+    
+    def stop_monitor(self):
+        self.is_monitoring = False
+    
+    def scan_journal_file(self, window, journal_path, mft_path=None, drive_letter=None):
+        """Load a collected $UsnJrnl:$J file instead of the live drives, paths come from a collected $MFT.
+
+        drive_letter is the volume the journal was collected from, the rows and paths are
+        labelled with it - taken from the collection's folder names when not given.
+        """
+        self.is_scanning = True
+        self.reset_results()
+        window = self.start_metrics(window)
+        self.start_case()
+        
+        try:
+            window.evaluate_js("clearAllResults();")
+            file_name = os.path.basename(journal_path).replace("'", "\\'")
+            drive_letter = (drive_letter or collected_drive_letter(journal_path)).rstrip(':\\').upper()
+            path_resolver = None
+            mft_path = mft_path or find_mft_file(journal_path)
+            if mft_path:
+                window.evaluate_js(f"updateStatus('Reading {os.path.basename(mft_path)}...', 0, 0, 'Indexing...', '0/0');")
+                path_resolver = self.read_mft_path_cache(mft_path, drive_letter)
+            window.evaluate_js(f"updateStatus('Reading {file_name}...', 0, 0, 'Reading...', '0/0');")
+            
+            entries, unique_files, unique_dirs = self.metrics.profiled(self.read_usn_journal_file)(
+                journal_path, drive_letter, path_resolver, window)
+            if path_resolver is not None:
+                with self.metrics.timer('history'):
+                    path_resolver.history = DirectoryHistory.from_store(entries)
+            self.results.extend(entries)
+            entries.close_spill()
+            entries = self.results
+            self.append_to_case(entries)
+            if path_resolver is not None and self.case is not None:
+                self.case.save_resolver(drive_letter, path_resolver)
+            if self.index_results:
+                with self.metrics.timer('lineage'):
+                    self.index_lineage()
+                with self.metrics.timer('query_index'):
+                    self.index_query()
+            if self.case is not None:
+                self.case.save_info(source=file_name, unique_files=unique_files, unique_dirs=unique_dirs,
+                                    created=datetime.now().isoformat())
+            
+            if len(entries):
+                self.send_results_to_ui(window, entries, unique_files, unique_dirs, file_name)
+            else:
+                window.evaluate_js("updateStatus('No entries found', 100, 0, 'N/A', '0/0');")
+        
+        except Exception as e:
+            show_error(window, f"Reading journal file failed: {e}")
+        finally:
+            self.is_scanning = False
+            self.finish_metrics('journal file')
+            window.evaluate_js("scanComplete();")
+    
+    def analyze_corpus(self, window, artifacts, filename, fmt='csv', reason_mask=0, time_range=None, path_prefix=None,
+                       workers=None):
+        """Merge collected journals into one timeline file ordered by time, returns the number of rows written.
+
+        artifacts are (host, journal path) pairs. A process pool decodes every journal
+        and writes it sorted by time as a columnar part, then the parts are merged with
+        heapq.merge while the timeline streams out - the merge holds one block per part,
+        however many records the corpus has. The results grid is left alone.
+        """
+        self.is_scanning = True
+        window = self.start_metrics(window)
+        metrics = self.metrics
+        start_time, end_time = time_range or (None, None)
+        directory = make_spill_directory('corpus')  # Parts a crashed run leaves behind go with the spill segments
+        count = 0
+        try:
+            parts = []
+            with metrics.timer('corpus_decode'), \
+                    concurrent.futures.ProcessPoolExecutor(max_workers=workers or CORPUS_WORKERS) as pool:
+                futures = {pool.submit(decode_artifact, journal_path, os.path.join(directory, f"part_{part}.jtc")): part
+                           for part, (host, journal_path) in enumerate(artifacts)}
+                for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                    part = futures[future]
+                    try:
+                        metrics.count('corpus_records', future.result())
+                        parts.append(part)
+                    except Exception as e:
+                        show_error(window, f"Reading journal file failed: {artifacts[part][0]}: {e}")
+                    window.evaluate_js(f"scanPercent({int(done / len(artifacts) * 80) + 10});")
+            metrics.count('corpus_artifacts', len(parts))
+
+            hosts = [host for host, _ in artifacts]
+            streams = [read_corpus_part(os.path.join(directory, f"part_{part}.jtc"), part) for part in sorted(parts)]
+            with metrics.timer('corpus_merge'), \
+                    StreamingExporter(filename, fmt, int(reason_mask or 0),
+                                      datetime_to_filetime(start_time) if start_time else None,
+                                      datetime_to_filetime(end_time) if end_time else None, path_prefix,
+                                      timeline=True) as exporter:
+                count = exporter.write_timeline(heapq.merge(*streams), hosts)
+            metrics.count('export_rows', count)
+            window.evaluate_js(f"updateStatus('Merged {len(parts)} journals into {count} rows', 100, {count}, 'Complete', '0/0');")
+            return count
+        finally:
+            self.is_scanning = False
+            shutil.rmtree(directory, ignore_errors=True)
+            self.finish_metrics('corpus', count)
+
+    def reset_results(self, store=None):
+        """Swap in a new result set - an empty one by default - and delete the old one's spill"""
+        self.results.close_spill()
+        self.results = store if store is not None else EntryStore(self.memory_budget // 2)
+
+    def close(self):
+        """Release what outlives a scan, the spill segments of the results"""
+        self.results.close_spill()
+
+    def start_metrics(self, window):
+        """Fresh metrics for a scan starting now, returns the window with its UI calls metered"""
+        self.metrics = ScanMetrics(profiling=self.profile_output is not None)
+        return MeteredWindow(window, self.metrics)
+
+    def finish_metrics(self, source, entries=None):
+        """Close the scan's metrics - log them as one JSON line, dump the profile when asked to"""
+        metrics = self.metrics
+        metrics.finished = time.time()
+        snapshot = metrics.snapshot(self.results.resolvers.values())
+        entries = len(self.results) if entries is None else entries
+        record = {'finished': datetime.now().isoformat(), 'source': source, 'entries': entries, **snapshot}
+        try:
+            os.makedirs(get_data_dir(), exist_ok=True)
+            with open(os.path.join(get_data_dir(), SCAN_METRICS_LOG), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+        except OSError as e:
+            print(f"Could not write the scan metrics: {e}", file=sys.stderr)
+        phases = ', '.join(f"{phase} {value['seconds']:.2f}s" for phase, value in snapshot['phases'].items())
+        print(f"Scan metrics: {entries} entries in {snapshot['elapsed']:.2f}s - {phases}", file=sys.stderr)
+        if self.profile_output:
+            try:
+                if metrics.dump_profile(self.profile_output):
+                    print(f"Scan profile written to {self.profile_output}", file=sys.stderr)
+            except Exception as e:
+                print(f"Could not write the scan profile: {e}", file=sys.stderr)
+
+    def get_scan_metrics(self):
+        return self.metrics.snapshot(list(self.results.resolvers.values()))
+
+    def start_case(self):
+        """Begin a new on-disk case for the coming results, the scan goes ahead without one if that fails"""
+        if self.case is not None:
+            self.case.close()
+        self.case_indexing = False
+        if not self.save_cases:
+            self.case = None
+            return
+        try:
+            self.case = CaseStore.create()
+        except Exception as e:
+            print(f"Results will not be saved as a case: {e}", file=sys.stderr)
+            self.case = None
+    
+    def append_to_case(self, entries):
+        """Write entries to the case, called under results_lock so segments follow the result order"""
+        if self.case is None:
+            return
+        try:
+            with self.metrics.timer('case'):
+                self.case.append(entries)
+        except Exception as e:
+            print(f"Saving the case failed: {e}", file=sys.stderr)
+            self.case = None
+    
+    def open_case(self, window, directory):
+        """Reopen a saved case - its segments are mapped, nothing is rescanned or decoded"""
+        self.is_scanning = True
+        window = self.start_metrics(window)
+        try:
+            window.evaluate_js("clearAllResults();")
+            case = CaseStore.open(directory)
+            if self.case is not None:
+                self.case.close()
+            self.case = case
+            with self.metrics.timer('case_load'):
+                self.reset_results(case.load(self.memory_budget // 2))
+            self.next_usns = {}  # Nothing to continue from, monitoring starts with a fresh scan
+            self.query_engine = QueryEngine(self.results)
+            
+            # Histories and the text index are rebuilt in the background, the segment summaries answer until then
+            self.case_indexing = True
+            threading.Thread(target=self.index_case, args=(self.results, self.query_engine), daemon=True).start()
+            
+            if len(self.results):
+                info = case.info
+                self.send_results_to_ui(window, self.results, info.get('unique_files', 0), info.get('unique_dirs', 0),
+                                        info.get('source', os.path.basename(directory)), case.oldest_timestamp())
+            else:
+                window.evaluate_js("updateStatus('No entries found', 100, 0, 'N/A', '0/0');")
+        except Exception as e:
+            show_error(window, f"Opening case failed: {e}")
         finally:
             self.is_scanning = False
+            self.finish_metrics('case')
             window.evaluate_js("scanComplete();")
     
+    def index_case(self, store, engine):
+        """Rebuild what a case does not store - directory histories and the query index"""
+        try:
+            for drive_letter, path_resolver in store.resolvers.items():
+                history = DirectoryHistory.from_store(store, drive_letter)
+                with path_resolver.lock:
+                    path_resolver.history = history
+                    path_resolver.directory_paths.clear()
+            if self.index_results:
+                with engine.lock:
+                    engine.refresh()
+                if self.lifecycles.store is not store:
+                    self.lifecycles = LifecycleIndex(store)
+                with self.lifecycles.lock:
+                    self.lifecycles.refresh()
+                self.index_lineage()
+        finally:
+            if engine is self.query_engine:
+                self.case_indexing = False
+    
+    def index_query(self):
+        """Bring the query index up to the rows in the store, so a query only folds in what arrived since"""
+        with self.results_lock:
+            if self.query_engine.store is not self.results:
+                self.query_engine = QueryEngine(self.results)
+            engine = self.query_engine
+        with engine.lock:
+            engine.refresh()
+
+    def index_lineage(self):
+        """Bring the file/directory indexes up to the rows in the store, so file info never waits for a rebuild"""
+        with self.results_lock:
+            if self.lineage.store is not self.results:
+                self.lineage = LineageIndex(self.results)
+            lineage = self.lineage
+        with lineage.lock:
+            lineage.refresh()
+    
+    def send_results_to_ui(self, window, store, total_files, total_dirs, source_label, oldest_timestamp=None):
+        """Tell the UI a finished result set is ready, it pages rows in through query"""
+        oldest_timestamp = oldest_timestamp or store.oldest_timestamp()
+        oldest = oldest_timestamp[:10] if oldest_timestamp else 'N/A'
+        
+        window.evaluate_js(f"loadResults({len(store)});")
+        
+        # Enhanced status with journal information and optimization notice
+        status_msg = f"⚡ Complete - {len(store)} entries from {source_label} (Optimized Scan)"
+        window.evaluate_js(f"updateStatus('{status_msg}', 100, {len(store)}, '{oldest}', '{total_files}/{total_dirs}');")
+    
+    def query(self, text='', reason_mask=0, time_range=None, offset=0, limit=200, view='records'):
+        """One page of the rows matching text, any of the reason bits and a (start, end) time range.
+
+        The 'summaries' view pages through the lifecycles having a matching row instead.
+        """
+        if self.query_engine.store is not self.results:
+            self.query_engine = QueryEngine(self.results)
+        start_time, end_time = time_range or (None, None)
+        start_time = datetime_to_filetime(start_time) if start_time else None
+        end_time = datetime_to_filetime(end_time) if end_time else None
+        reason_mask = int(reason_mask or 0)
+        offset = max(0, int(offset))
+        limit = max(0, int(limit))
+        case = self.case
+        if self.case_indexing and case is not None:
+            # Reopened case still being indexed - scan the segments that can match instead, as raw records
+            matches = case.matches(text, reason_mask, start_time, end_time)
+            return {'total': len(matches), 'rows': [self.results.row(i) for i in matches[offset:offset + limit]],
+                    'view': 'records'}
+        
+        if view == 'summaries':
+            if self.lifecycles.store is not self.results:
+                self.lifecycles = LifecycleIndex(self.results)
+            lifecycles = self.lifecycles
+            matches, indexed_rows = self.query_engine.match_rows(text, reason_mask, start_time, end_time)
+            selected = lifecycles.select(matches, (text, reason_mask, start_time, end_time, indexed_rows))
+            return {'total': len(selected), 'rows': [lifecycles.summary(i) for i in selected[offset:offset + limit]],
+                    'view': 'summaries'}
+        
+        total, rows = self.query_engine.query(text, reason_mask, start_time, end_time, offset, limit)
+        return {'total': total, 'rows': rows, 'view': 'records'}
+    
+    def timeline(self, bucket='auto', time_range=None, reason_mask=0):
+        """Rows per minute, hour or day ('auto' picks one) and reason, for a (start, end) range and any of the reason bits"""
+        if self.query_engine.store is not self.results:
+            self.query_engine = QueryEngine(self.results)
+        start_time, end_time = time_range or (None, None)
+        return self.query_engine.timeline(bucket, datetime_to_filetime(start_time) if start_time else None,
+                                          datetime_to_filetime(end_time) if end_time else None, int(reason_mask or 0))
+
+    def get_lifecycle_records(self, lifecycle):
+        """Raw rows behind one lifecycle summary, the drill-down of the summaries view"""
+        lifecycles = self.lifecycles
+        lifecycle = int(lifecycle)
+        with lifecycles.lock:
+            if lifecycles.store is not self.results or not 0 <= lifecycle < len(lifecycles):
+                return []
+            rows = lifecycles.rows(lifecycle)
+        return [self.results.row(i) for i in rows]
+    
+    def get_file_history(self, file_ref, drive_letter=None):
+        """Ordered lineage of a file - its records plus those of paired temporary downloads"""
+        self.index_lineage()
+        lineage = self.lineage
+        store = lineage.store
+        file_ref = int(file_ref or 0)
+        if drive_letter:
+            drive_ids = [store.string_ids[drive_letter]] if drive_letter in store.string_ids else []
+        else:
+            drive_ids = sorted(lineage.drive_ids)
+        rows = []
+        for drive_id in drive_ids:
+            rows.extend(lineage.file_history(drive_id, file_ref))
+        return [store.row(i) for i in rows]
+    
     def get_results(self):
-        return self.results
+        return self.results.rows()
     
     def stop_scan(self):
         self.is_scanning = False
     
-    def export_results(self, filename=None):
+    def export_results(self, filename=None, fmt='csv', reason_mask=0, time_range=None, path_prefix=None):
+        """Stream the results, or the part matching the filters, into a CSV, JSON Lines or columnar file"""
         if not filename:
-            filename = f"journal_trace_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        
-        with open(filename, 'w', newline='', encoding='utf-8') as f:
-            # Include rename tracking fields in export
-            fieldnames = ['USN', 'Name', 'Path', 'Timestamp', 'Reason', 'IsDirectory', 'Attributes', 
-                         'OriginalName', 'IsRename', 'RenameType', 'FileReference', 'ParentFileReference', 'Details']
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            for entry in self.results:
-                writer.writerow({
-                    'USN': entry['usn'],
-                    'Name': entry['name'],
-                    'Path': entry['path'],
-                    'Timestamp': entry['timestamp'],
-                    'Reason': entry['reason'],
-                    'IsDirectory': entry['isDirectory'],
-                    'Attributes': entry['attributes'],
-                    'OriginalName': entry.get('originalName', ''),
-                    'IsRename': entry.get('isRename', False),
-                    'RenameType': entry.get('renameType', 'none'),
-                    'FileReference': entry.get('fileReference', 0),
-                    'ParentFileReference': entry.get('parentFileReference', 0),
-                    'Details': entry.get('details', '')
-                })
+            filename = f"journal_trace_{datetime.now().strftime('%Y%m%d_%H%M%S')}{EXPORT_FORMATS.get(fmt, '.csv')}"
+        start_time, end_time = time_range or (None, None)
+        
+        # Rows appended by the monitor while exporting are left for the next export
+        store = self.results
+        with self.results_lock:
+            count = len(store)
+        with self.metrics.timer('export'), \
+                StreamingExporter(filename, fmt, int(reason_mask or 0),
+                                  datetime_to_filetime(start_time) if start_time else None,
+                                  datetime_to_filetime(end_time) if end_time else None, path_prefix) as exporter:
+            exporter.write(store, 0, count)
+        self.metrics.count('export_rows', exporter.count)
         return filename
 
+CORPUS_WORKERS = os.cpu_count() or 4  # Journals decoded at once in corpus mode
+CORPUS_BLOCK_ROWS = 8192  # Rows per block of a sorted part, the merge holds one block per part
+CORPUS_JOURNAL_NAMES = {'$j', 'j', '$usnjrnl', '$usnjrnl_$j', 'usnjrnl_j'}  # Names that say nothing about the host
+
+def decode_artifact(journal_path, part_path):
+    """Process pool worker - decode one collected journal, sort it by time and write it as a columnar part"""
+    # Only the file is read, the live backend is never asked for a volume
+    scanner = JournalScanner(scan_workers=1, decode_workers=1, backend=WindowsVolumeBackend())
+    scanner.is_scanning = True
+    mft_path = find_mft_file(journal_path)
+    # The corpus is parallel already, the $MFT is parsed in this worker
+    drive_letter = collected_drive_letter(journal_path)
+    path_resolver = scanner.read_mft_path_cache(mft_path, drive_letter, workers=1) if mft_path else None
+    entries, _, _ = scanner.read_usn_journal_file(journal_path, drive_letter, path_resolver)
+    if path_resolver is not None:
+        path_resolver.history = DirectoryHistory.from_store(entries)
+    # Journals are in USN order, which is nearly time order, so the sort is mostly runs
+    order = sorted(range(len(entries)), key=entries.timestamps.__getitem__)
+    with StreamingExporter(part_path, 'columns', batch_rows=CORPUS_BLOCK_ROWS) as exporter:
+        exporter.write(entries.take(order))
+    entries.close_spill()
+    return len(order)
+
+def read_corpus_part(filename, part):
+    """Yield the records of a sorted part as (timestamp, part, sequence, block, row) for heapq.merge"""
+    sequence = 0
+    for block in StreamingExporter.read_columns(filename):
+        for row, timestamp in enumerate(block['timestamp']):
+            yield timestamp, part, sequence, block, row
+            sequence += 1
+
+def corpus_artifacts(paths):
+    """(host, journal path) pairs from files, folders of files and HOST=path arguments - collected $MFTs are skipped"""
+    artifacts = []
+    for path in paths:
+        host, separator, journal_path = path.partition('=')
+        if not separator or os.path.exists(path):
+            host, journal_path = None, path
+        if os.path.isdir(journal_path):
+            for folder, _, files in sorted(os.walk(journal_path)):
+                artifacts += [(host, os.path.join(folder, name)) for name in sorted(files) if name not in MFT_NAMES]
+        else:
+            artifacts.append((host, journal_path))
+    named = []
+    for host, journal_path in artifacts:
+        if host is None:
+            # HOST\$J names the host by its folder, HOST_J.bin by the file
+            stem = os.path.splitext(os.path.basename(journal_path))[0]
+            host = os.path.basename(os.path.dirname(os.path.abspath(journal_path))) if stem.lower() in CORPUS_JOURNAL_NAMES else stem
+        named.append((host, journal_path))
+    return named
+
 class Api:
     def __init__(self):
+        EntryStore.prune_spill()
         self.scanner = JournalScanner()
     
     def get_available_drives(self):
         return self.scanner.get_available_drives()
     
-    def start_scan(self):
+    def start_scan(self, profile=None):
+        if self.scanner.is_scanning or self.scanner.is_monitoring or not webview.windows:
+            return False
+        try:
+            scan_profile = ScanProfile.from_options(profile)
+        except Exception:
+            return False
+        thread = threading.Thread(target=self.scanner.scan_all_drives, args=(webview.windows[0], True, scan_profile))
+        thread.daemon = True
+        thread.start()
+        return True
+    
+    def open_journal_file(self, drive_letter=None):
         if self.scanner.is_scanning or not webview.windows:
             return False
-        thread = threading.Thread(target=self.scanner.scan_all_drives, args=(webview.windows[0],))
+        window = webview.windows[0]
+        selection = window.create_file_dialog(webview.OPEN_DIALOG, allow_multiple=True)
+        if not selection:
+            return False
+        # The $J can be picked together with its $MFT, otherwise a collected $MFT next to it is used
+        mft_paths = [path for path in selection if os.path.basename(path) in MFT_NAMES]
+        journal_paths = [path for path in selection if path not in mft_paths]
+        if not journal_paths:
+            return False
+        thread = threading.Thread(target=self.scanner.scan_journal_file,
+                                  args=(window, journal_paths[0], mft_paths[0] if mft_paths else None, drive_letter))
+        thread.daemon = True
+        thread.start()
+        return True
+    
+    def open_case(self):
+        if self.scanner.is_scanning or self.scanner.is_monitoring or not webview.windows:
+            return False
+        window = webview.windows[0]
+        cases_dir = CaseStore.cases_dir()
+        selection = window.create_file_dialog(webview.FOLDER_DIALOG, directory=cases_dir if os.path.isdir(cases_dir) else '')
+        if not selection:
+            return False
+        thread = threading.Thread(target=self.scanner.open_case, args=(window, selection[0]))
         thread.daemon = True
         thread.start()
         return True
@@ -582,16 +4013,52 @@ class Api:
         self.scanner.stop_scan()
         return True
     
+    def start_monitor(self):
+        if self.scanner.is_scanning or self.scanner.is_monitoring or not webview.windows:
+            return False
+        thread = threading.Thread(target=self.scanner.monitor_drives, args=(webview.windows[0],))
+        thread.daemon = True
+        thread.start()
+        return True
+    
+    def stop_monitor(self):
+        self.scanner.stop_monitor()
+        return True
+    
     def get_results(self):
         return self.scanner.get_results()
     
     def clear_results(self):
-        self.scanner.results = []
+        self.scanner.results.clear()
+        return True
+    
+    def query(self, text='', reason_mask=0, time_range=None, offset=0, limit=200, view='records'):
+        with self.scanner.metrics.timer('query'):
+            return self.scanner.query(text, reason_mask, time_range, offset, limit, view)
+    
+    def get_scan_metrics(self):
+        return self.scanner.get_scan_metrics()
+
+    def timeline(self, bucket='auto', time_range=None, reason_mask=0):
+        with self.scanner.metrics.timer('query'):
+            return self.scanner.timeline(bucket, time_range, reason_mask)
+    
+    def get_lifecycle_records(self, lifecycle):
+        return self.scanner.get_lifecycle_records(lifecycle)
+    
+    def get_file_history(self, file_ref, drive_letter=None):
+        return self.scanner.get_file_history(file_ref, drive_letter)
+    
+    def reset_checkpoints(self):
+        if self.scanner.is_scanning:
+            return False
+        self.scanner.checkpoints.reset()
         return True
     
-    def export_results(self):
+    def export_results(self, fmt='csv', reason_mask=0, time_range=None, path_prefix=None):
         try:
-            return {'success': True, 'filename': self.scanner.export_results()}
+            filename = self.scanner.export_results(None, fmt, reason_mask, time_range, path_prefix)
+            return {'success': True, 'filename': filename}
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
@@ -620,6 +4087,158 @@ def get_web_files_path():
         return os.path.join(sys._MEIPASS, 'web')
     return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'web')
 
+def get_data_dir():
+    """Folder for checkpoints and saved results, next to the user's other app data"""
+    base = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.local', 'share')
+    return os.path.join(base, 'JournalTrace')
+
+EXIT_OK = 0
+EXIT_FAILED = 1  # Nothing could be read or the output could not be written
+EXIT_USAGE = 2  # argparse's own exit code for bad arguments
+EXIT_PARTIAL = 3  # Results were written, but some volumes failed
+
+class ConsoleWindow:
+    """Stands in for the pywebview window in headless runs - errors and progress go to stderr.
+
+    Errors come in through show_error(). A showError() script that still reaches
+    evaluate_js and cannot be read marks the run as failed instead of being dropped.
+    """
+
+    def __init__(self, quiet=False):
+        self.quiet = quiet
+        self.errors = []
+        self.failed = False  # An error could not be read, the results cannot be trusted
+
+    def show_error(self, message):
+        self.errors.append(message)
+        print(f"\nError: {message}", file=sys.stderr, flush=True)
+
+    def evaluate_js(self, script):
+        name, _, arguments = script.partition('(')
+        try:
+            arguments = ast.literal_eval(f"({arguments.rstrip().rstrip(';').rstrip(')')},)") if arguments.strip(' );') else ()
+        except (ValueError, SyntaxError):
+            arguments = None
+        if name == 'showError':
+            if not arguments:
+                self.failed = True
+                arguments = (script,)
+            self.show_error(arguments[0])
+        elif self.quiet or arguments is None:
+            return
+        elif name == 'scanPercent' and arguments:
+            print(f"\rScanning... {arguments[0]}%", end='', file=sys.stderr, flush=True)
+        elif name == 'scanProgress' and len(arguments) >= 3 and arguments[2] in ('done', 'failed'):
+            print(f"\r{arguments[0]}: {arguments[1]:,} entries {arguments[2]}".ljust(24), file=sys.stderr, flush=True)
+        elif name == 'updateStatus' and arguments and arguments[1] == 100:
+            print(f"\r{arguments[0]}", file=sys.stderr, flush=True)
+
+def parse_reasons(text):
+    """Reason mask from a number (0x200) or reason names (FILE_DELETE,RENAME_NEW_NAME)"""
+    try:
+        return int(text, 0)
+    except ValueError:
+        pass
+    names = {name: mask for mask, name in USN_REASONS.items()}
+    mask = 0
+    for name in text.split(','):
+        name = name.strip().upper()
+        if name not in names:
+            raise argparse.ArgumentTypeError(f"unknown reason {name}, use one of {', '.join(sorted(names))}")
+        mask |= names[name]
+    return mask
+
+def parse_drive_letter(text):
+    letter = text.rstrip(':\\').upper()
+    if len(letter) != 1 or letter not in string.ascii_uppercase:
+        raise argparse.ArgumentTypeError(f"not a drive letter: {text}")
+    return letter
+
+def parse_arguments(argv):
+    parser = argparse.ArgumentParser(description="Journal Trace - USN journal analysis. Without --headless the GUI starts.")
+    parser.add_argument('--headless', action='store_true', help="scan without the GUI and write the results out")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--journal-file', help="read an exported $UsnJrnl:$J file instead of the live volumes")
+    source.add_argument('--case', help="reopen a saved case folder instead of scanning")
+    source.add_argument('--corpus', nargs='+', metavar='JOURNAL',
+                        help="merge collected $J files (or folders of them, HOST=path to name the host) into one timeline")
+    parser.add_argument('--mft', help="collected $MFT to resolve --journal-file paths with, found next to the $J by default")
+    parser.add_argument('--volume', type=parse_drive_letter,
+                        help="drive letter the --journal-file was collected from, taken from its folder (C\\$Extend\\$J) by default")
+    parser.add_argument('--drives', help="comma separated drive letters to scan, all NTFS volumes by default")
+    parser.add_argument('--profile', choices=sorted(SCAN_PROFILES), default='all', help="scan profile")
+    parser.add_argument('--path-prefix', help="only records under this path, e.g. C:\\Users")
+    parser.add_argument('--reasons', type=parse_reasons, default=0, help="only records with any of these reasons")
+    parser.add_argument('--since', help="only records at or after this ISO time")
+    parser.add_argument('--until', help="only records at or before this ISO time")
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv', help="output format")
+    parser.add_argument('--output', default='-', help="output file, - for stdout (the default)")
+    parser.add_argument('--full', action='store_true', help="read the whole journal instead of resuming from the checkpoint")
+    parser.add_argument('--no-case', action='store_true', help="do not keep the scan as a case")
+    parser.add_argument('--memory-budget', type=int, default=DEFAULT_MEMORY_BUDGET >> 20,
+                        help="MB of journal rows kept in memory before they spill to disk, 0 for no limit")
+    parser.add_argument('--metrics', help="write the scan metrics as JSON to this file")
+    parser.add_argument('--profile-output', help="write a cProfile of the scan to this file")
+    parser.add_argument('--workers', type=int, help="journals decoded at once with --corpus")
+    parser.add_argument('--quiet', action='store_true', help="no progress on stderr")
+    args, unknown = parser.parse_known_args(argv)
+    if args.headless and unknown:
+        parser.error(f"unrecognized arguments: {' '.join(unknown)}")
+    if args.corpus and args.format == 'columns':
+        parser.error("--corpus writes csv or jsonl")
+    if args.headless and args.output == '-' and sys.stdout is None:
+        # The windowed build has no console to write the results to
+        parser.error("there is no standard output here, write the results to a file with --output")
+    return args
+
+def run_headless(args):
+    """Scan, read a journal file or open a case, then stream the results out - returns the exit code"""
+    EntryStore.prune_spill()
+    scanner = JournalScanner(memory_budget=args.memory_budget << 20, profile_output=args.profile_output)
+    scanner.save_cases = not args.no_case
+    scanner.index_results = False  # Nothing queries the results, they are only written out
+    window = ConsoleWindow(args.quiet)
+    output = sys.stdout.buffer if args.output == '-' else args.output
+
+    # The scanner reports on stderr, this keeps any other print out of a result stream on stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            if args.corpus:
+                artifacts = corpus_artifacts(args.corpus)
+                try:
+                    scanner.analyze_corpus(window, artifacts, output, args.format, args.reasons, (args.since, args.until),
+                                           args.path_prefix, args.workers)
+                except Exception as e:
+                    print(f"Merging the corpus failed: {e}", file=sys.stderr)
+                    return EXIT_FAILED
+                if window.failed or len(window.errors) == len(artifacts):
+                    return EXIT_FAILED
+                return EXIT_PARTIAL if window.errors else EXIT_OK
+            if args.case:
+                scanner.open_case(window, args.case)
+            elif args.journal_file:
+                scanner.scan_journal_file(window, args.journal_file, args.mft, args.volume)
+            else:
+                options = dict(SCAN_PROFILES[args.profile])
+                options['path_prefix'] = args.path_prefix
+                options['drives'] = args.drives.split(',') if args.drives else None
+                scanner.scan_all_drives(window, not args.full, ScanProfile(**options))
+
+            if window.failed or window.errors and not len(scanner.results):
+                return EXIT_FAILED
+            try:
+                scanner.export_results(output, args.format, args.reasons, (args.since, args.until), args.path_prefix)
+            except Exception as e:
+                print(f"Writing the results failed: {e}", file=sys.stderr)
+                return EXIT_FAILED
+            if args.metrics:
+                with open(args.metrics, 'w', encoding='utf-8') as f:
+                    json.dump(scanner.get_scan_metrics(), f, indent=2)
+            return EXIT_PARTIAL if window.errors else EXIT_OK
+        finally:
+            # Spilled rows are only needed until they are written out
+            scanner.close()
+
 def create_fallback_html():
     return """<!DOCTYPE html><html><head><title>Journal Trace - Error</title>
 <style>body{background:#0f172a;color:white;font-family:Arial;padding:20px;}
@@ -627,6 +4246,12 @@ def create_fallback_html():
 </head><body><h1>Journal Trace</h1><div class="error">Web files not found.</div></body></html>"""
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()  # Corpus workers of the frozen executable start through it
+    arguments = parse_arguments(sys.argv[1:])
+    if arguments.headless:
+        # Scheduled jobs run elevated already, there is nobody to answer a UAC prompt
+        sys.exit(run_headless(arguments))
+
     if not is_admin():
         run_as_admin()
     
@@ -649,3 +4274,4 @@ if __name__ == '__main__':
     )
     
     webview.start(debug=False)
+    api.scanner.close()
@@ -0,0 +1,277 @@
+"""Benchmarks for the Journal Trace hot paths on synthetic journals.
+
+    python benchmark.py                          # 100K, 1M and 10M records
+    python benchmark.py --sizes 100k,1m          # a subset
+    python benchmark.py --save-baseline          # keep these numbers as the baseline
+    python benchmark.py --threshold 0.10         # fail when 10% worse than the baseline
+    python benchmark.py --repeat 5               # the fastest of 5 runs per stage
+
+Every size runs in its own process, so peak RSS belongs to that size alone.
+Rates are records per second from the fastest of --repeat runs of every stage.
+Each run is also timed against a fixed reference workload run right before and
+after it: a single run swings by 20% and more on an unchanged tree, mostly with
+the machine's speed, which the reference takes out. The exit code is 1 when
+any stage against the reference or the peak RSS is worse than the baseline by
+more than the threshold, 25% unless --threshold says otherwise.
+"""
+import argparse
+import ctypes
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import concurrent.futures
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+DEFAULT_SIZES = '100k,1m,10m'
+DEFAULT_THRESHOLD = 0.25  # Runs of one tree stay within 20% of each other against the reference
+DEFAULT_REPEAT = 3  # Runs per stage, the fastest one counts
+REFERENCE_ROWS = 50000  # Rows of reference work, about 0.1s per run
+PAGE_SIZE = 200  # Rows per UI page, like PAGE_SIZE in UI.html
+
+STAGES = ('decode', 'mft_index', 'mft_parse', 'journal_read', 'resolve', 'export', 'ui_payload')
+
+def parse_size(text):
+    text = text.strip().lower()
+    for suffix, factor in (('k', 1000), ('m', 1000000)):
+        if text.endswith(suffix):
+            return int(float(text[:-1]) * factor)
+    return int(text)
+
+def format_size(records):
+    if records >= 1000000 and records % 1000000 == 0:
+        return f"{records // 1000000}M"
+    if records >= 1000 and records % 1000 == 0:
+        return f"{records // 1000}K"
+    return str(records)
+
+def peak_rss():
+    """Peak resident set size of this process in bytes"""
+    try:
+        import resource
+    except ImportError:
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                 ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage if sys.platform == 'darwin' else usage * 1024
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+def reference_work():
+    """A fixed slice of interpreter work - dicts, strings, integer math - timed next to every stage"""
+    rows = []
+    for i in range(REFERENCE_ROWS):
+        rows.append({'usn': str(i * 97), 'name': f"file{i % 977}.txt", 'size': i * i % 65521})
+    return len(json.dumps(rows))
+
+def best_of(repeat, function, *args):
+    """Run function repeat times, returns (last result, fastest seconds, score).
+
+    Every run sits between two reference runs and the score is its seconds per
+    reference second - the lowest over the runs. A busy or throttled machine slows
+    both alike, so scores of one tree agree where raw rates swing by a third.
+    """
+    best = None
+    score = None
+    result = None
+    for _ in range(repeat):
+        _, before = timed(reference_work)
+        result = None  # The previous result goes before the next run, peak RSS stays at one
+        result, seconds = timed(function, *args)
+        _, after = timed(reference_work)
+        best = seconds if best is None else min(best, seconds)
+        score = min(score or float('inf'), seconds / min(before, after))
+    return result, best, score
+
+def run_size(records, workers, repeat=DEFAULT_REPEAT):
+    """Time every stage for one journal size, the fastest of repeat runs each, returns the result dict"""
+    # Keep checkpoints and snapshots of the run away from the user's data folder
+    os.environ['LOCALAPPDATA'] = tempfile.mkdtemp(prefix='jt_bench_')
+    from synthetic_journal import generate_volume
+    import JournalTrace
+
+    volume, generate_seconds = timed(lambda: generate_volume('C', files=max(1, records // 4), events=records))
+    result = {'records': records, 'mft_entries': len(volume.mft_refs), 'repeat': repeat,
+              'generate_seconds': round(generate_seconds, 2), 'peak_rss_generate': peak_rss(), 'rates': {}, 'scores': {}}
+    rates = result['rates']
+    scores = result['scores']
+
+    backend = JournalTrace.MemoryVolumeBackend([volume])
+    scanner = JournalTrace.JournalScanner(backend=backend, decode_workers=workers)
+    scanner.is_scanning = True
+
+    # Buffer decoding, on the 8MB buffers a journal read hands the decoder
+    handle = backend.open_volume('C')
+    buffer_size = 8 * 1024 * 1024
+    buffers = []
+    usn = 0
+    while usn < volume.next_usn:
+        output_buffer = ctypes.create_string_buffer(buffer_size)
+        length = backend.device_io_control(handle, JournalTrace.FSCTL_READ_USN_JOURNAL,
+                                           JournalTrace.struct.pack('<qIIQQQ', usn, 0xFFFFFFFF, 0, 0, 0, volume.journal_id),
+                                           output_buffer, buffer_size)
+        buffers.append((output_buffer, length))
+        usn = JournalTrace.UsnRecordDecoder.read_header(output_buffer)
+    decoder = JournalTrace.UsnRecordDecoder()
+    def decode():
+        return sum(len(decoder.decode(output_buffer, length)[0]) for output_buffer, length in buffers)
+    decoded, seconds, scores['decode'] = best_of(repeat, decode)
+    rates['decode'] = decoded / seconds
+    del buffers
+
+    # MFT path-cache construction through FSCTL_ENUM_USN_DATA
+    path_resolver, seconds, scores['mft_index'] = best_of(repeat, scanner.build_mft_path_cache, 'C')
+    rates['mft_index'] = len(volume.mft_refs) / seconds
+
+    # The same map parsed from a collected $MFT, in a process pool of the decode pool's size
+    mft_file = os.path.join(os.environ['LOCALAPPDATA'], '$MFT')
+    volume.write_mft_file(mft_file)
+    parent_cache, seconds, scores['mft_parse'] = best_of(repeat, JournalTrace.read_mft_file, mft_file, workers)
+    rates['mft_parse'] = len(parent_cache) / seconds
+    del parent_cache
+    os.remove(mft_file)
+
+    # The pipelined journal read into an EntryStore, decode pool included
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as decode_pool:
+        scanner.decode_pool = decode_pool
+        (entries, _, _), seconds, scores['journal_read'] = best_of(repeat, scanner.read_usn_journal_fast, 'C',
+                                                                   path_resolver, None, False)
+        scanner.decode_pool = None
+    rates['journal_read'] = len(entries) / seconds
+    path_resolver.history = JournalTrace.DirectoryHistory.from_store(entries)
+    scanner.results = entries
+
+    # Point-in-time path of every row, starting from a cold directory cache
+    def resolve():
+        path_resolver.directory_paths.clear()
+        path = entries.path
+        for i in range(len(entries)):
+            path(i)
+    _, seconds, scores['resolve'] = best_of(repeat, resolve)
+    rates['resolve'] = len(entries) / seconds
+
+    export_file = os.path.join(os.environ['LOCALAPPDATA'], 'export.csv')
+    _, seconds, scores['export'] = best_of(repeat, scanner.export_results, export_file)
+    rates['export'] = len(entries) / seconds
+    os.remove(export_file)
+
+    # What reaches the UI - the result set now goes over as JSON pages of rows
+    def ui_payload():
+        for offset in range(0, len(entries), PAGE_SIZE):
+            json.dumps(entries.rows(offset, offset + PAGE_SIZE))
+    _, seconds, scores['ui_payload'] = best_of(repeat, ui_payload)
+    rates['ui_payload'] = len(entries) / seconds
+
+    result['peak_rss'] = peak_rss()
+    shutil.rmtree(os.environ['LOCALAPPDATA'], ignore_errors=True)
+    return result
+
+def run_in_child(records, workers, repeat):
+    with tempfile.NamedTemporaryFile('r', suffix='.json', delete=False) as f:
+        output = f.name
+    try:
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--run-size', str(records),
+                        '--workers', str(workers), '--repeat', str(repeat), '--output', output],
+                       check=True, stdout=subprocess.DEVNULL)
+        with open(output, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        os.remove(output)
+
+def compare(results, baseline, threshold):
+    """Return the regressions of results against baseline as printable lines"""
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if not previous:
+            continue
+        for stage, rate in result['rates'].items():
+            before = previous['rates'].get(stage)
+            if not before:
+                continue
+            # Scores take the machine's speed out, baselines from before they existed only have rates
+            score, before_score = result['scores'].get(stage), previous.get('scores', {}).get(stage)
+            change = before_score / score if score and before_score else rate / before
+            if change < 1 - threshold:
+                regressions.append(f"{key} {stage}: {rate:,.0f} rec/s, baseline {before:,.0f} rec/s "
+                                   f"({(change - 1) * 100:+.1f}% against the reference work)")
+        if previous.get('peak_rss') and result['peak_rss'] > previous['peak_rss'] * (1 + threshold):
+            regressions.append(f"{key} peak RSS: {result['peak_rss'] / 2**20:,.0f} MB, "
+                               f"baseline {previous['peak_rss'] / 2**20:,.0f} MB")
+    return regressions
+
+def print_results(results):
+    print(f"{'records':>8} " + ' '.join(f"{stage:>13}" for stage in STAGES) + f" {'peak RSS':>10}")
+    for key, result in results.items():
+        rates = ' '.join(f"{result['rates'][stage]:>13,.0f}" for stage in STAGES)
+        print(f"{key:>8} {rates} {result['peak_rss'] / 2**20:>8,.0f}MB")
+    print("(records/sec per stage)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Journal Trace hot paths on synthetic journals")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help="comma separated record counts, e.g. 100k,1m,10m")
+    parser.add_argument('--workers', type=int, default=4, help="decode pool size for the journal read")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="baseline JSON file")
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown / memory growth against the baseline, 25%% (0.25) by default")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="runs per stage, the fastest one counts")
+    parser.add_argument('--run-size', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--output', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_size:
+        result = run_size(args.run_size, args.workers, max(1, args.repeat))
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+        return 0
+
+    results = {}
+    for records in (parse_size(size) for size in args.sizes.split(',')):
+        print(f"Running {format_size(records)} records...", flush=True)
+        results[format_size(records)] = run_in_child(records, args.workers, max(1, args.repeat))
+    print_results(results)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline yet - run with --save-baseline to create one")
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        regressions = compare(results, json.load(f), args.threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if regressions:
+        return 1
+    print(f"No regressions beyond {args.threshold:.0%} of the baseline")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,350 @@
+"""Synthetic NTFS volumes for Journal Trace.
+
+Builds the two things a scan reads from a volume - the MFT enumeration
+(FSCTL_ENUM_USN_DATA) and the USN journal as USN_RECORD_V2 records - at any
+scale: millions of files, deep directory trees and rename storms. Serve the
+volumes through JournalTrace.MemoryVolumeBackend to run and time scans
+without a Windows admin session.
+"""
+import random
+import struct
+import threading
+from array import array
+
+USN_RECORD_V2_HEADER = struct.Struct('<IHHQQqqIIIIHH')
+MFT_RECORD_HEADER = struct.Struct('<4sHHQHHHHIIQHHI')  # FILE record header, fixup array at 0x30
+MFT_ATTRIBUTE_HEADER = struct.Struct('<IIBBHHHIHBB')  # Resident attribute header, value at 0x18
+MFT_FILE_NAME = struct.Struct('<QqqqqQQIIBB')  # $FILE_NAME up to the name
+
+ROOT_REF = 5
+FIRST_USER_REF = 64  # Refs below are the NTFS metafiles
+FILETIME_2024 = 133485408000000000  # 2024-01-01 00:00:00
+
+FILE_ATTRIBUTE_DIRECTORY = 0x10
+FILE_ATTRIBUTE_ARCHIVE = 0x20
+
+DATA_OVERWRITE = 0x00000001
+DATA_EXTEND = 0x00000002
+FILE_CREATE = 0x00000100
+FILE_DELETE = 0x00000200
+SECURITY_CHANGE = 0x00000800
+RENAME_OLD_NAME = 0x00001000
+RENAME_NEW_NAME = 0x00002000
+BASIC_INFO_CHANGE = 0x00008000
+CLOSE = 0x80000000
+
+NAME_WORDS = ('report', 'invoice', 'photo', 'setup', 'notes', 'backup', 'cache', 'config', 'data',
+              'draft', 'export', 'index', 'log', 'manifest', 'module', 'package', 'readme', 'session',
+              'snapshot', 'temp', 'update', 'user', 'video', 'widget')
+FILE_EXTENSIONS = ('txt', 'docx', 'xlsx', 'pdf', 'jpg', 'png', 'dll', 'exe', 'json', 'log', 'tmp', 'zip')
+DIRECTORY_WORDS = ('Users', 'Program Files', 'Windows', 'AppData', 'Local', 'Roaming', 'Documents',
+                   'Downloads', 'Projects', 'src', 'build', 'Temp', 'cache', 'logs', 'assets', 'lib')
+
+def encode_usn_record(file_ref, parent_ref, usn, timestamp, reason, attributes, name):
+    """One USN_RECORD_V2, padded to 8 bytes like NTFS writes them"""
+    raw_name = name.encode('utf-16-le')
+    length = (USN_RECORD_V2_HEADER.size + len(raw_name) + 7) & ~7
+    header = USN_RECORD_V2_HEADER.pack(length, 2, 0, file_ref, parent_ref, usn, timestamp, reason,
+                                       0, 0, attributes, len(raw_name), USN_RECORD_V2_HEADER.size)
+    return header + raw_name + b'\x00' * (length - USN_RECORD_V2_HEADER.size - len(raw_name))
+
+class SyntheticVolume:
+    """An in-memory volume image in the shape MemoryVolumeBackend serves.
+
+    nodes holds the current {ref: (parent_ref, name, attributes)} of every file,
+    the journal is one bytearray of records whose USNs are their offsets plus
+    journal_start. append_records lets a test keep writing to a live volume.
+    """
+
+    def __init__(self, letter='C', serial=None, journal_id=None, journal_start=0, label='Synthetic'):
+        self.letter = letter
+        self.serial = serial if serial is not None else 0x5E000000 | ord(letter)
+        self.label = label
+        self.journal_id = journal_id if journal_id is not None else 0x01D0000000000000 | ord(letter)
+        self.journal_start = journal_start
+        self.lowest_valid_usn = journal_start
+        self.max_size = 32 * 1024 * 1024
+        self.allocation_delta = 8 * 1024 * 1024
+        self.nodes = {}
+        self.sequences = {}  # ref -> sequence number, bumped when a ref is reused
+        self.journal = bytearray()
+        self.journal_usns = array('q')
+        self.next_usn = journal_start
+        self.mft_refs = []
+        self.mft_records = []
+        self.changed = threading.Condition()
+
+    def full_ref(self, ref):
+        return ref | (self.sequences.get(ref, 1) << 48)
+
+    def write(self, ref, parent_ref, timestamp, reason, attributes, name):
+        """Append one record for ref and return its USN"""
+        usn = self.next_usn
+        record = encode_usn_record(self.full_ref(ref), self.full_ref(parent_ref), usn, timestamp,
+                                   reason, attributes, name)
+        self.journal += record
+        self.journal_usns.append(usn)
+        self.next_usn += len(record)
+        return usn
+
+    def append_records(self, records):
+        """Write (ref, parent_ref, timestamp, reason, attributes, name) records to the live journal"""
+        with self.changed:
+            for ref, parent_ref, timestamp, reason, attributes, name in records:
+                self.write(ref, parent_ref, timestamp, reason, attributes, name)
+                if reason & FILE_DELETE:
+                    self.nodes.pop(ref, None)
+                elif reason & (FILE_CREATE | RENAME_NEW_NAME):
+                    self.nodes[ref] = (parent_ref, name, attributes)
+            self.changed.notify_all()
+
+    def build_mft(self):
+        """Encode the enumeration records of the current nodes, sorted by file reference"""
+        self.mft_refs = sorted(self.nodes)
+        self.mft_records = []
+        for ref in self.mft_refs:
+            parent_ref, name, attributes = self.nodes[ref]
+            self.mft_records.append(encode_usn_record(self.full_ref(ref), self.full_ref(parent_ref), 0, 0, 0,
+                                                      attributes, name))
+        self.mft_refs = array('Q', self.mft_refs)
+
+    def write_journal_file(self, filename, sparse_prefix=0):
+        """Write the journal as a $UsnJrnl:$J stream, optionally behind a zero-filled hole"""
+        with open(filename, 'wb') as f:
+            if sparse_prefix:
+                f.truncate(sparse_prefix)
+                f.seek(sparse_prefix)
+            f.write(self.journal)
+
+    def write_mft_file(self, filename, record_size=1024, sector_size=512):
+        """Write the current nodes as a collected $MFT - FILE records with update sequence fixups.
+
+        Every record has $STANDARD_INFORMATION and its $FILE_NAME, some first get a
+        DOS 8.3 name and a resident $ATTRIBUTE_LIST of varying size, which pushes
+        their names across the sector ends the fixups protect.
+        """
+        fixup_offset = MFT_RECORD_HEADER.size
+        fixup_count = record_size // sector_size + 1
+        first_attribute = (fixup_offset + 2 * fixup_count + 7) & ~7
+        nodes = dict(self.nodes)
+        nodes.setdefault(0, (ROOT_REF, '$MFT', 0))
+        nodes.setdefault(ROOT_REF, (ROOT_REF, '.', FILE_ATTRIBUTE_DIRECTORY))
+        empty = bytes(record_size)
+
+        def attribute(attribute_type, value):
+            length = (MFT_ATTRIBUTE_HEADER.size + len(value) + 7) & ~7
+            header = MFT_ATTRIBUTE_HEADER.pack(attribute_type, length, 0, 0, 0, 0, 0, len(value),
+                                               MFT_ATTRIBUTE_HEADER.size, 0, 0)
+            return header + value + bytes(length - MFT_ATTRIBUTE_HEADER.size - len(value))
+
+        def file_name(parent_ref, name, namespace):
+            raw_name = name.encode('utf-16-le')
+            return attribute(0x30, MFT_FILE_NAME.pack(self.full_ref(parent_ref), 0, 0, 0, 0, 0, 0, 0, 0,
+                                                      len(raw_name) // 2, namespace) + raw_name)
+
+        with open(filename, 'wb') as f:
+            for ref in range(max(nodes) + 1):
+                node = nodes.get(ref)
+                if node is None:
+                    f.write(empty)
+                    continue
+                parent_ref, name, attributes = node
+                body = attribute(0x10, bytes(72))
+                namespace = 3  # Win32 and DOS in one
+                if ref % 3 == 0:
+                    body += attribute(0x20, bytes(ref % 400))
+                    body += file_name(parent_ref, name[:6].upper() + '~1', 2)
+                    namespace = 1
+                body += file_name(parent_ref, name, namespace) + struct.pack('<I', 0xFFFFFFFF)
+                used = first_attribute + len(body)
+                if used > record_size:
+                    raise ValueError(f"{name} does not fit a {record_size} byte record")
+                flags = 0x01 | (0x02 if attributes & FILE_ATTRIBUTE_DIRECTORY else 0)
+                record = bytearray(record_size)
+                MFT_RECORD_HEADER.pack_into(record, 0, b'FILE', fixup_offset, fixup_count, 0,
+                                            self.sequences.get(ref, 1), 1, first_attribute, flags,
+                                            (used + 7) & ~7, record_size, 0, 0, 0, ref)
+                record[first_attribute:used] = body
+                # The last two bytes of every sector move to the fixup array, the sequence number takes their place
+                check = (ref % 0xFFFE + 1).to_bytes(2, 'little')
+                record[fixup_offset:fixup_offset + 2] = check
+                for sector in range(1, fixup_count):
+                    end = sector * sector_size
+                    record[fixup_offset + 2 * sector:fixup_offset + 2 * sector + 2] = record[end - 2:end]
+                    record[end - 2:end] = check
+                f.write(record)
+
+    def path(self, ref):
+        names = []
+        seen = set()
+        while ref != ROOT_REF and ref in self.nodes and ref not in seen:
+            seen.add(ref)
+            parent_ref, name, _ = self.nodes[ref]
+            names.append(name)
+            ref = parent_ref
+        return f"{self.letter}:\\" + '\\'.join(reversed(names))
+
+def generate_volume(letter='C', files=100000, directories=None, depth=12, events=None,
+                    rename_storms=2, storm_size=5000, seed=0, journal_start=0, start_time=FILETIME_2024):
+    """Build a SyntheticVolume with a directory tree, files and a journal of realistic activity.
+
+    - directories (files // 20 by default) hang off each other up to depth levels,
+      newer directories favour recent parents so deep chains form like real trees
+    - events (2 per file by default) mix creates with their extend/close records,
+      overwrites, attribute and security changes, deletes, renames and browser
+      download sequences (.crdownload renamed to its final name)
+    - rename_storms bursts rename storm_size files back to back and rename a
+      directory with a large subtree, the worst case for point-in-time paths
+    """
+    rng = random.Random(seed)
+    volume = SyntheticVolume(letter, journal_start=journal_start)
+    nodes = volume.nodes
+    directories = max(1, files // 20) if directories is None else max(1, directories)
+    events = files * 2 if events is None else events
+    next_ref = FIRST_USER_REF
+
+    directory_refs = [ROOT_REF]
+    directory_depths = {ROOT_REF: 0}
+    for i in range(directories):
+        # Recent parents make chains, the occasional random one keeps the tree wide
+        if rng.random() < 0.7:
+            parent_ref = directory_refs[-1 - int(rng.random() * min(len(directory_refs), 8))]
+        else:
+            parent_ref = rng.choice(directory_refs)
+        if directory_depths[parent_ref] >= depth:
+            parent_ref = ROOT_REF
+        name = f"{rng.choice(DIRECTORY_WORDS)}{i}" if i >= len(DIRECTORY_WORDS) else DIRECTORY_WORDS[i]
+        nodes[next_ref] = (parent_ref, name, FILE_ATTRIBUTE_DIRECTORY)
+        directory_refs.append(next_ref)
+        directory_depths[next_ref] = directory_depths[parent_ref] + 1
+        next_ref += 1
+
+    def file_name():
+        return f"{rng.choice(NAME_WORDS)}_{rng.randrange(1000000)}.{rng.choice(FILE_EXTENSIONS)}"
+
+    file_refs = []
+    for _ in range(files):
+        nodes[next_ref] = (rng.choice(directory_refs), file_name(), FILE_ATTRIBUTE_ARCHIVE)
+        file_refs.append(next_ref)
+        next_ref += 1
+
+    timestamp = start_time
+    storms = sorted(rng.randrange(max(1, events)) for _ in range(rename_storms))
+    write = volume.write
+    written = 0
+
+    while written < events:
+        timestamp += rng.randrange(1, 20000)  # Up to 2ms apart
+        if storms and written >= storms[0]:
+            storms.pop(0)
+            written += rename_storm(volume, rng, file_refs, directory_refs, storm_size, timestamp)
+            continue
+
+        roll = rng.random()
+        if roll < 0.25 or not file_refs:
+            # New file - create, first write, close
+            ref = next_ref
+            next_ref += 1
+            parent_ref = rng.choice(directory_refs)
+            name = file_name()
+            nodes[ref] = (parent_ref, name, FILE_ATTRIBUTE_ARCHIVE)
+            file_refs.append(ref)
+            write(ref, parent_ref, timestamp, FILE_CREATE, FILE_ATTRIBUTE_ARCHIVE, name)
+            write(ref, parent_ref, timestamp, FILE_CREATE | DATA_EXTEND, FILE_ATTRIBUTE_ARCHIVE, name)
+            write(ref, parent_ref, timestamp, FILE_CREATE | DATA_EXTEND | CLOSE, FILE_ATTRIBUTE_ARCHIVE, name)
+            written += 3
+        elif roll < 0.5:
+            ref = rng.choice(file_refs)
+            if ref not in nodes:
+                continue
+            parent_ref, name, attributes = nodes[ref]
+            write(ref, parent_ref, timestamp, DATA_OVERWRITE, attributes, name)
+            write(ref, parent_ref, timestamp, DATA_OVERWRITE | DATA_EXTEND | CLOSE, attributes, name)
+            written += 2
+        elif roll < 0.62:
+            ref = rng.choice(file_refs)
+            if ref not in nodes:
+                continue
+            parent_ref, name, attributes = nodes[ref]
+            reason = rng.choice((BASIC_INFO_CHANGE, SECURITY_CHANGE))
+            write(ref, parent_ref, timestamp, reason | CLOSE, attributes, name)
+            written += 1
+        elif roll < 0.75:
+            ref = rng.choice(file_refs)
+            if ref not in nodes:
+                continue
+            parent_ref, name, attributes = nodes.pop(ref)
+            write(ref, parent_ref, timestamp, FILE_DELETE | CLOSE, attributes, name)
+            volume.sequences[ref] = volume.sequences.get(ref, 1) + 1
+            written += 1
+        elif roll < 0.9:
+            ref = rng.choice(file_refs)
+            if ref not in nodes:
+                continue
+            parent_ref, name, attributes = nodes[ref]
+            new_parent_ref = parent_ref if rng.random() < 0.8 else rng.choice(directory_refs)
+            new_name = file_name()
+            write(ref, parent_ref, timestamp, RENAME_OLD_NAME, attributes, name)
+            write(ref, new_parent_ref, timestamp, RENAME_NEW_NAME, attributes, new_name)
+            write(ref, new_parent_ref, timestamp, RENAME_NEW_NAME | CLOSE, attributes, new_name)
+            nodes[ref] = (new_parent_ref, new_name, attributes)
+            written += 3
+        else:
+            # Browser download - a .crdownload grows, then takes the final name
+            ref = next_ref
+            next_ref += 1
+            parent_ref = directory_refs[min(len(directory_refs) - 1, 8)]  # Downloads
+            final_name = f"{rng.choice(NAME_WORDS)}_{rng.randrange(100000)}.{rng.choice(('zip', 'exe', 'pdf'))}"
+            temp_name = f"Unconfirmed {rng.randrange(1000000)}.crdownload"
+            file_refs.append(ref)
+            write(ref, parent_ref, timestamp, FILE_CREATE, FILE_ATTRIBUTE_ARCHIVE, temp_name)
+            for _ in range(rng.randrange(1, 4)):
+                write(ref, parent_ref, timestamp, FILE_CREATE | DATA_EXTEND, FILE_ATTRIBUTE_ARCHIVE, temp_name)
+                written += 1
+            write(ref, parent_ref, timestamp, FILE_CREATE | DATA_EXTEND | RENAME_OLD_NAME, FILE_ATTRIBUTE_ARCHIVE, temp_name)
+            write(ref, parent_ref, timestamp, FILE_CREATE | DATA_EXTEND | RENAME_NEW_NAME, FILE_ATTRIBUTE_ARCHIVE, final_name)
+            write(ref, parent_ref, timestamp, FILE_CREATE | DATA_EXTEND | RENAME_NEW_NAME | CLOSE,
+                  FILE_ATTRIBUTE_ARCHIVE, final_name)
+            nodes[ref] = (parent_ref, final_name, FILE_ATTRIBUTE_ARCHIVE)
+            written += 4
+
+    volume.build_mft()
+    return volume
+
+def rename_storm(volume, rng, file_refs, directory_refs, storm_size, timestamp):
+    """Rename storm_size files in a row, then move a whole directory, returns the records written"""
+    nodes = volume.nodes
+    write = volume.write
+    written = 0
+    for ref in rng.sample(file_refs, min(storm_size, len(file_refs))):
+        if ref not in nodes:
+            continue
+        parent_ref, name, attributes = nodes[ref]
+        stem, dot, extension = name.rpartition('.')
+        new_name = f"{stem}~{rng.randrange(1000)}{dot}{extension}"
+        write(ref, parent_ref, timestamp, RENAME_OLD_NAME, attributes, name)
+        write(ref, parent_ref, timestamp, RENAME_NEW_NAME | CLOSE, attributes, new_name)
+        nodes[ref] = (parent_ref, new_name, attributes)
+        timestamp += 1
+        written += 2
+
+    # The directory with the most subdirectories gets renamed, every path below it changes
+    children = {}
+    for ref in directory_refs[1:]:
+        if ref in nodes:
+            parent_ref = nodes[ref][0]
+            children[parent_ref] = children.get(parent_ref, 0) + 1
+    candidates = [ref for ref in children if ref != ROOT_REF and ref in nodes]
+    if candidates:
+        ref = max(candidates, key=children.get)
+        parent_ref, name, attributes = nodes[ref]
+        new_name = f"{name}.old"
+        write(ref, parent_ref, timestamp, RENAME_OLD_NAME, attributes, name)
+        write(ref, parent_ref, timestamp, RENAME_NEW_NAME | CLOSE, attributes, new_name)
+        nodes[ref] = (parent_ref, new_name, attributes)
+        written += 2
+    return written
+
+def generate_volumes(count=2, files=100000, seed=0, **options):
+    """Volumes C:, D:, ... with distinct contents, for multi-volume scans"""
+    return [generate_volume(chr(ord('C') + i), files=files, seed=seed + i, **options) for i in range(count)]
@@ -0,0 +1,82 @@
+import functools
+import operator
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import JournalTrace
+from synthetic_journal import generate_volumes, FILETIME_2024, FILE_CREATE, FILE_DELETE, DATA_EXTEND, CLOSE
+
+
+def scan(tmp_path, monkeypatch):
+    monkeypatch.setenv('LOCALAPPDATA', str(tmp_path))
+    monkeypatch.setattr(JournalTrace, 'CASE_SEGMENT_ROWS', 500)
+    volumes = generate_volumes(2, files=500, events=2000, rename_storms=1, storm_size=100)
+    scanner = JournalTrace.JournalScanner(backend=JournalTrace.MemoryVolumeBackend(volumes), decode_workers=1)
+    scanner.scan_all_drives(JournalTrace.ConsoleWindow(quiet=True))
+    return scanner
+
+
+def test_reopened_case_shows_the_scanned_rows(tmp_path, monkeypatch):
+    scanner = scan(tmp_path, monkeypatch)
+    directory = scanner.case.directory
+    assert len(scanner.case.segments) > 2
+
+    reopened = JournalTrace.JournalScanner(backend=JournalTrace.MemoryVolumeBackend([]), decode_workers=1)
+    window = JournalTrace.ConsoleWindow(quiet=True)
+    reopened.open_case(window, directory)
+    assert not window.errors
+    deadline = time.time() + 30
+    while reopened.case_indexing and time.time() < deadline:
+        time.sleep(0.01)
+    assert not reopened.case_indexing
+    assert reopened.results.rows() == scanner.results.rows()
+    assert reopened.query('e', FILE_CREATE) == scanner.query('e', FILE_CREATE)
+
+
+def test_segment_summaries_only_skip_what_cannot_match(tmp_path, monkeypatch):
+    scanner = scan(tmp_path, monkeypatch)
+    case = JournalTrace.CaseStore.open(scanner.case.directory)
+    store = scanner.results
+    try:
+        assert case.rows == len(store)
+        timestamps = sorted(store.timestamps)
+        start_time, end_time = timestamps[len(timestamps) // 3], timestamps[len(timestamps) // 2]
+        for text, reason_mask, low, high in [('', FILE_DELETE, None, None), ('', 0, start_time, end_time),
+                                             ('txt', DATA_EXTEND, start_time, None), ('1', 0, None, None)]:
+            expected = [i for i in range(len(store))
+                        if (not text or text in store.name(i).lower() or str(store.usns[i]).startswith(text))
+                        and (not reason_mask or store.reasons[i] & reason_mask)
+                        and (low is None or store.timestamps[i] >= low) and (high is None or store.timestamps[i] <= high)]
+            assert list(case.matches(text, reason_mask, low, high)) == expected, (text, reason_mask, low, high)
+        for segment in case.segments:
+            assert segment.reasons == functools.reduce(operator.or_, segment.columns['reasons'])
+            assert segment.min_timestamp == min(segment.columns['timestamps'])
+    finally:
+        case.close()
+
+
+def test_segments_past_the_string_table_are_dropped(tmp_path):
+    directory = str(tmp_path / 'case')
+    case = JournalTrace.CaseStore.create(directory)
+    first = JournalTrace.EntryStore()
+    first.append(8, 100, 5, FILETIME_2024, FILE_CREATE | CLOSE, 0x20, 'a.txt', 'C')
+    case.append(first)
+    strings_size = os.path.getsize(os.path.join(directory, 'strings.jts'))
+    second = JournalTrace.EntryStore()
+    second.append(16, 101, 5, FILETIME_2024, FILE_CREATE | CLOSE, 0x20, 'b.txt', 'C')
+    case.append(second)
+    case.close()
+    # The scan stopped after writing the segment, before its names reached the string table
+    with open(os.path.join(directory, 'strings.jts'), 'r+b') as f:
+        f.truncate(strings_size)
+
+    reopened = JournalTrace.CaseStore.open(directory)
+    try:
+        assert reopened.rows == 1
+        store = reopened.load()
+        assert [store.name(i) for i in range(len(store))] == ['a.txt']
+    finally:
+        reopened.close()
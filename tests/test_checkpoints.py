@@ -0,0 +1,44 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import JournalTrace
+from synthetic_journal import generate_volume, FILETIME_2024, FILE_CREATE, CLOSE, FILE_ATTRIBUTE_ARCHIVE
+
+
+def scan(scanner, incremental=True):
+    window = JournalTrace.ConsoleWindow(quiet=True)
+    scanner.scan_all_drives(window, incremental=incremental)
+    assert not window.errors
+    return [scanner.results.row(i) for i in range(len(scanner.results))]
+
+
+def test_rescan_continues_from_the_case_of_the_last_scan(tmp_path, monkeypatch):
+    monkeypatch.setenv('LOCALAPPDATA', str(tmp_path))
+    volume = generate_volume('C', files=500, events=3000, rename_storms=0)
+    scanner = JournalTrace.JournalScanner(backend=JournalTrace.MemoryVolumeBackend([volume]), decode_workers=1)
+    first = scan(scanner)
+    checkpoint, = scanner.checkpoints.volumes.values()
+    assert checkpoint['next_usn'] == volume.next_usn and checkpoint['case'] == scanner.case.directory
+    assert not os.path.exists(os.path.join(str(tmp_path), 'JournalTrace', f"volume_{volume.serial:08X}.jts"))
+
+    volume.append_records([(9000 + i, 5, FILETIME_2024 + i, FILE_CREATE | CLOSE, FILE_ATTRIBUTE_ARCHIVE, f"new{i}.txt")
+                           for i in range(25)])
+    second = scan(scanner)
+    assert scanner.metrics.counters['checkpoint_hits'] == 1
+    assert second[:len(first)] == first and len(second) == len(first) + 25
+    assert second == scan(scanner, incremental=False)
+
+
+def test_rescan_reads_everything_once_the_case_is_gone(tmp_path, monkeypatch):
+    monkeypatch.setenv('LOCALAPPDATA', str(tmp_path))
+    volume = generate_volume('C', files=500, events=3000, rename_storms=0)
+    scanner = JournalTrace.JournalScanner(backend=JournalTrace.MemoryVolumeBackend([volume]), decode_workers=1)
+    first = scan(scanner)
+    scanner.case.close()
+    JournalTrace.shutil.rmtree(scanner.case.directory)
+    scanner.case = None
+
+    assert scan(scanner) == first
+    assert scanner.metrics.counters['checkpoint_misses'] == 1
@@ -0,0 +1,49 @@
+import csv
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import JournalTrace
+from synthetic_journal import generate_volume
+
+
+def collect(tmp_path, host, seed):
+    volume = generate_volume('C', files=300, events=1500, rename_storms=0, seed=seed)
+    folder = tmp_path / 'corpus' / host
+    folder.mkdir(parents=True)
+    volume.write_mft_file(str(folder / '$MFT'))
+    volume.write_journal_file(str(folder / '$J'))
+    return volume
+
+
+def run(tmp_path, monkeypatch, *argv):
+    monkeypatch.setenv('LOCALAPPDATA', str(tmp_path / 'data'))
+    return JournalTrace.run_headless(JournalTrace.parse_arguments(['--headless', '--quiet', '--workers', '2', *argv]))
+
+
+def read_csv(path):
+    with open(path, encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def test_hosts_merge_into_one_timeline(tmp_path, monkeypatch):
+    volumes = {host: collect(tmp_path, host, seed) for seed, host in enumerate(('HOST01', 'HOST02', 'HOST03'))}
+    output = str(tmp_path / 'timeline.csv')
+    assert run(tmp_path, monkeypatch, '--corpus', str(tmp_path / 'corpus'), '--output', output) == JournalTrace.EXIT_OK
+    rows = read_csv(output)
+    assert len(rows) == sum(len(volume.journal_usns) for volume in volumes.values())
+    assert [row['Timestamp'] for row in rows] == sorted(row['Timestamp'] for row in rows)
+    for host, volume in volumes.items():
+        assert [row['USN'] for row in rows if row['Host'] == host] == [str(usn) for usn in volume.journal_usns]
+    # Paths come from the $MFT collected next to each journal
+    assert all(row['Path'].startswith('C:\\') and row['Drive'] == 'C' for row in rows)
+
+
+def test_a_journal_that_cannot_be_read_is_a_partial_result(tmp_path, monkeypatch):
+    collect(tmp_path, 'HOST01', 0)
+    output = str(tmp_path / 'timeline.csv')
+    missing = f"HOST02={tmp_path / 'missing' / '$J'}"
+    assert run(tmp_path, monkeypatch, '--corpus', str(tmp_path / 'corpus'), missing, '--output', output) == JournalTrace.EXIT_PARTIAL
+    assert {row['Host'] for row in read_csv(output)} == {'HOST01'}
+    assert run(tmp_path, monkeypatch, '--corpus', missing, '--output', output) == JournalTrace.EXIT_FAILED
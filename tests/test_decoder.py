@@ -0,0 +1,43 @@
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import JournalTrace
+from synthetic_journal import encode_usn_record, FILETIME_2024, FILE_CREATE, CLOSE
+
+TIMESTAMP_OFFSET = 32  # TimeStamp in USN_RECORD_V2
+
+
+def journal(timestamps):
+    """A $J stream with one record per timestamp, raw 64-bit values patched in after encoding"""
+    data = bytearray()
+    for i, timestamp in enumerate(timestamps):
+        record = bytearray(encode_usn_record(100 + i, 5, len(data), 0, FILE_CREATE | CLOSE, 0x20, f'file{i}.txt'))
+        struct.pack_into('<Q', record, TIMESTAMP_OFFSET, timestamp)
+        data += record
+    return bytes(data)
+
+
+def test_out_of_range_timestamp_is_kept(tmp_path, monkeypatch):
+    monkeypatch.setenv('LOCALAPPDATA', str(tmp_path))
+    path = tmp_path / 'J.bin'
+    path.write_bytes(journal([FILETIME_2024, 0xFFFFFFFFFFFFFFFF, 1 << 63, FILETIME_2024 + 10000000]))
+
+    scanner = JournalTrace.JournalScanner(scan_workers=1, decode_workers=1)
+    scanner.is_scanning = True
+    entries, _, _ = scanner.read_usn_journal_file(str(path))
+
+    assert len(entries) == 4
+    assert [entries.name(i) for i in range(4)] == ['file0.txt', 'file1.txt', 'file2.txt', 'file3.txt']
+    assert JournalTrace.format_timestamps(entries.timestamps) == [
+        '2024-01-01T00:00:00', None, None, '2024-01-01T00:00:01']
+    assert entries.oldest_timestamp() == '2024-01-01T00:00:00'
+
+
+def test_decoder_reads_timestamp_as_signed():
+    data = b'\0' * 8 + journal([0xFFFFFFFFFFFFFFFF])
+    records, end = JournalTrace.UsnRecordDecoder().decode(data, len(data))
+    assert end == len(data)
+    assert records[0][3] == -1
@@ -0,0 +1,52 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import JournalTrace
+from synthetic_journal import FILETIME_2024, FILE_CREATE, FILE_DELETE, CLOSE, FILE_ATTRIBUTE_ARCHIVE
+
+DIRECTORY = 0x10
+
+
+def store_of(drive_letter, names):
+    store = JournalTrace.EntryStore()
+    for i, name in enumerate(names):
+        store.append(4096 + i * 96, 100 + i, 5, FILETIME_2024 + i, FILE_CREATE | CLOSE, FILE_ATTRIBUTE_ARCHIVE, name, drive_letter)
+    return store
+
+
+def test_names_and_drives_are_interned():
+    store = store_of('C', ['a.txt', 'b.txt', 'a.txt'])
+    assert store.strings == ['a.txt', 'C', 'b.txt']
+    assert list(store.name_ids) == [0, 2, 0] and list(store.drive_ids) == [1, 1, 1]
+
+
+def test_extend_remaps_string_ids():
+    store = store_of('C', ['a.txt', 'b.txt'])
+    store.extend(store_of('D', ['b.txt', 'c.txt']))
+    assert len(store) == 4
+    assert [store.name(i) for i in range(4)] == ['a.txt', 'b.txt', 'b.txt', 'c.txt']
+    assert [store.strings[i] for i in store.drive_ids] == ['C', 'C', 'D', 'D']
+    assert store.strings.count('b.txt') == 1
+
+
+def test_row_builds_the_ui_entry():
+    store = JournalTrace.EntryStore()
+    store.append(2 ** 40, 2 ** 60 + 7, 5, FILETIME_2024, FILE_DELETE | CLOSE, DIRECTORY, 'old', 'E')
+    row = store.row(0)
+    assert row['usn'] == str(2 ** 40) and row['fileReference'] == str(2 ** 60 + 7)
+    assert row['path'] == 'E:\\old' and row['isDirectory']
+    assert row['reason'] == JournalTrace.format_reason(FILE_DELETE | CLOSE)
+    assert row['timestamp'] == JournalTrace.format_timestamps((FILETIME_2024,))[0]
+    assert store.rows() == list(store)
+
+
+def test_slice_and_take_share_the_string_table():
+    store = store_of('C', ['a.txt', 'b.txt', 'c.txt', 'd.txt'])
+    part = store.slice(1, 3)
+    assert [part.name(i) for i in range(len(part))] == ['b.txt', 'c.txt']
+    assert part.strings is store.strings
+    taken = store.take([3, 0])
+    assert [taken.name(i) for i in range(len(taken))] == ['d.txt', 'a.txt']
+    assert store.count_unique() == (4, 0)
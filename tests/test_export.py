@@ -0,0 +1,93 @@
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import JournalTrace
+from synthetic_journal import (generate_volume, FILETIME_2024, FILE_CREATE, FILE_DELETE, RENAME_OLD_NAME, RENAME_NEW_NAME,
+                               CLOSE)
+
+SECOND = 10000000  # FILETIME ticks
+
+
+def rename_store():
+    store = JournalTrace.EntryStore()
+    store.append(1, 100, 5, FILETIME_2024, FILE_CREATE | CLOSE, 0x20, 'draft.txt', 'C')
+    store.append(2, 100, 5, FILETIME_2024 + SECOND, RENAME_OLD_NAME, 0x20, 'draft.txt', 'C')
+    store.append(3, 100, 5, FILETIME_2024 + SECOND, RENAME_NEW_NAME | CLOSE, 0x20, 'final.txt', 'C')
+    return store
+
+
+def test_rename_rows_are_marked(tmp_path):
+    store = rename_store()
+    assert [(row['isRename'], row['renameType']) for row in store.rows()] == [
+        (False, 'none'), (True, 'old'), (True, 'new')]
+
+    with JournalTrace.StreamingExporter(str(tmp_path / 'out.csv'), 'csv') as exporter:
+        exporter.write(store)
+    rows = list(csv.DictReader(io.StringIO((tmp_path / 'out.csv').read_text(encoding='utf-8'))))
+    assert [(row['IsRename'], row['RenameType']) for row in rows] == [
+        ('False', 'none'), ('True', 'old'), ('True', 'new')]
+
+
+def scanned_store(tmp_path, monkeypatch, **options):
+    monkeypatch.setenv('LOCALAPPDATA', str(tmp_path / 'data'))
+    volume = generate_volume(**options)
+    volume.write_mft_file(str(tmp_path / '$MFT'))
+    volume.write_journal_file(str(tmp_path / '$J'))
+    scanner = JournalTrace.JournalScanner(scan_workers=1, decode_workers=1)
+    scanner.scan_journal_file(JournalTrace.ConsoleWindow(quiet=True), str(tmp_path / '$J'))
+    return scanner.results
+
+
+def test_export_paths_match_point_in_time_paths(tmp_path, monkeypatch):
+    store = scanned_store(tmp_path, monkeypatch, files=2000, events=8000, rename_storms=3, storm_size=50)
+    assert store.resolvers['C'].history.change_usns
+
+    with JournalTrace.StreamingExporter(str(tmp_path / 'out.csv'), 'csv') as exporter:
+        paths = exporter.paths(store, range(len(store)))
+    assert paths == [store.path(i) for i in range(len(store))]
+    # The renamed directories show their old names before the rename
+    resolver = store.resolvers['C']
+    assert any(path != resolver.path_of(store.parent_refs[i] & 0xFFFFFFFFFFFF, store.name(i))
+               for i, path in enumerate(paths))
+
+
+def test_formats_hold_the_same_filtered_rows(tmp_path, monkeypatch):
+    store = scanned_store(tmp_path, monkeypatch, files=1000, events=4000, rename_storms=1, storm_size=50)
+    timestamps = sorted(store.timestamps)
+    start_time, end_time = timestamps[len(timestamps) // 5], timestamps[-len(timestamps) // 5]
+    prefix = store.path(len(store) // 2).rpartition('\\')[0].rpartition('\\')[0] + '\\'
+    mask = FILE_CREATE | FILE_DELETE
+    expected = [i for i in range(len(store)) if store.reasons[i] & mask and start_time <= store.timestamps[i] <= end_time
+                and store.path(i).lower().startswith(prefix.lower())]
+    assert expected
+
+    def export(name, fmt):
+        filename = str(tmp_path / name)
+        # Small batches, so the filters run across several of them
+        with JournalTrace.StreamingExporter(filename, fmt, mask, start_time, end_time, prefix.upper(),
+                                            batch_rows=256) as exporter:
+            exporter.write(store)
+        assert exporter.count == len(expected)
+        return filename
+
+    rows = list(csv.DictReader(io.StringIO(open(export('out.csv', 'csv'), encoding='utf-8').read())))
+    assert [row['USN'] for row in rows] == [str(store.usns[i]) for i in expected]
+    assert [row['Path'] for row in rows] == [store.path(i) for i in expected]
+    assert [row['Timestamp'] for row in rows] == [store.row(i)['timestamp'] for i in expected]
+    assert [row['Reason'] for row in rows] == [store.row(i)['reason'] for i in expected]
+
+    with gzip.open(export('out.jsonl.gz', 'jsonl'), 'rt', encoding='utf-8') as f:
+        lines = [json.loads(line) for line in f]
+    assert [(line['usn'], line['path'], line['reasonMask']) for line in lines] == [
+        (store.usns[i], store.path(i), store.reasons[i]) for i in expected]
+
+    blocks = list(JournalTrace.StreamingExporter.read_columns(export('out.jtc', 'columns')))
+    assert [usn for block in blocks for usn in block['usn']] == [store.usns[i] for i in expected]
+    assert [path for block in blocks for path in block['path']] == [store.path(i) for i in expected]
+    assert [ref for block in blocks for ref in block['file_reference']] == [store.file_refs[i] for i in expected]
@@ -0,0 +1,70 @@
+import csv
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import JournalTrace
+from synthetic_journal import generate_volume, generate_volumes
+
+
+class FailingDriveBackend(JournalTrace.MemoryVolumeBackend):
+    """Lists a Z: volume on top of the images that cannot be opened"""
+
+    def list_volumes(self):
+        return super().list_volumes() + [{'letter': 'Z', 'serial': 0x5E00005A, 'name': 'Z:\\', 'label': 'Gone',
+                                          'format': 'NTFS', 'root': 'Z:\\', 'totalFree': '0.0GB',
+                                          'totalSize': '0.0GB', 'type': 'Fixed', 'isReady': True}]
+
+
+def run(tmp_path, monkeypatch, *argv):
+    monkeypatch.setenv('LOCALAPPDATA', str(tmp_path / 'data'))
+    return JournalTrace.run_headless(JournalTrace.parse_arguments(['--headless', '--quiet', *argv]))
+
+
+def read_csv(path):
+    with open(path, encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def test_journal_file_is_written_out(tmp_path, monkeypatch):
+    volume = generate_volume('C', files=300, events=1000, rename_storms=0)
+    volume.write_journal_file(str(tmp_path / '$J'))
+    output = str(tmp_path / 'out.csv')
+    assert run(tmp_path, monkeypatch, '--journal-file', str(tmp_path / '$J'), '--output', output) == JournalTrace.EXIT_OK
+    assert [row['USN'] for row in read_csv(output)] == [str(usn) for usn in volume.journal_usns]
+
+
+def test_filters_apply_to_the_output(tmp_path, monkeypatch):
+    volume = generate_volume('C', files=300, events=1000, rename_storms=0)
+    volume.write_journal_file(str(tmp_path / '$J'))
+    output = str(tmp_path / 'out.csv')
+    assert run(tmp_path, monkeypatch, '--journal-file', str(tmp_path / '$J'), '--reasons', 'FILE_DELETE',
+               '--output', output) == JournalTrace.EXIT_OK
+    rows = read_csv(output)
+    assert rows and all('FILE_DELETE' in row['Reason'] for row in rows)
+
+
+def test_unreadable_input_fails(tmp_path, monkeypatch):
+    output = str(tmp_path / 'out.csv')
+    assert run(tmp_path, monkeypatch, '--journal-file', str(tmp_path / 'missing'), '--output', output) == JournalTrace.EXIT_FAILED
+    assert run(tmp_path, monkeypatch, '--case', str(tmp_path / 'no case'), '--output', output) == JournalTrace.EXIT_FAILED
+
+
+def test_some_failed_drives_are_a_partial_result(tmp_path, monkeypatch):
+    volumes = generate_volumes(2, files=300, events=1000, rename_storms=0)
+    backend = FailingDriveBackend(volumes)
+    monkeypatch.setattr(JournalTrace, 'WindowsVolumeBackend', lambda: backend)
+    output = str(tmp_path / 'out.csv')
+    assert run(tmp_path, monkeypatch, '--no-case', '--output', output) == JournalTrace.EXIT_PARTIAL
+    assert len(read_csv(output)) == sum(len(volume.journal_usns) for volume in volumes)
+
+
+def test_bad_arguments_exit_with_usage(capsys):
+    for argv in (['--volume', 'CD'], ['--reasons', 'NOT_A_REASON'], ['--corpus', 'a', '--format', 'columns'],
+                 ['--case', 'a', '--journal-file', 'b'], ['--unknown']):
+        with pytest.raises(SystemExit) as exit_info:
+            JournalTrace.parse_arguments(['--headless', *argv])
+        assert exit_info.value.code == JournalTrace.EXIT_USAGE, argv
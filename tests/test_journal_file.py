@@ -0,0 +1,69 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import JournalTrace
+from synthetic_journal import generate_volume
+
+
+def scan(tmp_path, monkeypatch, journal_path, drive_letter=None):
+    monkeypatch.setenv('LOCALAPPDATA', str(tmp_path / 'data'))
+    scanner = JournalTrace.JournalScanner(scan_workers=1, decode_workers=1)
+    window = JournalTrace.ConsoleWindow(quiet=True)
+    scanner.scan_journal_file(window, str(journal_path), drive_letter=drive_letter)
+    assert not window.errors
+    return scanner
+
+
+def collect(tmp_path, letter):
+    """Lay a synthetic volume out like a triage collection - <letter>\\$MFT and <letter>\\$Extend\\$J"""
+    volume = generate_volume(letter, files=300, events=1000, rename_storms=0)
+    folder = tmp_path / 'collection' / letter
+    (folder / '$Extend').mkdir(parents=True)
+    volume.write_mft_file(str(folder / '$MFT'))
+    volume.write_journal_file(str(folder / '$Extend' / '$J'))
+    return folder / '$Extend' / '$J'
+
+
+def test_collected_drive_letter():
+    assert JournalTrace.collected_drive_letter(os.path.join('case', 'E', '$Extend', '$UsnJrnl%3A$J')) == 'E'
+    assert JournalTrace.collected_drive_letter(os.path.join('uploads', '%5C%5C.%5CF%3A', '$Extend', '$J')) == 'F'
+    assert JournalTrace.collected_drive_letter(os.path.join('case', 'D$', '$J')) == 'D'
+    assert JournalTrace.collected_drive_letter(os.path.join('case', 'host1', '$J')) == 'C'
+
+
+def test_rows_take_the_collected_volume_letter(tmp_path, monkeypatch):
+    scanner = scan(tmp_path, monkeypatch, collect(tmp_path, 'D'))
+    rows = scanner.results.rows()
+    assert rows and all(row['path'].startswith('D:\\') for row in rows)
+    assert list(scanner.results.resolvers) == ['D']
+
+
+def test_volume_letter_can_be_given(tmp_path, monkeypatch):
+    scanner = scan(tmp_path, monkeypatch, collect(tmp_path, 'D'), drive_letter='e:')
+    assert all(row['path'].startswith('E:\\') for row in scanner.results.rows())
+
+
+def test_sparse_prefix_is_skipped(tmp_path, monkeypatch):
+    monkeypatch.setenv('LOCALAPPDATA', str(tmp_path))
+    volume = generate_volume('C', files=300, events=1000, rename_storms=0, journal_start=48 * 1024 * 1024)
+    path = tmp_path / '$J'
+    volume.write_journal_file(str(path), sparse_prefix=volume.journal_start)
+    scanner = JournalTrace.JournalScanner(scan_workers=1, decode_workers=1)
+    scanner.is_scanning = True
+    entries, _, _ = scanner.read_usn_journal_file(str(path))
+    assert list(entries.usns) == list(volume.journal_usns)
+
+
+def test_zero_fill_between_records_is_skipped(tmp_path, monkeypatch):
+    monkeypatch.setenv('LOCALAPPDATA', str(tmp_path))
+    volume = generate_volume('C', files=300, events=1000, rename_storms=0)
+    half = volume.journal_usns[len(volume.journal_usns) // 2] - volume.journal_start
+    path = tmp_path / '$J'
+    # NTFS pads the journal to the next page when a record does not fit the current one
+    path.write_bytes(bytes(volume.journal[:half]) + bytes(4096 + 8) + bytes(volume.journal[half:]))
+    scanner = JournalTrace.JournalScanner(scan_workers=1, decode_workers=1)
+    scanner.is_scanning = True
+    entries, _, _ = scanner.read_usn_journal_file(str(path))
+    assert list(entries.usns) == list(volume.journal_usns)
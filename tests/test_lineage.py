@@ -0,0 +1,91 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import JournalTrace
+from synthetic_journal import (SyntheticVolume, generate_volume, FILETIME_2024, FILE_ATTRIBUTE_ARCHIVE,
+                               FILE_CREATE, FILE_DELETE, DATA_EXTEND, RENAME_NEW_NAME, CLOSE)
+
+DOWNLOADS_REF = 70
+SECOND = 10000000  # FILETIME ticks
+
+
+def lineage_of(volume, tmp_path, monkeypatch):
+    """Read a synthetic volume's journal into an EntryStore and index it"""
+    monkeypatch.setenv('LOCALAPPDATA', str(tmp_path))
+    path = tmp_path / 'J.bin'
+    volume.write_journal_file(str(path))
+    scanner = JournalTrace.JournalScanner(scan_workers=1, decode_workers=1)
+    scanner.is_scanning = True
+    entries, _, _ = scanner.read_usn_journal_file(str(path))
+    lineage = JournalTrace.LineageIndex(entries)
+    lineage.refresh()
+    return lineage
+
+
+def history(lineage, ref):
+    store = lineage.store
+    drive_id, = lineage.drive_ids
+    file_ref = next(store.file_refs[i] for i in range(len(store)) if store.file_refs[i] & 0xFFFFFFFFFFFF == ref)
+    return [(store.file_refs[i] & 0xFFFFFFFFFFFF, store.name(i)) for i in lineage.file_history(drive_id, file_ref)]
+
+
+def test_download_base_name():
+    assert JournalTrace.download_base_name('report.pdf.crdownload') == 'report.pdf'
+    assert JournalTrace.download_base_name('Unconfirmed 123456.crdownload') == ''
+
+
+def test_unconfirmed_download_is_paired_by_directory_and_time(tmp_path, monkeypatch):
+    volume = SyntheticVolume()
+    write = volume.write
+    timestamp = FILETIME_2024
+    # The browser writes an unnamed temporary file, deletes it and creates the completed one next to it
+    write(100, DOWNLOADS_REF, timestamp, FILE_CREATE, FILE_ATTRIBUTE_ARCHIVE, 'Unconfirmed 481516.crdownload')
+    write(100, DOWNLOADS_REF, timestamp, FILE_CREATE | DATA_EXTEND, FILE_ATTRIBUTE_ARCHIVE, 'Unconfirmed 481516.crdownload')
+    write(100, DOWNLOADS_REF, timestamp + SECOND, FILE_DELETE | CLOSE, FILE_ATTRIBUTE_ARCHIVE, 'Unconfirmed 481516.crdownload')
+    write(101, DOWNLOADS_REF, timestamp + 2 * SECOND, FILE_CREATE, FILE_ATTRIBUTE_ARCHIVE, 'setup.exe')
+    write(101, DOWNLOADS_REF, timestamp + 2 * SECOND, FILE_CREATE | CLOSE, FILE_ATTRIBUTE_ARCHIVE, 'setup.exe')
+    # Another unnamed download, cancelled, and an unrelated file long after it
+    write(102, DOWNLOADS_REF, timestamp + 60 * SECOND, FILE_CREATE, FILE_ATTRIBUTE_ARCHIVE, 'Unconfirmed 2342.crdownload')
+    write(102, DOWNLOADS_REF, timestamp + 61 * SECOND, FILE_DELETE | CLOSE, FILE_ATTRIBUTE_ARCHIVE, 'Unconfirmed 2342.crdownload')
+    write(103, DOWNLOADS_REF, timestamp + 600 * SECOND, FILE_CREATE | CLOSE, FILE_ATTRIBUTE_ARCHIVE, 'notes.txt')
+    lineage = lineage_of(volume, tmp_path, monkeypatch)
+
+    assert [ref for ref, _ in history(lineage, 101)] == [100, 100, 100, 101, 101]
+    assert [ref for ref, _ in history(lineage, 100)] == [100, 100, 100, 101, 101]
+    assert [ref for ref, _ in history(lineage, 102)] == [102, 102]
+    assert [ref for ref, _ in history(lineage, 103)] == [103]
+
+
+def test_unconfirmed_download_is_paired_past_other_rows_in_the_folder(tmp_path, monkeypatch):
+    volume = SyntheticVolume()
+    write = volume.write
+    timestamp = FILETIME_2024
+    write(100, DOWNLOADS_REF, timestamp, FILE_CREATE, FILE_ATTRIBUTE_ARCHIVE, 'Unconfirmed 481516.crdownload')
+    write(100, DOWNLOADS_REF, timestamp + SECOND, FILE_DELETE | CLOSE, FILE_ATTRIBUTE_ARCHIVE, 'Unconfirmed 481516.crdownload')
+    # Unrelated writes in the same folder and elsewhere before the completed name shows up
+    for ref in range(200, 240):
+        write(ref, DOWNLOADS_REF if ref % 2 else DOWNLOADS_REF + 1, timestamp + SECOND, DATA_EXTEND | CLOSE,
+              FILE_ATTRIBUTE_ARCHIVE, f'log{ref}.txt')
+    write(101, DOWNLOADS_REF, timestamp + 2 * SECOND, FILE_CREATE | CLOSE, FILE_ATTRIBUTE_ARCHIVE, 'setup.exe')
+    # A second completed file is not paired with the same download
+    write(104, DOWNLOADS_REF, timestamp + 3 * SECOND, FILE_CREATE | CLOSE, FILE_ATTRIBUTE_ARCHIVE, 'readme.txt')
+    lineage = lineage_of(volume, tmp_path, monkeypatch)
+
+    assert [ref for ref, _ in history(lineage, 101)] == [100, 100, 101]
+    assert [ref for ref, _ in history(lineage, 104)] == [104]
+
+
+def test_downloads_renamed_in_place_stay_apart(tmp_path, monkeypatch):
+    volume = generate_volume(files=2000, events=6000, rename_storms=0, seed=1)
+    lineage = lineage_of(volume, tmp_path, monkeypatch)
+    store = lineage.store
+    downloads = {store.file_refs[i] & 0xFFFFFFFFFFFF for i in range(len(store))
+                 if store.name(i).startswith('Unconfirmed ')}
+    assert downloads
+
+    for ref in downloads:
+        names = [name for file_ref, name in history(lineage, ref) if file_ref == ref]
+        assert names[0].startswith('Unconfirmed ') and not names[-1].endswith('.crdownload')
+        assert {file_ref for file_ref, _ in history(lineage, ref)} == {ref}
@@ -0,0 +1,59 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import JournalTrace
+from synthetic_journal import generate_volume, ROOT_REF
+
+RECORD_SIZE = 1024
+
+
+def expected_nodes(volume):
+    nodes = {ref: (parent_ref, name) for ref, (parent_ref, name, _) in volume.nodes.items()}
+    nodes.setdefault(0, (ROOT_REF, '$MFT'))
+    nodes.setdefault(ROOT_REF, (ROOT_REF, '.'))
+    return nodes
+
+
+def test_parser_matches_the_volume_nodes(tmp_path):
+    volume = generate_volume('C', files=2000, events=4000, rename_storms=0)
+    path = str(tmp_path / '$MFT')
+    volume.write_mft_file(path)
+    # Every third record has a DOS name and an attribute list, shifting its long name across sector ends
+    assert any(ref % 3 == 0 for ref in volume.nodes)
+    assert JournalTrace.read_mft_file(path, workers=1) == expected_nodes(volume)
+
+
+def test_chunks_parsed_in_worker_processes_agree(tmp_path, monkeypatch):
+    volume = generate_volume('C', files=2000, events=4000, rename_storms=0)
+    path = str(tmp_path / '$MFT')
+    volume.write_mft_file(path)
+    monkeypatch.setattr(JournalTrace, 'MFT_CHUNK_RECORDS', 512)
+    assert JournalTrace.read_mft_file(path, workers=2) == expected_nodes(volume)
+
+
+def test_torn_record_is_skipped(tmp_path):
+    volume = generate_volume('C', files=300, events=600, rename_storms=0)
+    path = tmp_path / '$MFT'
+    volume.write_mft_file(str(path))
+    torn = next(ref for ref in sorted(volume.nodes) if ref > ROOT_REF)
+    data = bytearray(path.read_bytes())
+    # The second sector was never written - its end no longer carries the update sequence number
+    end = torn * RECORD_SIZE + 2 * JournalTrace.MFT_SECTOR_SIZE
+    data[end - 2:end] = b'\xAA\xAA'
+    path.write_bytes(bytes(data))
+
+    nodes = JournalTrace.read_mft_file(str(path), workers=1)
+    expected = expected_nodes(volume)
+    del expected[torn]
+    assert nodes == expected
+
+
+def test_other_files_are_refused(tmp_path):
+    path = tmp_path / 'J.bin'
+    path.write_bytes(bytes(4096))
+    with pytest.raises(Exception, match='is not an \\$MFT'):
+        JournalTrace.read_mft_file(str(path))
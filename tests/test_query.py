@@ -0,0 +1,85 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import JournalTrace
+from synthetic_journal import (generate_volume, generate_volumes, FILE_CREATE, FILE_DELETE, DATA_EXTEND,
+                               RENAME_OLD_NAME, RENAME_NEW_NAME)
+
+
+def scan(tmp_path, monkeypatch, volumes):
+    monkeypatch.setenv('LOCALAPPDATA', str(tmp_path))
+    scanner = JournalTrace.JournalScanner(backend=JournalTrace.MemoryVolumeBackend(volumes), decode_workers=1)
+    window = JournalTrace.ConsoleWindow(quiet=True)
+    scanner.scan_all_drives(window)
+    assert not window.errors
+    return scanner
+
+
+def test_results_are_indexed_as_drives_merge(tmp_path, monkeypatch):
+    scanner = scan(tmp_path, monkeypatch, generate_volumes(2, files=500, events=2000, rename_storms=0))
+    engine = scanner.query_engine
+    assert engine.store is scanner.results
+    assert engine.indexed_rows == len(scanner.results) == 4002
+    assert scanner.lineage.indexed_rows == len(scanner.results)
+
+
+def test_digit_search_matches_usn_prefixes(tmp_path, monkeypatch):
+    # The second drive is far along its journal, its USNs have more digits
+    volumes = [generate_volume('C', files=500, events=3000, rename_storms=0),
+               generate_volume('D', files=500, events=3000, rename_storms=0, seed=1, journal_start=10 ** 12)]
+    scanner = scan(tmp_path, monkeypatch, volumes)
+    store = scanner.results
+    engine = scanner.query_engine
+    for digits in ('1', '12', '4096', '1000000000', '0', '007'):
+        expected = [i for i in range(len(store)) if str(store.usns[i]).startswith(digits)
+                    or digits in store.name(i).lower() or digits in store.path(i).lower().rpartition('\\')[0]]
+        total, _ = engine.query(digits, limit=0)
+        assert list(engine.last_matches) == expected, digits
+        assert total == len(expected)
+
+
+def expected_rows(store, text='', reason_mask=0, start_time=None, end_time=None):
+    rows = []
+    for i in range(len(store)):
+        if text and text not in store.name(i).lower() and text not in store.path(i).lower().rpartition('\\')[0] \
+                and not (text.isdigit() and str(store.usns[i]).startswith(text)):
+            continue
+        if reason_mask and not store.reasons[i] & reason_mask:
+            continue
+        if start_time is not None and store.timestamps[i] < start_time:
+            continue
+        if end_time is not None and store.timestamps[i] > end_time:
+            continue
+        rows.append(i)
+    return rows
+
+
+def test_filters_match_a_full_scan(tmp_path, monkeypatch):
+    scanner = scan(tmp_path, monkeypatch, generate_volumes(2, files=500, events=3000, rename_storms=1, storm_size=200))
+    store = scanner.results
+    engine = scanner.query_engine
+    timestamps = sorted(store.timestamps)
+    start_time, end_time = timestamps[len(timestamps) // 4], timestamps[len(timestamps) // 2]
+    for text, reason_mask, time_range in [('', FILE_DELETE, (None, None)), ('', RENAME_OLD_NAME | RENAME_NEW_NAME, (None, None)),
+                                          ('.txt', 0, (None, None)), ('crdownload', FILE_CREATE, (None, None)),
+                                          ('', 0, (start_time, end_time)), ('e', DATA_EXTEND, (start_time, None))]:
+        expected = expected_rows(store, text, reason_mask, *time_range)
+        total, _ = engine.query(text, reason_mask, *time_range, limit=0)
+        assert total == len(expected) and list(engine.last_matches) == expected, (text, reason_mask, time_range)
+
+
+def test_pages_cover_the_matches_once(tmp_path, monkeypatch):
+    scanner = scan(tmp_path, monkeypatch, generate_volumes(2, files=500, events=2000, rename_storms=0))
+    store = scanner.results
+    expected = [store.row(i) for i in expected_rows(store, 'e', FILE_CREATE | DATA_EXTEND)]
+    rows = []
+    for offset in range(0, len(expected) + 200, 200):
+        page = scanner.query('e', FILE_CREATE | DATA_EXTEND, offset=offset, limit=200)
+        assert page['total'] == len(expected)
+        rows += page['rows']
+    assert rows == expected
+
+    unfiltered = scanner.query(offset=len(store) - 5, limit=200)
+    assert unfiltered['total'] == len(store) and unfiltered['rows'] == store.rows(len(store) - 5)
@@ -0,0 +1,35 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import JournalTrace
+from synthetic_journal import generate_volumes
+
+
+def export(tmp_path, name, memory_budget):
+    volumes = generate_volumes(2, files=1000, events=6000, rename_storms=1, storm_size=200)
+    # One volume at a time, drives merge in the order they finish
+    scanner = JournalTrace.JournalScanner(backend=JournalTrace.MemoryVolumeBackend(volumes), scan_workers=1,
+                                          decode_workers=1, memory_budget=memory_budget)
+    window = JournalTrace.ConsoleWindow(quiet=True)
+    scanner.scan_all_drives(window)
+    assert not window.errors
+    filename = str(tmp_path / name)
+    scanner.export_results(filename, 'csv')
+    spilled = isinstance(scanner.results.usns, JournalTrace.SpilledColumn)
+    scanner.close()
+    with open(filename, 'rb') as f:
+        return f.read(), spilled
+
+
+def test_spilled_scan_exports_the_same_bytes(tmp_path, monkeypatch):
+    monkeypatch.setenv('LOCALAPPDATA', str(tmp_path))
+    in_memory, spilled = export(tmp_path, 'memory.csv', 0)
+    assert not spilled
+    # A few thousand rows of budget, both drives and the results spill several times
+    on_disk, spilled = export(tmp_path, 'spilled.csv', 2 * 1024 * JournalTrace.ENTRY_ROW_BYTES)
+    assert spilled
+    assert on_disk == in_memory
+    # Closing the scanner deletes its spill segments
+    assert not os.listdir(os.path.join(JournalTrace.get_data_dir(), 'spill'))